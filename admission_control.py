@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Set, Tuple
+
+import psutil
+
+
+# Valores padrão da seção "admission" do arquivo de configuração
+DEFAULT_ADMISSION = {
+    'enabled': False,
+    'memory_budget_mb': 0,       # Orçamento total para as instâncias (0 = sem limite fixo)
+    'min_free_mb': 512,          # Memória que deve sobrar livre após iniciar
+    'max_load_per_cpu': 1.5,     # Load average de 1 minuto por núcleo
+    'base_cost_mb': 120,         # Custo fixo estimado de Xephyr + xfwm4 + aplicativo
+    'framebuffer_copies': 3,     # Cópias do framebuffer mantidas (servidor, janela do host, shadow)
+    'settle_time': 15.0,         # Por quanto tempo uma instância recém-iniciada reserva seu custo
+    'retry_interval': 1.0
+}
+
+# Retorno de um início aceito mas adiado (instância na fila de admissão)
+QUEUED = 'queued'
+
+
+class AdmissionController:
+    """Controle de admissão: só inicia instâncias quando o host tem folga
+
+    Estima o custo de cada instância pela resolução (bytes de framebuffer) e
+    pelo pico de RSS observado anteriormente, compara com a memória livre, a
+    carga de CPU e o orçamento configurado, e enfileira os inícios (em ordem)
+    até haver folga.
+    """
+
+    def __init__(self, settings: Optional[Dict] = None):
+        self.settings = dict(DEFAULT_ADMISSION)
+        if settings:
+            self.settings.update(settings)
+        self._queue: "OrderedDict[int, int]" = OrderedDict()
+        self._reservations: Dict[int, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._launch: Optional[Callable[[int], bool]] = None
+        self._committed: Optional[Callable[[Set[int]], int]] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settings.get('enabled'))
+
+    def bind(self, launch: Callable[[int], bool], committed: Callable[[Set[int]], int]):
+        """Define como iniciar uma instância e como medir a memória já comprometida
+
+        committed recebe os displays com reserva ativa, que não devem ser somados
+        de novo.
+        """
+        self._launch = launch
+        self._committed = committed
+
+    def estimate_cost(self, width: int, height: int, peak_rss: int = 0) -> int:
+        """Custo estimado em bytes: framebuffer pela resolução ou o pico de RSS já visto"""
+        framebuffer = width * height * 4 * self.settings['framebuffer_copies']
+        estimate = framebuffer + self.settings['base_cost_mb'] * 1024 * 1024
+        return max(estimate, peak_rss)
+
+    def _reserved(self) -> int:
+        now = time.monotonic()
+        settle_time = self.settings['settle_time']
+        for display_num in [num for num, (_, since) in self._reservations.items() if now - since > settle_time]:
+            del self._reservations[display_num]
+        return sum(cost for cost, _ in self._reservations.values())
+
+    def check_headroom(self, cost: int) -> Tuple[bool, str]:
+        """Verifica se o host comporta mais uma instância desse custo (chamar com o lock)"""
+        reserved = self._reserved()
+        memory = psutil.virtual_memory()
+        min_free = self.settings['min_free_mb'] * 1024 * 1024
+        if memory.available - reserved - cost < min_free:
+            return False, "memória livre insuficiente"
+
+        budget = self.settings['memory_budget_mb'] * 1024 * 1024
+        if budget:
+            committed = self._committed(set(self._reservations)) if self._committed else 0
+            if committed + reserved + cost > budget:
+                return False, "orçamento de memória esgotado"
+
+        max_load = self.settings['max_load_per_cpu']
+        if max_load:
+            load = os.getloadavg()[0] / (os.cpu_count() or 1)
+            if load > max_load:
+                return False, f"carga de CPU alta ({load:.2f} por núcleo)"
+
+        return True, ""
+
+    def request(self, display_num: int, cost: int) -> bool:
+        """Admite agora (True) ou coloca na fila (False)
+
+        Quem já está na fila tem prioridade: novos pedidos não furam a fila.
+        """
+        with self._lock:
+            if display_num in self._queue:
+                return False
+            if not self._queue:
+                admitted, _ = self.check_headroom(cost)
+                if admitted:
+                    self._reservations[display_num] = (cost, time.monotonic())
+                    return True
+            self._queue[display_num] = cost
+            self._ensure_worker()
+        self._wakeup.set()
+        return False
+
+    def is_queued(self, display_num: int) -> bool:
+        with self._lock:
+            return display_num in self._queue
+
+    def cancel(self, display_num: int) -> bool:
+        """Retira uma instância da fila; retorna True se ela estava enfileirada"""
+        with self._lock:
+            self._reservations.pop(display_num, None)
+            return self._queue.pop(display_num, None) is not None
+
+    def release(self, display_num: int):
+        """Libera a reserva de uma instância que parou"""
+        with self._lock:
+            self._reservations.pop(display_num, None)
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._drain_queue, daemon=True)
+            self._worker.start()
+
+    def _drain_queue(self):
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._worker = None
+                    return
+                display_num, cost = next(iter(self._queue.items()))
+                admitted, reason = self.check_headroom(cost)
+                if admitted:
+                    del self._queue[display_num]
+                    self._reservations[display_num] = (cost, time.monotonic())
+
+            if admitted:
+                try:
+                    if self._launch:
+                        self._launch(display_num)
+                except Exception as e:
+                    print(f"Erro ao iniciar instância :{display_num} da fila: {e}")
+                continue
+
+            self._wakeup.wait(self.settings['retry_interval'])
+            self._wakeup.clear()
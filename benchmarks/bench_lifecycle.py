@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""Benchmark do ciclo de vida das instâncias com stubs do Xephyr e do xfwm4
+
+Coloca benchmarks/stubs no início do PATH e sobe o stub_x_hub, que atende
+os sockets /tmp/.X11-unix/X<n> dos stubs; assim o XephyrManager real cria,
+inicia, para e remove centenas de instâncias sem servidor X nem display no
+host. Para cada quantidade mede a vazão de cada fase e os percentis de
+latência por instância: criação (create_instance), início até 'ready'
+(starting → ready, inclui o handshake X e a espera pelo WM), parada
+(stopping → stopped, dentro do stop_many) e remoção (remove_instance).
+Também conta quedas, instâncias que não ficaram prontas e sockets ou
+processos que sobraram. Os stubs podem atrasar, travar (ignorar o
+SIGTERM) ou cair numa fração das instâncias. As mensagens do gerenciador
+vão para stderr; o JSON sai em stdout (e em --output, se indicado).
+
+Uso: python benchmarks/bench_lifecycle.py [--counts 1 10 100 500] [--hang 0.01] [--crash 0.01] [--output lifecycle.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+import psutil
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+STUBS_DIR = os.path.join(BENCH_DIR, 'stubs')
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from xephyr_manager import CRASHED, READY, STARTING, STOPPED, STOPPING, XephyrManager
+
+
+def percentiles(values: List[float]) -> Dict:
+    """Latências em ms (percentil pelo posto mais próximo)"""
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))] * 1000
+
+    return {
+        'count': len(ordered),
+        'mean_ms': sum(ordered) / len(ordered) * 1000,
+        'p50_ms': rank(50),
+        'p90_ms': rank(90),
+        'p99_ms': rank(99),
+        'max_ms': ordered[-1] * 1000
+    }
+
+
+def phase(latencies: List[float], elapsed: float, **extra) -> Dict:
+    result = {'elapsed_s': elapsed, 'per_second': len(latencies) / elapsed if elapsed > 0 else None}
+    result.update(percentiles(latencies))
+    result.update(extra)
+    return result
+
+
+class StateClock:
+    """Marca o instante de cada transição de estado (e da entrada na fila de admissão)"""
+
+    def __init__(self):
+        self.marks: Dict[int, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def __call__(self, event: Dict):
+        if event['type'] not in ('state', 'queued'):
+            return
+        mark = event['state'] if event['type'] == 'state' else 'queued'
+        with self._changed:
+            self.marks.setdefault(event['display'], {})[mark] = time.perf_counter()
+            self._changed.notify_all()
+
+    def between(self, displays: List[int], first: str, last: str) -> List[float]:
+        with self._lock:
+            return [self.marks[num][last] - self.marks[num][first] for num in displays
+                    if first in self.marks.get(num, {}) and last in self.marks.get(num, {})]
+
+    def reached(self, displays: List[int], state: str) -> int:
+        with self._lock:
+            return sum(1 for num in displays if state in self.marks.get(num, {}))
+
+    def wait_all(self, displays: List[int], states: set, timeout: float) -> bool:
+        """Aguarda todas as instâncias passarem por algum dos estados"""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                pending = [num for num in displays if not states & set(self.marks.get(num, {}))]
+                remaining = deadline - time.monotonic()
+                if not pending or remaining <= 0:
+                    return not pending
+                self._changed.wait(remaining)
+
+    def reset(self, displays: List[int]):
+        with self._lock:
+            for num in displays:
+                self.marks.pop(num, None)
+
+
+def start_hub(path: str) -> subprocess.Popen:
+    hub = subprocess.Popen([sys.executable, os.path.join(STUBS_DIR, 'stub_x_hub.py'), path],
+                           stdout=subprocess.DEVNULL, stderr=sys.stderr)
+    deadline = time.monotonic() + 5
+    while not os.path.exists(path):
+        if hub.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("stub_x_hub não iniciou")
+        time.sleep(0.01)
+    return hub
+
+
+def tracked_pids(manager: XephyrManager, displays: List[int]) -> List[int]:
+    pids = []
+    for num in displays:
+        instance = manager.instances.get(num)
+        if instance:
+            pids.extend(process.pid for process in instance.registry.processes(alive_only=False))
+    return pids
+
+
+def leftover_processes(pids: List[int]) -> int:
+    count = 0
+    for pid in pids:
+        try:
+            if psutil.Process(pid).status() != psutil.STATUS_ZOMBIE:
+                count += 1
+        except psutil.Error:
+            pass
+    return count
+
+
+def run_count(manager: XephyrManager, clock: StateClock, count: int, args) -> Dict:
+    # Criação: sequencial, como na interface
+    created = []
+    latencies = []
+    batch = time.perf_counter()
+    for index in range(count):
+        start = time.perf_counter()
+        display_num = manager.create_instance(args.width, args.height, f"bench-{index}", args.command)
+        latencies.append(time.perf_counter() - start)
+        if display_num is not None:
+            created.append(display_num)
+    create = phase(latencies, time.perf_counter() - batch, failed=count - len(created))
+
+    # Início: start_many lança os servidores; a fase termina quando todas ficam prontas (ou caem)
+    batch = time.perf_counter()
+    report = manager.start_many(created, args.concurrency)
+    settled = clock.wait_all(created, {READY, CRASHED}, args.timeout)
+    elapsed = time.perf_counter() - batch
+    ready = clock.between(created, STARTING, READY)
+    crashed_early = clock.reached(created, CRASHED)
+    start = phase(ready, elapsed, launch_failed=report['failed'], not_ready=count - len(ready) - crashed_early,
+                  crashed=crashed_early, queued=clock.reached(created, 'queued'), timed_out=not settled)
+
+    # Deixa as quedas programadas dos stubs acontecerem antes de parar
+    if args.hold > 0:
+        time.sleep(args.hold)
+    crashed = clock.reached(created, CRASHED)
+
+    # Parada: SIGTERM em todas e espera conjunta (travadas levam SIGKILL no prazo; as que
+    # caíram também passam por aqui, o que derruba o xfwm4 que sobreviveu a elas)
+    pids = tracked_pids(manager, created)
+    batch = time.perf_counter()
+    report = manager.stop_many(created, args.concurrency)
+    elapsed = time.perf_counter() - batch
+    stop = phase(clock.between(created, STOPPING, STOPPED), elapsed, failed=report['failed'])
+
+    # Remoção das instâncias paradas
+    latencies = []
+    batch = time.perf_counter()
+    for num in created:
+        start_remove = time.perf_counter()
+        manager.remove_instance(num)
+        latencies.append(time.perf_counter() - start_remove)
+    flush = time.perf_counter()
+    manager.flush_config()
+    flush = time.perf_counter() - flush
+    elapsed = time.perf_counter() - batch
+    # O hub remove o socket assim que percebe o fim do stub
+    time.sleep(0.2)
+    cleanup = phase(latencies, elapsed, flush_config_ms=flush * 1000,
+                    leftover_sockets=sum(1 for num in created if os.path.exists(f"/tmp/.X11-unix/X{num}")),
+                    leftover_processes=leftover_processes(pids))
+
+    clock.reset(created)
+    return {'create': create, 'start': start, 'stop': stop, 'cleanup': cleanup,
+            'crashed_before_stop': crashed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counts', type=int, nargs='+', default=[1, 10, 100, 500],
+                        help="quantidades de instâncias medidas")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--command', default="", help="comando de cada instância (padrão: nenhum)")
+    parser.add_argument('--concurrency', type=int, help="concorrência do start_many/stop_many")
+    parser.add_argument('--admission', action='store_true',
+                        help="liga o controle de admissão (a carga dos stubs pode enfileirar inícios)")
+    parser.add_argument('--delay', type=float, default=0.0, help="atraso dos stubs antes de ficarem prontos (s)")
+    parser.add_argument('--hang', type=float, default=0.0, help="fração de Xephyr que ignoram o SIGTERM")
+    parser.add_argument('--crash', type=float, default=0.0, help="fração de Xephyr que caem sozinhos")
+    parser.add_argument('--crash-after', type=float, default=0.5, help="segundos até as quedas")
+    parser.add_argument('--hold', type=float, default=0.0,
+                        help="segundos rodando antes de parar (padrão: crash-after, se houver quedas)")
+    parser.add_argument('--timeout', type=float, default=120.0, help="prazo para todas ficarem prontas")
+    parser.add_argument('--seed', default="0", help="semente do sorteio de travamentos e quedas")
+    parser.add_argument('--output', help="também grava o JSON neste arquivo")
+    args = parser.parse_args()
+    if args.crash and not args.hold:
+        args.hold = args.crash_after + 0.5
+
+    workdir = tempfile.mkdtemp(prefix='bench-lifecycle-')
+    hub_path = os.path.join(workdir, 'hub.sock')
+    os.environ['PATH'] = STUBS_DIR + os.pathsep + os.environ.get('PATH', '')
+    os.environ.update({
+        'STUB_X_HUB': hub_path,
+        'STUB_SEED': str(args.seed),
+        'STUB_XEPHYR_DELAY': str(args.delay),
+        'STUB_XEPHYR_HANG': str(args.hang),
+        'STUB_XEPHYR_CRASH': str(args.crash),
+        'STUB_XEPHYR_CRASH_AFTER': str(args.crash_after),
+        'STUB_XFWM4_DELAY': str(args.delay)
+    })
+
+    results = {}
+    hub = start_hub(hub_path)
+    try:
+        # Mensagens do gerenciador (de todas as threads) não podem se misturar ao JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            manager = XephyrManager(os.path.join(workdir, 'config.json'))
+            if args.admission:
+                manager.admission.settings['enabled'] = True
+            clock = StateClock()
+            manager.subscribe(clock)
+            for count in args.counts:
+                results[str(count)] = run_count(manager, clock, count, args)
+            manager.flush_config()
+    finally:
+        hub.terminate()
+        hub.wait()
+
+    output = json.dumps({
+        'resolution': f"{args.width}x{args.height}",
+        'command': args.command,
+        'concurrency': args.concurrency or manager.launch_concurrency,
+        'admission': manager.admission.enabled,
+        'stubs': {'delay': args.delay, 'hang': args.hang, 'crash': args.crash,
+                  'crash_after': args.crash_after, 'seed': args.seed},
+        'counts': results
+    }, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Benchmark dos perfis de lançamento do servidor X
+
+Para cada perfil, inicia o servidor (sem xfwm4 nem comandos) várias vezes
+e mede o tempo até o socket aceitar conexões e o handshake X responder;
+depois deixa o display parado e mede CPU e memória (RSS/PSS) ociosos. Usa
+os perfis da configuração, então perfis personalizados também podem ser
+comparados. Requer o Xephyr (e um display X no host) ou o Xvfb.
+
+Uso: python benchmarks/bench_profiles.py [--backend xephyr] [--profiles default lean] [--runs 5] [--idle 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from display_backends import BACKENDS, get_backend, resolve_profile
+from x11_client import X11Connection, X11Error, display_socket_ready
+from xephyr_manager import XephyrManager
+
+
+def wait_handshake(display_num: int, timeout: float) -> bool:
+    """Aguarda o socket e o handshake X (o socket pode aceitar antes do servidor responder)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if display_socket_ready(display_num):
+            try:
+                with X11Connection(display_num):
+                    return True
+            except (OSError, X11Error):
+                pass
+        time.sleep(0.01)
+    return False
+
+
+def idle_usage(process: subprocess.Popen, seconds: float) -> dict:
+    """CPU (% de um núcleo) e memória do servidor parado por 'seconds'"""
+    proc = psutil.Process(process.pid)
+    before = proc.cpu_times()
+    time.sleep(seconds)
+    after = proc.cpu_times()
+    cpu = max(0.0, after.user + after.system - before.user - before.system) / seconds * 100
+    try:
+        memory = proc.memory_full_info()
+        pss = memory.pss
+    except (psutil.Error, AttributeError):
+        memory = proc.memory_info()
+        pss = None
+    return {'cpu_percent': cpu, 'rss': memory.rss, 'pss': pss}
+
+
+def run_profile(backend, profile: dict, display_num: int, args) -> dict:
+    startups = []
+    idle = []
+    failures = 0
+    for run in range(args.runs):
+        cmd = backend.command(display_num, args.width, args.height, f"bench :{display_num}", profile)
+        backend.prepare(display_num)
+        start = time.perf_counter()
+        process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_handshake(display_num, args.timeout):
+                failures += 1
+                continue
+            startups.append(time.perf_counter() - start)
+            # Só a última execução mede o consumo ocioso, depois do aquecimento das anteriores
+            if run == args.runs - 1:
+                idle.append(idle_usage(process, args.idle))
+        finally:
+            process.terminate()
+            try:
+                process.wait(5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            backend.cleanup(display_num)
+
+    startups.sort()
+    result = {'command': cmd, 'runs': len(startups), 'failures': failures}
+    if startups:
+        result.update({
+            'startup_mean_ms': sum(startups) / len(startups) * 1000,
+            'startup_p50_ms': startups[len(startups) // 2] * 1000,
+            'startup_max_ms': startups[-1] * 1000
+        })
+    if idle:
+        result.update({
+            'idle_cpu_percent': idle[0]['cpu_percent'],
+            'idle_rss_mb': idle[0]['rss'] / 1024 / 1024,
+            'idle_pss_mb': idle[0]['pss'] / 1024 / 1024 if idle[0]['pss'] is not None else None
+        })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', default="xephyr_config.json", help="configuração de onde vêm os perfis")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='xephyr')
+    parser.add_argument('--profiles', nargs='*', help="perfis comparados (padrão: todos)")
+    parser.add_argument('--runs', type=int, default=5, help="inícios por perfil")
+    parser.add_argument('--idle', type=float, default=5.0, help="segundos medindo o consumo ocioso")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--display', type=int, default=190, help="display usado nas medições")
+    parser.add_argument('--timeout', type=float, default=10.0)
+    args = parser.parse_args()
+
+    # Só lê os perfis: o gerenciador não inicia nada
+    manager = XephyrManager(args.config)
+    profiles = manager.get_profiles()
+    names = args.profiles or sorted(profiles)
+    backend = get_backend(args.backend, manager.xvfb_settings)
+
+    results = {}
+    for name in names:
+        results[name] = run_profile(backend, resolve_profile(profiles, name), args.display, args)
+
+    measured = {name: result for name, result in results.items() if 'idle_rss_mb' in result}
+    print(json.dumps({
+        'backend': args.backend,
+        'resolution': f"{args.width}x{args.height}",
+        'runs': args.runs,
+        'idle_seconds': args.idle,
+        'profiles': results,
+        'fastest_startup': min(measured, key=lambda name: measured[name]['startup_mean_ms'], default=None),
+        'lowest_idle_rss': min(measured, key=lambda name: measured[name]['idle_rss_mb'], default=None),
+        'lowest_idle_cpu': min(measured, key=lambda name: measured[name]['idle_cpu_percent'], default=None)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
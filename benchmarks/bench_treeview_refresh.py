@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Micro-benchmark da atualização da lista de instâncias do XephyrGUI
+
+Compara a atualização antiga (apaga e reinsere todas as linhas) com a
+atualização incremental de XephyrGUI.update_instances_list em uma lista de
+1.000 instâncias em que apenas algumas mudam de status a cada rodada.
+Requer um display X (pode ser um Xephyr/Xvfb).
+
+Uso: python benchmarks/bench_treeview_refresh.py [--rows 1000] [--rounds 20]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tkinter as tk
+from tkinter import ttk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gui import XephyrGUI
+
+
+class FakeManager:
+    """Fornece get_instances() sintético no mesmo formato do XephyrManager"""
+
+    def __init__(self, rows: int):
+        self.rows = [{
+            'display': display,
+            'running': display % 2 == 0,
+            'pid': None,
+            'width': 1920,
+            'height': 1080,
+            'name': f"Tibia - {display}",
+            'command': "",
+            'usb_port': "",
+            'resources': None
+        } for display in range(1, rows + 1)]
+        self.round = 0
+
+    def toggle_some(self, count: int):
+        # Muda o status de poucas linhas por rodada, como acontece na prática
+        for i in range(count):
+            row = self.rows[(self.round * count + i) % len(self.rows)]
+            row['running'] = not row['running']
+        self.round += 1
+
+    def get_instances(self):
+        return [dict(row) for row in self.rows]
+
+
+def legacy_update(gui):
+    """Atualização antiga: apaga tudo, reinsere e reaplica seleção e tags"""
+    selected_items = gui.tree.selection()
+    selected_displays = []
+    for item in selected_items:
+        values = gui.tree.item(item)['values']
+        if values:
+            selected_displays.append(values[1])
+
+    for item in gui.tree.get_children():
+        gui.tree.delete(item)
+
+    for instance in gui.manager.get_instances():
+        name = instance['name']
+        display = f":{instance['display']}"
+        status = "Rodando" if instance['running'] else "Parada"
+        resolution = f"{instance['width']}x{instance['height']}"
+        command = instance['command'] if instance['command'] else "-"
+        usb_port = instance['usb_port'] if instance['usb_port'] else "-"
+        resources = XephyrGUI.format_resources(instance['resources'])
+        tags = ('running',) if instance['running'] else ('stopped',)
+        item = gui.tree.insert('', tk.END, values=(name, display, status, resolution, command, usb_port) + resources, tags=tags)
+        if display in selected_displays:
+            gui.tree.selection_add(item)
+
+    gui.tree.tag_configure('running', foreground='green')
+    gui.tree.tag_configure('stopped', foreground='red')
+
+
+def make_gui(root, rows: int):
+    """Cria um XephyrGUI mínimo, só com a Treeview, sem tocar no XephyrManager real"""
+    gui = XephyrGUI.__new__(XephyrGUI)
+    gui.root = root
+    gui.manager = FakeManager(rows)
+    columns = ('Nome', 'Display', 'Status', 'Resolução', 'Comando', 'USB', 'CPU', 'RAM', 'Threads', 'FDs')
+    gui.tree = ttk.Treeview(root, columns=columns, show='headings', height=15)
+    gui.tree.pack()
+    gui.tree.tag_configure('running', foreground='green')
+    gui.tree.tag_configure('stopped', foreground='red')
+    gui.row_cache = {}
+    return gui
+
+
+def measure(root, update, rows: int, rounds: int, changes: int) -> dict:
+    gui = make_gui(root, rows)
+    update(gui)
+    root.update()
+
+    timings = []
+    for _ in range(rounds):
+        gui.manager.toggle_some(changes)
+        start = time.perf_counter()
+        update(gui)
+        root.update_idletasks()
+        timings.append(time.perf_counter() - start)
+
+    gui.tree.destroy()
+    timings.sort()
+    return {
+        'mean_ms': sum(timings) / len(timings) * 1000,
+        'p50_ms': timings[len(timings) // 2] * 1000,
+        'max_ms': timings[-1] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--changes', type=int, default=10, help="linhas alteradas por rodada")
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    try:
+        results = {
+            'rows': args.rows,
+            'rounds': args.rounds,
+            'changes_per_round': args.changes,
+            'before': measure(root, legacy_update, args.rows, args.rounds, args.changes),
+            'after': measure(root, XephyrGUI.update_instances_list, args.rows, args.rounds, args.changes)
+        }
+    finally:
+        root.destroy()
+
+    results['speedup'] = results['before']['mean_ms'] / max(results['after']['mean_ms'], 1e-9)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
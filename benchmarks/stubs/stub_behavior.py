@@ -0,0 +1,54 @@
+"""Comportamento configurável dos stubs do Xephyr e do xfwm4
+
+Depois de se registrar, cada stub troca a própria imagem (exec) por um
+'sleep', mantendo o PID que o gerenciador rastreia e a conexão herdada;
+assim centenas de instâncias não custam um interpretador Python cada. As
+variáveis de ambiente com o prefixo do stub (STUB_XEPHYR ou STUB_XFWM4)
+escolhem o que acontece:
+
+    <PREFIXO>_DELAY        segundos antes de registrar o display / o WM
+    <PREFIXO>_HANG         fração das instâncias que ignoram o SIGTERM
+    <PREFIXO>_CRASH        fração das instâncias que caem sozinhas
+    <PREFIXO>_CRASH_AFTER  segundos até a queda (padrão 1)
+    STUB_SEED              semente do sorteio (por display, reprodutível)
+"""
+import os
+import random
+import signal
+import time
+from typing import List
+
+
+def _setting(prefix: str, name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(f"{prefix}_{name}", default))
+    except ValueError:
+        return default
+
+
+def startup_delay(prefix: str):
+    delay = _setting(prefix, 'DELAY', 0.0)
+    if delay > 0:
+        time.sleep(delay)
+
+
+def _final_command(prefix: str, display_num: int) -> List[str]:
+    chooser = random.Random(f"{os.environ.get('STUB_SEED', '0')}:{prefix}:{display_num}")
+    draw = chooser.random()
+    hang = _setting(prefix, 'HANG', 0.0)
+    crash = _setting(prefix, 'CRASH', 0.0)
+    if draw < hang:
+        # Ignorado antes do exec continua ignorado no 'sleep': só o SIGKILL encerra
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        return ['sleep', 'infinity']
+    if draw < hang + crash:
+        after = _setting(prefix, 'CRASH_AFTER', 1.0)
+        return ['sh', '-c', 'sleep "$0"; exit 1', str(after)]
+    return ['sleep', 'infinity']
+
+
+def become_idle(prefix: str, display_num: int, keep_fd: int):
+    """Troca o stub pelo processo final, herdando 'keep_fd' (registro ou conexão X)"""
+    os.set_inheritable(keep_fd, True)
+    command = _final_command(prefix, display_num)
+    os.execvp(command[0], command)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""Servidor X falso que atende os displays de todos os stubs do Xephyr
+
+Um único processo responde em /tmp/.X11-unix/X<n> por cada stub registrado,
+em vez de um interpretador Python por display: com centenas de instâncias
+os stubs só custam um 'sleep' cada. O stub do Xephyr se conecta ao socket
+de controle, envia "<display> <largura> <altura>" e recebe "ok" quando o
+socket do display já aceita conexões; a conexão de controle fica aberta
+enquanto o processo do stub viver. Quando ela fecha (SIGTERM, SIGKILL ou
+queda), o display é derrubado e o socket removido, como faria o Xephyr.
+
+Responde só ao handshake e às requisições que o gerenciador e a detecção
+de prontidão usam (átomos, propriedades, seleções, foco, extensões,
+geometria, árvore e máscara de eventos da raiz); as demais recebem
+BadRequest.
+
+Uso: python benchmarks/stubs/stub_x_hub.py /tmp/stub-x-hub.sock
+"""
+import os
+import resource
+import selectors
+import signal
+import socket
+import struct
+import sys
+from typing import Dict, Optional
+
+ROOT = 0x100
+ROOT_VISUAL = 0x21
+FIRST_ATOM = 69          # Átomos 1..68 são predefinidos pelo protocolo
+BAD_REQUEST = 1
+
+
+class Display:
+    """Um display atendido pelo hub, vivo enquanto o stub estiver conectado"""
+
+    def __init__(self, num: int, width: int, height: int, control: socket.socket):
+        self.num = num
+        self.width = width
+        self.height = height
+        self.control = control
+        self.path = f"/tmp/.X11-unix/X{num}"
+        # seleção -> (janela dona, cliente dono)
+        self.selections: Dict[int, tuple] = {}
+        self.clients = set()
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self.listener.bind(self.path)
+            self.listener.listen(64)
+            self.listener.setblocking(False)
+        except OSError:
+            self.listener.close()
+            raise
+
+
+class Client:
+    """Conexão X de um cliente de um display"""
+
+    def __init__(self, sock: socket.socket, display: Display, index: int):
+        self.sock = sock
+        self.display = display
+        self.buffer = bytearray()
+        self.ready = False
+        self.sequence = 0
+        self.id_base = ((index % 1023) + 1) << 21
+
+
+class StubXHub:
+    def __init__(self, control_path: str):
+        self.control_path = control_path
+        self.selector = selectors.DefaultSelector()
+        self.displays: Dict[int, Display] = {}
+        self.atoms: Dict[bytes, int] = {}
+        self.connections = 0
+        self.running = True
+
+    # ----- Controle -----
+
+    def serve(self):
+        os.makedirs('/tmp/.X11-unix', mode=0o1777, exist_ok=True)
+        if os.path.exists(self.control_path):
+            os.unlink(self.control_path)
+        control = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        control.bind(self.control_path)
+        control.listen(256)
+        control.setblocking(False)
+        self.selector.register(control, selectors.EVENT_READ, ('control', None))
+        try:
+            while self.running:
+                for key, _ in self.selector.select(timeout=0.5):
+                    kind, owner = key.data
+                    if kind == 'control':
+                        self._accept_control(key.fileobj)
+                    elif kind == 'registration':
+                        self._read_registration(key.fileobj, owner)
+                    elif kind == 'display':
+                        self._drop_display(owner)
+                    elif kind == 'listener':
+                        self._accept_client(owner)
+                    elif kind == 'client':
+                        self._read_client(owner)
+        finally:
+            for display in list(self.displays.values()):
+                self._drop_display(display)
+            control.close()
+            if os.path.exists(self.control_path):
+                os.unlink(self.control_path)
+
+    def _accept_control(self, control: socket.socket):
+        try:
+            sock, _ = control.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        self.selector.register(sock, selectors.EVENT_READ, ('registration', bytearray()))
+
+    def _read_registration(self, sock: socket.socket, buffer: bytearray):
+        try:
+            data = sock.recv(256)
+        except OSError:
+            data = b''
+        if not data:
+            self.selector.unregister(sock)
+            sock.close()
+            return
+        buffer.extend(data)
+        if b'\n' not in buffer:
+            return
+        self.selector.unregister(sock)
+        try:
+            num, width, height = (int(value) for value in buffer.split(b'\n', 1)[0].split())
+            if num in self.displays:
+                raise OSError(f"display :{num} já registrado")
+            display = Display(num, width, height, sock)
+        except (ValueError, OSError) as e:
+            sock.sendall(f"error {e}\n".encode())
+            sock.close()
+            return
+        self.displays[num] = display
+        self.selector.register(display.listener, selectors.EVENT_READ, ('listener', display))
+        # A partir daqui, qualquer leitura no controle é o fim do stub
+        self.selector.register(sock, selectors.EVENT_READ, ('display', display))
+        sock.sendall(b"ok\n")
+
+    def _drop_display(self, display: Display):
+        if self.displays.get(display.num) is not display:
+            return
+        del self.displays[display.num]
+        for sock in (display.control, display.listener):
+            self.selector.unregister(sock)
+            sock.close()
+        for client in list(display.clients):
+            self._close_client(client)
+        try:
+            os.unlink(display.path)
+        except OSError:
+            pass
+
+    # ----- Clientes X -----
+
+    def _accept_client(self, display: Display):
+        try:
+            sock, _ = display.listener.accept()
+        except OSError:
+            return
+        sock.setblocking(True)
+        self.connections += 1
+        client = Client(sock, display, self.connections)
+        display.clients.add(client)
+        self.selector.register(sock, selectors.EVENT_READ, ('client', client))
+
+    def _close_client(self, client: Client):
+        client.display.clients.discard(client)
+        # Seleções do cliente voltam a ficar sem dono, como no X real
+        for atom, (_, owner) in list(client.display.selections.items()):
+            if owner is client:
+                del client.display.selections[atom]
+        try:
+            self.selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+    def _read_client(self, client: Client):
+        try:
+            data = client.sock.recv(65536)
+        except OSError:
+            data = b''
+        if not data:
+            self._close_client(client)
+            return
+        client.buffer.extend(data)
+        try:
+            if not client.ready and not self._handshake(client):
+                return
+            self._process(client)
+        except (OSError, struct.error):
+            self._close_client(client)
+
+    def _handshake(self, client: Client) -> bool:
+        buffer = client.buffer
+        if len(buffer) < 12:
+            return False
+        if buffer[0] != 0x6C:
+            # Só clientes little-endian (o x11_client e os stubs)
+            raise OSError("ordem de bytes não suportada")
+        name_len, data_len = struct.unpack_from('<HH', buffer, 6)
+        size = 12 + name_len + (-name_len % 4) + data_len + (-data_len % 4)
+        if len(buffer) < size:
+            return False
+        del buffer[:size]
+        client.sock.sendall(self._setup_reply(client))
+        client.ready = True
+        return True
+
+    @staticmethod
+    def _setup_reply(client: Client) -> bytes:
+        display = client.display
+        vendor = b'stub'
+        fixed = struct.pack('<IIIIHHBBBBBBBB4x', 0, client.id_base, 0x1FFFFF, 0, len(vendor), 65535,
+                            1, 1, 0, 0, 32, 32, 8, 255)
+        pixmap_format = struct.pack('<BBB5x', 24, 32, 32)
+        screen = struct.pack('<IIIIIHHHHHHIBBBB', ROOT, 0x20, 0xFFFFFF, 0, 0, display.width, display.height,
+                             display.width * 254 // 960, display.height * 254 // 960, 1, 1, ROOT_VISUAL,
+                             0, 0, 24, 0)
+        data = fixed + vendor + pixmap_format + screen
+        return struct.pack('<BBHHH', 1, 0, 11, 0, len(data) // 4) + data
+
+    def _process(self, client: Client):
+        buffer = client.buffer
+        while len(buffer) >= 4:
+            opcode, detail, length = struct.unpack_from('<BBH', buffer, 0)
+            if length == 0:
+                # BIG-REQUESTS não é anunciada: comprimento zero é erro de protocolo
+                raise OSError("requisição sem comprimento")
+            size = length * 4
+            if len(buffer) < size:
+                return
+            body = bytes(buffer[4:size])
+            del buffer[:size]
+            client.sequence = (client.sequence + 1) & 0xFFFF
+            reply = self._handle(client, opcode, detail, body)
+            if reply:
+                client.sock.sendall(reply)
+
+    def _atom(self, name: bytes, only_if_exists: bool) -> int:
+        atom = self.atoms.get(name)
+        if atom is None and not only_if_exists:
+            atom = self.atoms[name] = FIRST_ATOM + len(self.atoms)
+        return atom or 0
+
+    def _handle(self, client: Client, opcode: int, detail: int, body: bytes) -> Optional[bytes]:
+        display = client.display
+        seq = client.sequence
+        if opcode == 2:       # ChangeWindowAttributes (máscara de eventos): nenhuma tela muda aqui
+            return None
+        if opcode == 16:      # InternAtom
+            name_len = struct.unpack_from('<H', body, 0)[0]
+            atom = self._atom(body[4:4 + name_len], bool(detail))
+            return struct.pack('<BxHII20x', 1, seq, 0, atom)
+        if opcode == 20:      # GetProperty: a raiz não tem propriedades
+            return struct.pack('<BBHIIII12x', 1, 0, seq, 0, 0, 0, 0)
+        if opcode == 22:      # SetSelectionOwner
+            owner, selection = struct.unpack_from('<II', body, 0)
+            if owner:
+                display.selections[selection] = (owner, client)
+            else:
+                display.selections.pop(selection, None)
+            return None
+        if opcode == 23:      # GetSelectionOwner
+            selection = struct.unpack_from('<I', body, 0)[0]
+            owner = display.selections.get(selection, (0, None))[0]
+            return struct.pack('<BxHII20x', 1, seq, 0, owner)
+        if opcode == 43:      # GetInputFocus
+            return struct.pack('<BBHII20x', 1, 1, seq, 0, ROOT)
+        if opcode == 98:      # QueryExtension: nenhuma extensão
+            return struct.pack('<BxHIBBBB20x', 1, seq, 0, 0, 0, 0, 0)
+        if opcode == 14:      # GetGeometry
+            return struct.pack('<BBHIIhhHHH10x', 1, 24, seq, 0, ROOT, 0, 0, display.width, display.height, 0)
+        if opcode == 15:      # QueryTree: raiz sem filhos
+            return struct.pack('<BxHIIIH14x', 1, seq, 0, ROOT, 0, 0)
+        return struct.pack('<BBHIHB21x', 0, BAD_REQUEST, seq, 0, detail, opcode)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__.strip().splitlines()[-1], file=sys.stderr)
+        sys.exit(2)
+    # Cada display usa pelo menos três descritores (socket, controle e xfwm4)
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    hub = StubXHub(sys.argv[1])
+
+    def stop(signum, frame):
+        hub.running = False
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    hub.serve()
+
+
+if __name__ == "__main__":
+    main()
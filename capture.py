@@ -0,0 +1,260 @@
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from display_backends import Framebuffer
+from x11_client import X11Connection, X11Error
+
+
+# Valores padrão da seção "capture" do arquivo de configuração
+DEFAULT_CAPTURE = {
+    'interval': 1.0,            # Intervalo de atualização das prévias na interface
+    'thumbnail_width': 160,     # Largura das miniaturas (a altura segue a proporção)
+    'ttl': 1.0,                 # Idade máxima de uma miniatura em cache
+    'use_shm': True             # Captura por memória compartilhada (MIT-SHM) quando disponível
+}
+
+# Tamanhos de miniatura com buffers de redução guardados (os menos usados saem)
+BATCH_CACHE_SIZE = 4
+
+
+class DisplayCapture:
+    """Captura a tela inteira de um display em um buffer reaproveitado
+
+    Com MIT-SHM 1.2, um memfd mapeado é anexado ao servidor (ShmAttachFd) e
+    cada ShmGetImage escreve os pixels direto nele, sem passar pelo socket.
+    Sem a extensão, GetImage lê a resposta direto no mesmo buffer. Em ambos
+    os casos nenhum buffer é alocado por quadro.
+    """
+
+    def __init__(self, display_num: int, use_shm: bool = True):
+        self.display_num = display_num
+        self.conn = X11Connection(display_num, timeout=2.0)
+        self.width = self.conn.root_width
+        self.height = self.conn.root_height
+        bits_per_pixel, scanline_pad = self.conn.pixmap_formats.get(self.conn.root_depth, (32, 32))
+        line_bits = self.width * bits_per_pixel
+        self.bytes_per_line = (line_bits + (-line_bits % scanline_pad)) // 8
+        self.bytes_per_pixel = bits_per_pixel // 8
+        self.size = self.bytes_per_line * self.height
+        self.shmseg: Optional[int] = None
+        self.buffer = None
+
+        version = self.conn.shm_version() if use_shm else None
+        if version and version >= (1, 2):
+            try:
+                fd = os.memfd_create(f'pyluiz-capture-{display_num}')
+                try:
+                    os.ftruncate(fd, self.size)
+                    self.buffer = mmap.mmap(fd, self.size)
+                    self.shmseg = self.conn.shm_attach_fd(fd)
+                finally:
+                    os.close(fd)
+            except (OSError, X11Error) as e:
+                print(f"MIT-SHM indisponível no display :{display_num} ({e}), usando GetImage")
+                self.shmseg = None
+        if self.shmseg is None:
+            self.buffer = bytearray(self.size)
+
+    @property
+    def method(self) -> str:
+        return 'shm' if self.shmseg is not None else 'getimage'
+
+    def grab(self) -> memoryview:
+        """Captura um quadro; o memoryview devolvido é sobrescrito na próxima captura"""
+        if self.shmseg is not None:
+            self.conn.shm_get_image(self.shmseg, 0, 0, self.width, self.height)
+        else:
+            self.conn.get_image_into(self.buffer, 0, 0, self.width, self.height)
+        return memoryview(self.buffer)[:self.size]
+
+    def close(self):
+        if self.shmseg is not None:
+            try:
+                self.conn.shm_detach(self.shmseg)
+            except OSError:
+                pass
+        self.conn.close()
+        if isinstance(self.buffer, mmap.mmap):
+            try:
+                self.buffer.close()
+            except BufferError:
+                pass
+
+
+class ThumbnailService:
+    """Miniaturas de todos os displays com cache por TTL e redução em lote
+
+    get_many() atualiza de uma vez só as miniaturas vencidas. Displays Xvfb
+    são lidos direto do framebuffer mapeado; os demais são capturados por
+    DisplayCapture (uma conexão e um buffer por display, mantidos entre as
+    rodadas). A redução é por amostragem, lendo só uma fração dos pixels:
+    com NumPy, quadros de mesmo tamanho são reduzidos juntos (média de 2x2
+    amostras por bloco); sem NumPy, linhas e canais são amostrados com
+    fatiamento de bytes. O resultado é RGB em PPM
+    (P6), que o Tk exibe sem dependências.
+    """
+
+    def __init__(self, settings: Optional[Dict] = None):
+        self.settings = dict(DEFAULT_CAPTURE)
+        if settings:
+            self.settings.update(settings)
+        self._captures: Dict[int, DisplayCapture] = {}
+        self._cache: Dict[int, Dict] = {}
+        self._batches: "OrderedDict[Tuple[int, int], Tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ----- Captura -----
+
+    def _grab(self, display_num: int, framebuffer: Optional[Framebuffer]) -> Optional[Tuple]:
+        """(pixels, largura, altura, bytes por linha) de um display, ou None"""
+        if framebuffer is not None:
+            if framebuffer.pixel_format != 'BGRX':
+                return None
+            return framebuffer.pixels, framebuffer.width, framebuffer.height, framebuffer.bytes_per_line
+
+        capture = self._captures.get(display_num)
+        try:
+            if capture is None:
+                capture = DisplayCapture(display_num, self.settings['use_shm'])
+                self._captures[display_num] = capture
+            if capture.bytes_per_pixel != 4:
+                return None
+            return capture.grab(), capture.width, capture.height, capture.bytes_per_line
+        except (OSError, X11Error) as e:
+            # Display fechado ou redimensionado: reconecta na próxima rodada
+            print(f"Erro ao capturar o display :{display_num}: {e}")
+            self._drop(display_num)
+            return None
+
+    def _drop(self, display_num: int):
+        capture = self._captures.pop(display_num, None)
+        if capture:
+            capture.close()
+
+    def _steps(self, width: int, height: int) -> Tuple[int, int]:
+        step = max(1, width // max(1, self.settings['thumbnail_width']))
+        return step, step
+
+    # ----- Redução -----
+
+    @staticmethod
+    def _downscale_slices(pixels: memoryview, width: int, height: int, bytes_per_line: int,
+                          step_x: int, step_y: int) -> Tuple[int, int, bytes]:
+        # Amostragem por fatiamento: cada linha amostrada vira 3 atribuições de fatia (BGRX -> RGB)
+        thumb_width = len(range(0, width, step_x))
+        thumb_height = len(range(0, height, step_y))
+        row_size = thumb_width * 3
+        out = bytearray(row_size * thumb_height)
+        stride = step_x * 4
+        for index, y in enumerate(range(0, height, step_y)):
+            row = pixels[y * bytes_per_line:y * bytes_per_line + width * 4]
+            start = index * row_size
+            out[start:start + row_size:3] = row[2::stride]
+            out[start + 1:start + row_size:3] = row[1::stride]
+            out[start + 2:start + row_size:3] = row[0::stride]
+        return thumb_width, thumb_height, bytes(out)
+
+    def _downscale_numpy(self, frames: Dict[int, Tuple]) -> Dict[int, Tuple[int, int, bytes]]:
+        # Quadros com a mesma geometria são reduzidos juntos em buffers reaproveitados;
+        # cada pixel da miniatura é a média de 2x2 amostras do seu bloco
+        groups: Dict[Tuple, List[int]] = {}
+        for display_num, (pixels, width, height, bytes_per_line) in frames.items():
+            groups.setdefault((width, height, bytes_per_line), []).append(display_num)
+
+        results = {}
+        for (width, height, bytes_per_line), displays in groups.items():
+            step_x, step_y = self._steps(width, height)
+            thumb_width, thumb_height = width // step_x, height // step_y
+            accumulator, batch = self._batch_buffers(thumb_width, thumb_height, len(displays))
+            half_x, half_y = step_x // 2, step_y // 2
+            for index, display_num in enumerate(displays):
+                rows = np.frombuffer(frames[display_num][0], dtype=np.uint8, count=bytes_per_line * height)
+                image = rows.reshape(height, bytes_per_line)[:thumb_height * step_y, :thumb_width * step_x * 4] \
+                    .reshape(thumb_height * step_y, thumb_width * step_x, 4)
+                # BGRX -> RGB invertendo os três primeiros canais
+                np.copyto(accumulator, image[0::step_y, 0::step_x, 2::-1])
+                accumulator += image[half_y::step_y, 0::step_x, 2::-1]
+                accumulator += image[0::step_y, half_x::step_x, 2::-1]
+                accumulator += image[half_y::step_y, half_x::step_x, 2::-1]
+                accumulator >>= 2
+                batch[index] = accumulator
+            for index, display_num in enumerate(displays):
+                results[display_num] = (thumb_width, thumb_height, batch[index].tobytes())
+        return results
+
+    def _batch_buffers(self, thumb_width: int, thumb_height: int, count: int) -> Tuple:
+        """Acumulador e lote (com espaço para pelo menos 'count' quadros) do tamanho de miniatura"""
+        key = (thumb_height, thumb_width)
+        buffers = self._batches.get(key)
+        if buffers is None or len(buffers[1]) < count:
+            buffers = (np.empty((thumb_height, thumb_width, 3), dtype=np.uint16),
+                       np.empty((count, thumb_height, thumb_width, 3), dtype=np.uint8))
+            self._batches[key] = buffers
+        self._batches.move_to_end(key)
+        while len(self._batches) > BATCH_CACHE_SIZE:
+            self._batches.popitem(last=False)
+        return buffers
+
+    # ----- Cache -----
+
+    def get_many(self, sources: Dict[int, Optional[Framebuffer]], max_age: Optional[float] = None) -> Dict[int, Dict]:
+        """Miniaturas dos displays em 'sources' (display -> framebuffer Xvfb ou None)
+
+        Só os displays com miniatura mais velha que 'max_age' (padrão: 'ttl')
+        são capturados, todos na mesma rodada. Cada miniatura é
+        {'width', 'height', 'time', 'ppm'}.
+        """
+        max_age = self.settings['ttl'] if max_age is None else max_age
+        now = time.monotonic()
+        with self._lock:
+            stale = [display_num for display_num in sources
+                     if now - self._cache.get(display_num, {}).get('time', float('-inf')) > max_age]
+
+            frames = {}
+            for display_num in stale:
+                frame = self._grab(display_num, sources[display_num])
+                if frame:
+                    frames[display_num] = frame
+
+            if np is not None:
+                reduced = self._downscale_numpy(frames)
+            else:
+                reduced = {display_num: self._downscale_slices(*frame, *self._steps(frame[1], frame[2]))
+                           for display_num, frame in frames.items()}
+
+            for display_num, (width, height, rgb) in reduced.items():
+                self._cache[display_num] = {
+                    'width': width,
+                    'height': height,
+                    'time': now,
+                    'ppm': f'P6 {width} {height} 255\n'.encode('ascii') + rgb
+                }
+            return {display_num: dict(self._cache[display_num]) for display_num in sources
+                    if display_num in self._cache}
+
+    def methods(self) -> Dict[int, str]:
+        """Método de captura de cada display conectado ('shm' ou 'getimage')"""
+        with self._lock:
+            return {display_num: capture.method for display_num, capture in self._captures.items()}
+
+    def forget(self, display_num: int):
+        """Fecha a conexão de captura e descarta a miniatura (parada ou remoção)"""
+        with self._lock:
+            self._drop(display_num)
+            self._cache.pop(display_num, None)
+
+    def close(self):
+        with self._lock:
+            for display_num in list(self._captures):
+                self._drop(display_num)
+            self._cache.clear()
+            self._batches.clear()
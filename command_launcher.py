@@ -0,0 +1,185 @@
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import threading
+from typing import Dict, List, Optional, Set
+
+
+# Caracteres que exigem um shell de verdade (pipes, redirecionamentos, variáveis, globs...)
+SHELL_SYNTAX_RE = re.compile(r'[|&;<>()$`*?\[\]{}\n]')
+SECTION_MARKER = b'\0__PYLUIZ_SECTION__\0'
+# Arquivos cuja alteração invalida o snapshot do shell
+SHELL_RC_FILES = ('~/.bashrc', '~/.bash_aliases', '~/.profile', '~/.bash_profile')
+# Variáveis do próprio bash capturado que não devem vazar para os comandos
+SHELL_ONLY_VARS = ('_', 'SHLVL', 'OLDPWD', 'PS1')
+
+
+class CommandLauncher:
+    """Executa comandos do usuário sem abrir um bash interativo por comando
+
+    Um único 'bash -i' captura os aliases, os nomes de funções e o ambiente
+    do shell do usuário (PATH do .bashrc etc.). Esse snapshot fica em cache
+    até algum arquivo de inicialização do shell mudar ou invalidate() ser
+    chamado. Cada comando tem o alias do primeiro termo expandido e é
+    quebrado em argv com shlex: comandos simples são executados diretamente,
+    comandos com sintaxe de shell ou builtins usam 'bash -c' (não
+    interativo) e só funções do .bashrc ainda passam por 'bash -i -c'.
+    """
+
+    def __init__(self, capture_timeout: float = 10.0):
+        self.capture_timeout = capture_timeout
+        self._aliases: Optional[Dict[str, str]] = None
+        self._functions: Set[str] = set()
+        self._environment: Optional[Dict[str, str]] = None
+        self._rc_mtimes: Dict[str, float] = {}
+        self._resolved: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    # ----- Snapshot do shell -----
+
+    @staticmethod
+    def _current_rc_mtimes() -> Dict[str, float]:
+        mtimes = {}
+        for path in SHELL_RC_FILES:
+            try:
+                mtimes[path] = os.stat(os.path.expanduser(path)).st_mtime
+            except OSError:
+                pass
+        return mtimes
+
+    def invalidate(self):
+        """Descarta o snapshot; o próximo comando captura o shell de novo"""
+        with self._lock:
+            self._aliases = None
+            self._environment = None
+            self._resolved = {}
+
+    def _ensure_snapshot(self):
+        # Chamado com self._lock
+        mtimes = self._current_rc_mtimes()
+        if self._aliases is not None and mtimes == self._rc_mtimes:
+            return
+        self._aliases, self._functions, self._environment = self._capture()
+        self._rc_mtimes = mtimes
+        self._resolved = {}
+
+    def _capture(self):
+        """Roda um bash interativo uma vez e lê aliases, funções e variáveis de ambiente"""
+        marker = "printf '\\0__PYLUIZ_SECTION__\\0'"
+        script = f"alias -p; {marker}; declare -F; {marker}; env -0"
+        try:
+            result = subprocess.run(
+                ['bash', '-i', '-c', script],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                timeout=self.capture_timeout
+            )
+            aliases_part, _, rest = result.stdout.partition(SECTION_MARKER)
+            functions_part, _, env_part = rest.partition(SECTION_MARKER)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"Não foi possível capturar o ambiente do shell: {e}")
+            return {}, set(), dict(os.environ)
+
+        aliases = {}
+        for line in aliases_part.decode('utf-8', 'replace').splitlines():
+            if not line.startswith('alias '):
+                continue
+            try:
+                definition = shlex.split(line[len('alias '):])[0]
+            except (ValueError, IndexError):
+                continue
+            name, _, value = definition.partition('=')
+            aliases[name] = value
+
+        # Linhas de 'declare -F' no formato "declare -f nome"
+        functions = {line.split()[-1] for line in functions_part.decode('utf-8', 'replace').splitlines()
+                     if line.startswith('declare -f')}
+
+        environment = {}
+        for item in env_part.split(b'\0'):
+            name, sep, value = item.decode('utf-8', 'replace').partition('=')
+            if sep and name not in SHELL_ONLY_VARS:
+                environment[name] = value
+        return aliases, functions, environment or dict(os.environ)
+
+    def environment(self, overrides: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Ambiente do shell do usuário com as variáveis da instância por cima"""
+        with self._lock:
+            self._ensure_snapshot()
+            env = dict(self._environment)
+        if overrides:
+            env.update(overrides)
+        return env
+
+    # ----- Resolução de comandos -----
+
+    def _expand_alias(self, command: str) -> str:
+        # Expande o primeiro termo como o bash faz (aliases encadeados, sem laço)
+        seen = set()
+        while True:
+            first, _, rest = command.strip().partition(' ')
+            if first in seen or first not in self._aliases:
+                return command
+            seen.add(first)
+            command = f"{self._aliases[first]} {rest}".strip()
+
+    def resolve(self, command: str) -> List[str]:
+        """Transforma a linha de comando em argv, evitando o shell sempre que possível"""
+        with self._lock:
+            self._ensure_snapshot()
+            cached = self._resolved.get(command)
+            if cached is not None:
+                return list(cached)
+            expanded = self._expand_alias(command)
+            path = self._environment.get('PATH', os.defpath)
+            functions = self._functions
+
+        try:
+            words = shlex.split(expanded)
+        except ValueError:
+            words = []
+
+        if words and words[0] in functions:
+            # Função definida no .bashrc: só um shell interativo a conhece
+            argv = ['bash', '-i', '-c', command]
+        elif (words and '=' not in words[0] and not SHELL_SYNTAX_RE.search(expanded)
+              and (shutil.which(words[0], path=path) or '/' in words[0])):
+            argv = [os.path.expanduser(word) if word.startswith('~') else word for word in words]
+        else:
+            # Sintaxe de shell, builtins e atribuições (VAR=valor programa)
+            argv = ['bash', '-c', expanded]
+
+        with self._lock:
+            self._resolved[command] = argv
+        return list(argv)
+
+    def launch(self, command: str, env_overrides: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+        """Inicia o comando sem saída, em um novo grupo de processos (setsid)
+
+        Nada roda no filho entre o fork e o exec: os limites de recursos da
+        instância são aplicados pelo pai logo depois (ver ResourceLimiter.apply).
+        """
+        return subprocess.Popen(
+            self.resolve(command),
+            env=self.environment(env_overrides),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+
+
+_default_launcher: Optional[CommandLauncher] = None
+_default_lock = threading.Lock()
+
+
+def get_launcher() -> CommandLauncher:
+    """Launcher compartilhado pelo processo (um snapshot do shell para todos)"""
+    global _default_launcher
+    with _default_lock:
+        if _default_launcher is None:
+            _default_launcher = CommandLauncher()
+        return _default_launcher
@@ -0,0 +1,142 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+from typing import Callable, Dict, List, Optional
+
+
+class ConfigStore:
+    """Persistência do arquivo de configuração com escrita agrupada e atômica
+
+    Cada pedido de gravação apenas marca o estado como sujo; as gravações
+    pedidas dentro de 'delay' segundos viram uma única escrita. A escrita
+    vai para um arquivo temporário no mesmo diretório, recebe fsync e
+    substitui o original com os.replace, então uma queda no meio nunca
+    deixa um JSON pela metade. Sem pedido pendente, flush() não grava nada;
+    conteúdo idêntico ao último gravado (ou ao lido em load()) não é
+    reescrito, e cada gravação incrementa o campo 'version'.
+    """
+
+    def __init__(self, path: str, snapshot: Callable[[], Dict], delay: float = 0.5):
+        self.path = path
+        # snapshot() -> dicionário com o estado atual a ser gravado
+        self._snapshot = snapshot
+        self.delay = delay
+        self.version = 0
+        self.writes = 0
+        self._last_written: Optional[str] = None
+        # Há um pedido de gravação ainda não atendido
+        self._pending = False
+        self._timer: Optional[threading.Timer] = None
+        self._timer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def load(self) -> Optional[Dict]:
+        """Lê o arquivo; retorna None se ele não existir"""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.version = data.get('version', 0)
+        # Mesma serialização de _write, para um gerenciador só de leitura não regravar o arquivo
+        self._last_written = self._serialize({key: value for key, value in data.items() if key != 'version'})
+        return data
+
+    @staticmethod
+    def _serialize(data: Dict) -> str:
+        return json.dumps(data, indent=2, ensure_ascii=False)
+
+    def schedule(self):
+        """Pede uma gravação; pedidos próximos são agrupados em uma só"""
+        with self._timer_lock:
+            self._pending = True
+        if self.delay <= 0:
+            self.flush()
+            return
+        with self._timer_lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.delay, self._timer_fired)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _timer_fired(self):
+        with self._timer_lock:
+            self._timer = None
+            self._pending = False
+        self._write()
+
+    def flush(self):
+        """Grava agora o que estiver pendente (usado no encerramento)"""
+        with self._timer_lock:
+            timer, self._timer = self._timer, None
+            pending, self._pending = self._pending, False
+        if timer is not None:
+            timer.cancel()
+        if pending:
+            self._write()
+
+    def _write(self):
+        with self._write_lock:
+            try:
+                data = self._snapshot()
+                content = self._serialize(data)
+                if content == self._last_written:
+                    return
+
+                # A versão não entra na comparação acima
+                data['version'] = self.version + 1
+                self._atomic_write(self._serialize(data))
+                self.version += 1
+                self.writes += 1
+                self._last_written = content
+            except Exception as e:
+                print(f"Erro ao salvar configurações: {e}")
+
+    def record_event(self, display_num: int, event_type: str, returncode: Optional[int] = None):
+        """O arquivo JSON não guarda histórico de ciclo de vida (ver SQLiteStore)"""
+
+    def crash_counts(self, since: float, minimum: int = 1) -> Dict[int, int]:
+        return {}
+
+    def history(self, display_num: int, limit: int = 100) -> List[Dict]:
+        return []
+
+    def _atomic_write(self, content: str):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix='.' + os.path.basename(self.path) + '.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                # mkstemp cria com 0600; mantém as permissões do arquivo original
+                if os.path.exists(self.path):
+                    os.fchmod(f.fileno(), os.stat(self.path).st_mode & 0o777)
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+        # Garante que a troca de nome também chegou ao disco
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(dir_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
+
+
+def open_store(path: str, snapshot: Callable[[], Dict], delay: float = 0.5) -> ConfigStore:
+    """Escolhe o backend pela extensão: .db/.sqlite/.sqlite3 usam SQLite, o resto JSON"""
+    if os.path.splitext(path)[1].lower() in ('.db', '.sqlite', '.sqlite3'):
+        from sqlite_store import SQLiteStore
+        return SQLiteStore(path, snapshot, delay)
+    return ConfigStore(path, snapshot, delay)
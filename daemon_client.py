@@ -0,0 +1,306 @@
+import base64
+import json
+import os
+import socket
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+from capture import DEFAULT_CAPTURE
+from display_backends import Framebuffer
+
+
+def default_socket_path() -> str:
+    """Socket do daemon: $XDG_RUNTIME_DIR/pyluiz-manager.sock ou /tmp por usuário"""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, 'pyluiz-manager.sock')
+    return f"/tmp/pyluiz-manager-{os.getuid()}.sock"
+
+
+class DaemonError(Exception):
+    """Erro retornado pelo daemon ou falha de comunicação"""
+
+
+# Métodos que podem levar bem mais que o prazo padrão (lotes, paradas e
+# redimensionamentos com reinício, inclusive via update): aguardam a resposta sem prazo
+UNBOUNDED_METHODS = {'start', 'stop', 'remove', 'resize', 'update'}
+# Espera entre tentativas de reconectar a conexão de eventos (dobra até o máximo)
+EVENTS_RETRY_INITIAL = 1.0
+EVENTS_RETRY_MAX = 30.0
+
+
+class DaemonClient:
+    """Cliente síncrono do protocolo de linhas JSON do daemon"""
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = 60.0):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._connect()
+
+    def _connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        try:
+            self.sock.connect(self.socket_path)
+        except OSError:
+            self.sock.close()
+            raise
+        self._file = self.sock.makefile('rb')
+
+    def close(self):
+        try:
+            self._file.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+    def _send(self, method: str, params: Dict) -> int:
+        self._next_id += 1
+        message = {'id': self._next_id, 'method': method, 'params': params}
+        self.sock.sendall(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+        return self._next_id
+
+    def _read(self) -> Dict:
+        line = self._file.readline()
+        if not line:
+            raise DaemonError("Conexão com o daemon encerrada")
+        return json.loads(line)
+
+    def call(self, method: str, **params):
+        """Executa um método no daemon e devolve o resultado
+
+        Um prazo esgotado vira DaemonError, como os erros do próprio daemon;
+        a conexão é refeita, já que a resposta atrasada ainda pode chegar nela.
+        """
+        with self._lock:
+            self.sock.settimeout(None if method in UNBOUNDED_METHODS else self.timeout)
+            try:
+                request_id = self._send(method, params)
+                while True:
+                    message = self._read()
+                    # Eventos não pertencem a esta chamada: conexões de chamada não assinam
+                    if message.get('id') != request_id:
+                        continue
+                    if 'error' in message:
+                        raise DaemonError(message['error'])
+                    return message.get('result')
+            except socket.timeout:
+                self.close()
+                try:
+                    self._connect()
+                except OSError:
+                    pass
+                raise DaemonError(f"O daemon não respondeu a '{method}' em {self.timeout:g}s") from None
+
+    def events(self) -> Iterator[Dict]:
+        """Assina os eventos e os entrega um a um (bloqueia; use uma conexão própria)"""
+        self.call('subscribe')
+        # Só depois da resposta: call() aplica o prazo das chamadas, e eventos podem demorar
+        self.sock.settimeout(None)
+        while True:
+            message = self._read()
+            if 'event' in message:
+                yield message['event']
+
+
+def daemon_available(socket_path: Optional[str] = None) -> bool:
+    """Verifica se há um daemon respondendo no socket"""
+    try:
+        client = DaemonClient(socket_path, timeout=1.0)
+    except OSError:
+        return False
+    try:
+        return client.call('ping') == 'pong'
+    except (OSError, DaemonError, ValueError):
+        return False
+    finally:
+        client.close()
+
+
+def _int_keys(report: Dict) -> Dict:
+    # JSON transforma as chaves numéricas em texto; restaura os números de display
+    if isinstance(report, dict) and 'results' in report:
+        report['results'] = {int(display): result for display, result in report['results'].items()}
+    return report
+
+
+class RemoteManager:
+    """Mesma interface do XephyrManager usada pela GUI, atendida pelo daemon"""
+
+    def __init__(self, socket_path: Optional[str] = None):
+        self.socket_path = socket_path or default_socket_path()
+        self.client = DaemonClient(self.socket_path)
+        self._callbacks: List[Callable[[Dict], None]] = []
+        self._event_thread: Optional[threading.Thread] = None
+        # Intervalo das prévias na GUI; as capturas em si seguem a configuração do daemon
+        self.capture_settings = dict(DEFAULT_CAPTURE)
+
+    def get_instances(self) -> List[Dict]:
+        return self.client.call('list')
+
+    def get_instance(self, display_num: int) -> Optional[Dict]:
+        return self.client.call('get', display=display_num)
+
+    def create_instance(self, width: int = 800, height: int = 600, name: str = "", command: str = "", usb_port: str = "",
+                        restart_policy: str = 'never', limits: Optional[Dict] = None,
+                        backend: str = 'xephyr', profile: Optional[str] = None) -> Optional[int]:
+        return self.client.call('create', width=width, height=height, name=name, command=command, usb_port=usb_port,
+                                restart_policy=restart_policy, limits=limits, backend=backend, profile=profile)
+
+    def update_instance(self, display_num: int, name: str, command: str, width: int, height: int, usb_port: str = "",
+                        restart_policy: Optional[str] = None, limits: Optional[Dict] = None,
+                        backend: Optional[str] = None, profile: Optional[str] = None) -> bool:
+        return self.client.call('update', display=display_num, name=name, command=command,
+                                width=width, height=height, usb_port=usb_port, restart_policy=restart_policy,
+                                limits=limits, backend=backend, profile=profile)
+
+    def resize_instance(self, display_num: int, width: int, height: int) -> Optional[str]:
+        return self.client.call('resize', display=display_num, width=width, height=height)
+
+    def remove_instance(self, display_num: int) -> bool:
+        return self.client.call('remove', display=display_num)
+
+    def start_instance(self, display_num: int) -> Union[bool, str]:
+        return self.client.call('start', display=display_num)
+
+    def stop_instance(self, display_num: int) -> bool:
+        return self.client.call('stop', display=display_num)
+
+    def start_many(self, display_nums: Optional[List[int]] = None, max_concurrency: Optional[int] = None) -> Dict:
+        return _int_keys(self.client.call('start', displays=display_nums, max_concurrency=max_concurrency))
+
+    def stop_many(self, display_nums: Optional[List[int]] = None, max_concurrency: Optional[int] = None) -> Dict:
+        return _int_keys(self.client.call('stop', displays=display_nums, max_concurrency=max_concurrency))
+
+    def execute_command(self, display_num: int, command: str) -> bool:
+        return self.client.call('exec', display=display_num, command=command)
+
+    def cleanup_dead_instances(self):
+        self.client.call('cleanup')
+
+    def save_config(self):
+        self.client.call('save')
+
+    def shutdown_all(self):
+        self.stop_many()
+        self.save_config()
+
+    def get_last_dimensions(self) -> tuple:
+        return tuple(self.client.call('last_dimensions'))
+
+    def get_available_usb_ports(self) -> List[str]:
+        return self.client.call('usb_ports')
+
+    def get_pool_stats(self) -> Dict:
+        return self.client.call('pool_stats')
+
+    def refresh_shell_snapshot(self):
+        self.client.call('refresh_shell')
+
+    def get_profiles(self) -> Dict[str, Dict]:
+        return self.client.call('profiles')
+
+    def get_crash_counts(self, since: Optional[float] = None, minimum: int = 1) -> Dict[int, int]:
+        counts = self.client.call('crash_counts', since=since, minimum=minimum)
+        return {int(display): count for display, count in counts.items()}
+
+    def get_history(self, display_num: int, limit: int = 100) -> List[Dict]:
+        return self.client.call('history', display=display_num, limit=limit)
+
+    def get_framebuffer_path(self, display_num: int) -> Optional[str]:
+        return self.client.call('framebuffer', display=display_num)
+
+    def get_framebuffer(self, display_num: int) -> Optional[Framebuffer]:
+        # O daemon roda na mesma máquina: o arquivo é mapeado direto neste processo
+        path = self.get_framebuffer_path(display_num)
+        if not path:
+            return None
+        try:
+            return Framebuffer(path)
+        except (OSError, ValueError) as e:
+            print(f"Não foi possível mapear o framebuffer do display :{display_num}: {e}")
+            return None
+
+    def get_thumbnails(self, display_nums: Optional[List[int]] = None) -> Dict[int, Dict]:
+        thumbnails = self.client.call('thumbnails', displays=display_nums)
+        return {
+            int(display): dict(thumbnail, ppm=base64.b64decode(thumbnail['ppm']))
+            for display, thumbnail in thumbnails.items()
+        }
+
+    def pause_instance(self, display_num: int) -> bool:
+        return self.client.call('pause', display=display_num)
+
+    def resume_instance(self, display_num: int) -> bool:
+        return self.client.call('resume', display=display_num)
+
+    # Telemetria, pool, estrangulamento e detecção de congelamento rodam no próprio daemon
+    def start_telemetry(self):
+        pass
+
+    def stop_telemetry(self):
+        pass
+
+    def start_warm_pool(self):
+        pass
+
+    def stop_warm_pool(self):
+        pass
+
+    def start_idle_throttling(self):
+        pass
+
+    def stop_idle_throttling(self):
+        pass
+
+    def start_watchdog(self):
+        pass
+
+    def stop_watchdog(self):
+        pass
+
+    def subscribe(self, callback: Callable[[Dict], None]) -> Callable[[Dict], None]:
+        self._callbacks.append(callback)
+        if self._event_thread is None:
+            self._event_thread = threading.Thread(target=self._event_loop, daemon=True)
+            self._event_thread.start()
+        return callback
+
+    def unsubscribe(self, callback: Callable[[Dict], None]):
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def _event_loop(self):
+        # Reconecta e assina de novo sempre que a conexão cai (daemon reiniciado, etc.)
+        delay = EVENTS_RETRY_INITIAL
+        while True:
+            client = None
+            try:
+                client = DaemonClient(self.socket_path)
+                for event in client.events():
+                    delay = EVENTS_RETRY_INITIAL
+                    for callback in list(self._callbacks):
+                        try:
+                            callback(event)
+                        except Exception as e:
+                            print(f"Erro ao processar evento {event.get('type')}: {e}")
+            except (OSError, DaemonError, ValueError) as e:
+                print(f"Conexão de eventos com o daemon perdida ({e}), reconectando em {delay:g}s")
+            finally:
+                if client is not None:
+                    client.close()
+            time.sleep(delay)
+            delay = min(delay * 2, EVENTS_RETRY_MAX)
+
+
+def connect_manager(config_file: str = "xephyr_config.json"):
+    """Usa o daemon quando ele estiver rodando; senão, um XephyrManager local"""
+    if daemon_available():
+        print(f"Conectado ao daemon em {default_socket_path()}")
+        return RemoteManager()
+
+    from xephyr_manager import XephyrManager
+    return XephyrManager(config_file)
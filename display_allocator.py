@@ -0,0 +1,157 @@
+import heapq
+import os
+import re
+import socket
+import threading
+from typing import Iterable, List, Optional, Set
+
+
+X11_SOCKET_DIR = '/tmp/.X11-unix'
+LOCK_DIR = '/tmp'
+SOCKET_RE = re.compile(r'^X(\d+)$')
+LOCK_RE = re.compile(r'^\.X(\d+)-lock$')
+
+
+def lock_owner(display_num: int) -> Optional[int]:
+    """PID gravado em /tmp/.X<n>-lock, ou None se não houver arquivo válido"""
+    try:
+        with open(os.path.join(LOCK_DIR, f'.X{display_num}-lock'), 'r') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Existe, mas é de outro usuário
+        return True
+    return True
+
+
+def socket_listening(display_num: int) -> bool:
+    """Verifica se há um servidor aceitando conexões no socket do display"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(0.5)
+    try:
+        sock.connect(os.path.join(X11_SOCKET_DIR, f'X{display_num}'))
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+class DisplayAllocator:
+    """Alocador de números de display com conjunto livre e reserva atômica
+
+    Uma única varredura de /tmp/.X11-unix e dos /tmp/.X<n>-lock separa os
+    displays usados por outros servidores dos restos de servidores que
+    caíram: lock com PID morto ou socket sem ninguém escutando é removido e
+    o número volta a ficar livre. Depois disso, reservar e liberar custam
+    O(log n) em um heap de números livres, sempre entregando o menor.
+    """
+
+    def __init__(self, first: int = 1):
+        self.first = first
+        self._lock = threading.Lock()
+        self._reserved: Set[int] = set()   # Números entregues por reserve()/claim()
+        self._external: Set[int] = set()   # Em uso por servidores de fora do gerenciador
+        self._free: List[int] = []         # Heap de números livres abaixo de _next
+        self._next = first                 # Números >= _next nunca foram entregues
+
+    def scan(self) -> Set[int]:
+        """Varre sockets e locks uma vez; retorna os displays usados por terceiros"""
+        candidates = set()
+        for directory, pattern in ((X11_SOCKET_DIR, SOCKET_RE), (LOCK_DIR, LOCK_RE)):
+            try:
+                names = os.listdir(directory)
+            except OSError:
+                continue
+            for name in names:
+                match = pattern.match(name)
+                if match:
+                    candidates.add(int(match.group(1)))
+
+        with self._lock:
+            candidates -= self._reserved
+
+        external = set()
+        for display_num in candidates:
+            if self._in_use(display_num):
+                external.add(display_num)
+            else:
+                self._reclaim(display_num)
+
+        with self._lock:
+            # Números externos que ficaram livres voltam ao heap
+            for display_num in self._external - external:
+                if display_num < self._next and display_num not in self._reserved:
+                    heapq.heappush(self._free, display_num)
+            self._external = external
+        return external
+
+    @staticmethod
+    def _in_use(display_num: int) -> bool:
+        pid = lock_owner(display_num)
+        if pid is not None:
+            return pid_alive(pid)
+        # Sem lock válido: só está em uso se alguém atender no socket
+        return os.path.exists(os.path.join(X11_SOCKET_DIR, f'X{display_num}')) and socket_listening(display_num)
+
+    @staticmethod
+    def _reclaim(display_num: int):
+        """Remove lock e socket deixados por um servidor que já morreu"""
+        for path in (os.path.join(LOCK_DIR, f'.X{display_num}-lock'),
+                     os.path.join(X11_SOCKET_DIR, f'X{display_num}')):
+            try:
+                os.unlink(path)
+                print(f"Removido resto de servidor X morto: {path}")
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Não foi possível remover {path}: {e}")
+
+    def claim(self, display_nums: Iterable[int]):
+        """Marca números já usados pelo gerenciador (instâncias carregadas)"""
+        with self._lock:
+            for display_num in display_nums:
+                self._reserved.add(display_num)
+                while self._next <= display_num:
+                    if self._next not in self._reserved:
+                        heapq.heappush(self._free, self._next)
+                    self._next += 1
+
+    def reserve(self) -> int:
+        """Entrega o menor número livre, exclusivo até release()"""
+        with self._lock:
+            while True:
+                if self._free:
+                    display_num = heapq.heappop(self._free)
+                else:
+                    display_num = self._next
+                    self._next += 1
+                if display_num in self._reserved or display_num in self._external:
+                    continue
+                # Outro programa pode ter aberto o display depois da varredura
+                pid = lock_owner(display_num)
+                if pid is not None and pid_alive(pid):
+                    self._external.add(display_num)
+                    continue
+                self._reserved.add(display_num)
+                return display_num
+
+    def release(self, display_num: int):
+        """Devolve o número ao conjunto livre"""
+        with self._lock:
+            if display_num not in self._reserved:
+                return
+            self._reserved.discard(display_num)
+            heapq.heappush(self._free, display_num)
+
+    def is_reserved(self, display_num: int) -> bool:
+        with self._lock:
+            return display_num in self._reserved
@@ -0,0 +1,338 @@
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from x11_client import X11Connection, X11Error
+
+
+# Valores padrão da seção "xvfb" do arquivo de configuração
+DEFAULT_XVFB = {
+    'fbdir': '',                # Diretório dos framebuffers; '' = /dev/shm/pyluiz-fb (ou /tmp)
+    'depth': 24                 # Profundidade de cor das telas Xvfb
+}
+
+# Opções aceitas em um perfil de lançamento (e o valor usado quando o perfil não a define)
+PROFILE_OPTIONS = {
+    'nolisten_tcp': False,      # -nolisten tcp: só o socket Unix, sem porta TCP
+    'noreset': False,           # -noreset: não reinicia o servidor quando o último cliente sai
+    'render': '',               # 'glamor' (GPU do host), 'software' (sem glamor e sem Xv) ou '' (padrão)
+    'depth': None,              # Profundidade de cor da tela (16 usa metade da memória de 24)
+    'dpi': None,                # -dpi fixo, em vez do calculado pelo servidor
+    'no_host_grab': False,      # -no-host-grab: Ctrl+Shift não captura teclado e mouse do host
+    'soft_cursor': False,       # -softCursor: cursor desenhado na tela em vez de -host-cursor
+    'extra_args': []            # Argumentos acrescentados ao fim da linha de comando
+}
+
+# Perfis padrão da seção "profiles" do arquivo de configuração
+DEFAULT_PROFILES = {
+    'default': {},
+    # Menos memória e CPU para instâncias que quase ninguém olha
+    'lean': {
+        'nolisten_tcp': True,
+        'noreset': True,
+        'render': 'software',
+        'depth': 16,
+        'dpi': 96,
+        'no_host_grab': True
+    },
+    'glamor': {
+        'nolisten_tcp': True,
+        'noreset': True,
+        'render': 'glamor'
+    }
+}
+
+
+def resolve_profile(profiles: Dict[str, Dict], name: str) -> Dict:
+    """Opções completas do perfil 'name'; perfil desconhecido usa os valores padrão"""
+    options = dict(PROFILE_OPTIONS)
+    if name not in profiles:
+        print(f"Perfil de lançamento '{name}' não existe, usando o padrão")
+        return options
+    for key, value in profiles[name].items():
+        if key in PROFILE_OPTIONS:
+            options[key] = value
+        else:
+            print(f"Opção '{key}' ignorada no perfil '{name}'")
+    return options
+
+
+def common_args(profile: Dict) -> List[str]:
+    """Opções do perfil entendidas por qualquer servidor X"""
+    args = []
+    if profile['nolisten_tcp']:
+        args += ['-nolisten', 'tcp']
+    if profile['noreset']:
+        args.append('-noreset')
+    if profile['dpi']:
+        args += ['-dpi', str(profile['dpi'])]
+    return args
+
+
+# Cabeçalho XWD: 25 campos CARD32 big-endian (XWDFileHeader), seguido do nome e do mapa de cores
+XWD_HEADER = struct.Struct('>25I')
+XWD_FIELDS = ('header_size', 'file_version', 'pixmap_format', 'pixmap_depth', 'pixmap_width', 'pixmap_height',
+              'xoffset', 'byte_order', 'bitmap_unit', 'bitmap_bit_order', 'bitmap_pad', 'bits_per_pixel',
+              'bytes_per_line', 'visual_class', 'red_mask', 'green_mask', 'blue_mask', 'bits_per_rgb',
+              'colormap_entries', 'ncolors', 'window_width', 'window_height', 'window_x', 'window_y',
+              'window_bdrwidth')
+XWD_COLOR_SIZE = 12
+
+# Espera máxima para a tela assumir o novo tamanho em cada método de redimensionamento
+RESIZE_TIMEOUT = 2.0
+
+
+def host_display_num() -> Optional[int]:
+    """Número do display X local do host ($DISPLAY), ou None se for remoto ou não existir"""
+    display = os.environ.get('DISPLAY', '')
+    host, _, number = display.partition(':')
+    if host not in ('', 'unix') or not number:
+        return None
+    try:
+        return int(number.split('.')[0])
+    except ValueError:
+        return None
+
+
+def wait_for_size(display_num: int, width: int, height: int, timeout: float = RESIZE_TIMEOUT) -> bool:
+    """Aguarda a raiz do display ficar com largura x altura"""
+    deadline = time.monotonic() + timeout
+    with X11Connection(display_num) as conn:
+        while True:
+            if conn.get_geometry() == (width, height):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+
+def title_matches(name: str, title: str) -> bool:
+    """Nome da janela do Xephyr com o título da instância
+
+    O Xephyr acrescenta ao título o aviso de captura do mouse entre
+    parênteses ("Tibia - 1 (ctrl+shift grabs mouse and keyboard)"); um
+    prefixo simples confundiria "Tibia - 1" com "Tibia - 10".
+    """
+    return name == title or name.startswith(title + " (")
+
+
+class XephyrBackend:
+    """Servidor aninhado: uma janela no X do host, para instâncias que alguém assiste"""
+
+    name = 'xephyr'
+    headless = False
+
+    def __init__(self, settings: Optional[Dict] = None):
+        self.settings = settings or {}
+
+    def command(self, display_num: int, width: int, height: int, title: str,
+                profile: Optional[Dict] = None) -> List[str]:
+        profile = profile or dict(PROFILE_OPTIONS)
+        screen = f'{width}x{height}'
+        if profile['depth']:
+            screen += f"x{profile['depth']}"
+        cmd = [
+            'Xephyr',
+            f':{display_num}',
+            '-ac',
+            '-screen', screen,
+            '-softCursor' if profile['soft_cursor'] else '-host-cursor',
+            # A tela acompanha o tamanho da janela no host (e a RandR interna)
+            '-resizeable',
+            '-title', title
+        ]
+        cmd += common_args(profile)
+        if profile['render'] == 'glamor':
+            cmd.append('-glamor')
+        elif profile['render'] == 'software':
+            cmd.append('-noxv')
+        if profile['no_host_grab']:
+            cmd.append('-no-host-grab')
+        return cmd + list(profile['extra_args'])
+
+    def prepare(self, display_num: int):
+        pass
+
+    def cleanup(self, display_num: int):
+        pass
+
+    def framebuffer_path(self, display_num: int) -> Optional[str]:
+        return None
+
+    def resize(self, display_num: int, width: int, height: int, titles: Sequence[str]) -> Optional[str]:
+        """Muda o tamanho da tela rodando; retorna o método que funcionou ('randr' ou 'window') ou None
+
+        Primeiro pela RandR do próprio display aninhado (tamanhos oferecidos
+        pelo Xephyr ou, na 1.2, qualquer tamanho da faixa); depois
+        redimensionando a janela do Xephyr no host, que com -resizeable
+        arrasta a tela junto. Cada método só conta se a raiz assumir o tamanho.
+        A janela no host é a que tiver um dos títulos de 'titles'.
+        """
+        for method, apply in (('randr', self._resize_randr), ('window', self._resize_host_window)):
+            try:
+                if apply(display_num, width, height, titles) and wait_for_size(display_num, width, height):
+                    return method
+            except (OSError, X11Error) as e:
+                print(f"Redimensionamento por {method} falhou no display :{display_num}: {e}")
+        return None
+
+    @staticmethod
+    def _find_host_window(conn: X11Connection, titles: Sequence[str]) -> Optional[int]:
+        """Única janela do host cujo WM_NAME corresponde a um dos títulos, ou None"""
+        # Com gerenciador de janelas no host, as janelas dos clientes estão em _NET_CLIENT_LIST
+        windows = conn.get_window_property(conn.root, '_NET_CLIENT_LIST') or conn.query_tree()
+        matches = []
+        for window in windows:
+            result = conn.get_property(window, 'WM_NAME')
+            if result and any(title_matches(result[1].decode('utf-8', 'replace'), title) for title in titles):
+                matches.append(window)
+        return matches[0] if len(matches) == 1 else None
+
+    @staticmethod
+    def _resize_randr(display_num: int, width: int, height: int, titles: Sequence[str]) -> bool:
+        with X11Connection(display_num) as conn:
+            version = conn.randr_version()
+            if not version:
+                return False
+            info = conn.randr_screen_info()
+            for index, (size_width, size_height, _, _) in enumerate(info['sizes']):
+                if (size_width, size_height) == (width, height):
+                    return conn.randr_set_screen_config(index, info['config_timestamp']) == 0
+            if version < (1, 2) or not info['sizes']:
+                return False
+            # Mantém a densidade atual (mm por pixel) no novo tamanho
+            current_width, current_height, mm_width, mm_height = info['sizes'][info['current']]
+            conn.randr_set_screen_size(width, height, mm_width * width // max(1, current_width),
+                                       mm_height * height // max(1, current_height))
+            return True
+
+    @classmethod
+    def _resize_host_window(cls, display_num: int, width: int, height: int, titles: Sequence[str]) -> bool:
+        host = host_display_num()
+        if host is None:
+            return False
+        with X11Connection(host) as conn:
+            window = cls._find_host_window(conn, titles)
+            if window is None:
+                return False
+            conn.resize_window(window, width, height)
+            return True
+
+
+class XvfbBackend(XephyrBackend):
+    """Servidor sem janela (Xvfb) com o framebuffer em um arquivo XWD mapeável
+
+    Com -fbdir, o Xvfb mantém a tela em <fbdir>/Xvfb_screen0 e desenha
+    direto nesse arquivo mapeado; em /dev/shm ele fica só na memória. Cada
+    display tem seu próprio diretório, criado no início e removido na parada.
+    """
+
+    name = 'xvfb'
+    headless = True
+
+    def base_dir(self) -> str:
+        configured = self.settings.get('fbdir')
+        if configured:
+            return configured
+        shm = '/dev/shm'
+        return os.path.join(shm if os.path.isdir(shm) else tempfile.gettempdir(), 'pyluiz-fb')
+
+    def fbdir(self, display_num: int) -> str:
+        return os.path.join(self.base_dir(), f'display-{display_num}')
+
+    def command(self, display_num: int, width: int, height: int, title: str,
+                profile: Optional[Dict] = None) -> List[str]:
+        # Sem janela no host: render, cursor e captura de teclado não se aplicam
+        profile = profile or dict(PROFILE_OPTIONS)
+        depth = profile['depth'] or self.settings.get('depth', DEFAULT_XVFB['depth'])
+        cmd = [
+            'Xvfb',
+            f':{display_num}',
+            '-ac',
+            '-screen', '0', f'{width}x{height}x{depth}',
+            '-fbdir', self.fbdir(display_num)
+        ]
+        return cmd + common_args(profile) + list(profile['extra_args'])
+
+    def prepare(self, display_num: int):
+        os.makedirs(self.fbdir(display_num), mode=0o700, exist_ok=True)
+
+    def cleanup(self, display_num: int):
+        shutil.rmtree(self.fbdir(display_num), ignore_errors=True)
+
+    def framebuffer_path(self, display_num: int) -> Optional[str]:
+        return os.path.join(self.fbdir(display_num), 'Xvfb_screen0')
+
+    def resize(self, display_num: int, width: int, height: int, titles: Sequence[str]) -> Optional[str]:
+        # O framebuffer mapeado tem o tamanho fixado no início: só reiniciando
+        return None
+
+
+BACKENDS = {backend.name: backend for backend in (XephyrBackend, XvfbBackend)}
+
+
+def get_backend(name: str, settings: Optional[Dict] = None) -> XephyrBackend:
+    """Instancia o backend pelo nome ('xephyr' ou 'xvfb')"""
+    return BACKENDS[name](settings)
+
+
+class Framebuffer:
+    """Framebuffer de um display Xvfb mapeado em memória, sem cópias
+
+    'pixels' é um memoryview somente leitura das linhas da tela dentro do
+    próprio mapeamento: cada leitura vê o que o servidor acabou de desenhar.
+    array() devolve a mesma memória como matriz NumPy (altura x largura x
+    bytes por pixel) quando o NumPy está instalado.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.header = dict(zip(XWD_FIELDS, XWD_HEADER.unpack_from(self._map, 0)))
+        except struct.error:
+            self._map.close()
+            raise ValueError(f"Cabeçalho XWD inválido em {path}")
+        self.width = self.header['pixmap_width']
+        self.height = self.header['pixmap_height']
+        self.bytes_per_line = self.header['bytes_per_line']
+        self.bytes_per_pixel = self.header['bits_per_pixel'] // 8
+        self.offset = self.header['header_size'] + self.header['ncolors'] * XWD_COLOR_SIZE
+        size = self.bytes_per_line * self.height
+        if self.offset + size > len(self._map):
+            self._map.close()
+            raise ValueError(f"Framebuffer truncado em {path}")
+        self.pixels = memoryview(self._map)[self.offset:self.offset + size]
+
+    @property
+    def pixel_format(self) -> str:
+        """Ordem dos bytes de cada pixel na memória (ex.: 'BGRX' em máquinas little-endian)"""
+        if self.bytes_per_pixel != 4 or self.header['red_mask'] != 0xFF0000:
+            return 'raw'
+        return 'BGRX' if self.header['byte_order'] == 0 else 'XRGB'
+
+    def array(self):
+        """Matriz NumPy (altura, largura, bytes por pixel) sobre o mapeamento, ou None sem NumPy"""
+        if np is None:
+            print("NumPy não está instalado: use Framebuffer.pixels (memoryview)")
+            return None
+        rows = np.frombuffer(self.pixels, dtype=np.uint8).reshape(self.height, self.bytes_per_line)
+        return rows[:, :self.width * self.bytes_per_pixel].reshape(self.height, self.width, self.bytes_per_pixel)
+
+    def close(self):
+        """Libera o mapeamento; views NumPy ainda vivas impedem o fechamento até serem descartadas"""
+        try:
+            self.pixels.release()
+            self._map.close()
+        except BufferError:
+            pass
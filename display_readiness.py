@@ -0,0 +1,101 @@
+import time
+from typing import Callable, Dict, Optional
+
+from x11_client import X11Connection, X11Error, display_socket_ready
+
+
+# Valores padrão da seção "readiness" do arquivo de configuração
+DEFAULT_READINESS = {
+    'server_timeout': 5.0,      # Socket X aparecer e aceitar conexões
+    'wm_timeout': 5.0,          # Gerenciador de janelas assumir o display
+    'window_timeout': 10.0,     # Janela do comando ser mapeada (opcional)
+    'wait_for_window': False,   # Aguarda a janela de cada comando antes do próximo
+    'fallback_delay': 2.0,      # Espera fixa usada quando não é possível observar o sinal
+    'poll_interval': 0.02
+}
+
+
+class DisplayReadiness:
+    """Aguarda os sinais reais de prontidão de um display em vez de esperas fixas"""
+
+    def __init__(self, display_num: int, settings: Optional[Dict] = None):
+        self.display_num = display_num
+        self.settings = dict(DEFAULT_READINESS)
+        if settings:
+            self.settings.update(settings)
+
+    def _wait_until(self, condition: Callable[[], bool], timeout: float) -> bool:
+        """Executa a condição até ela ser verdadeira ou o tempo acabar"""
+        deadline = time.monotonic() + timeout
+        interval = self.settings['poll_interval']
+        while True:
+            if condition():
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+
+    def _fallback(self, what: str, error: Exception):
+        print(f"Não foi possível observar {what} no display :{self.display_num} ({error}), "
+              f"aguardando {self.settings['fallback_delay']}s")
+        time.sleep(self.settings['fallback_delay'])
+
+    def wait_for_server(self) -> bool:
+        """Aguarda o socket /tmp/.X11-unix/X<n> aparecer e aceitar conexões"""
+        start = time.monotonic()
+        ready = self._wait_until(lambda: display_socket_ready(self.display_num),
+                                 self.settings['server_timeout'])
+        if ready:
+            print(f"Display :{self.display_num} pronto em {(time.monotonic() - start) * 1000:.0f}ms")
+        else:
+            print(f"Timeout aguardando o display :{self.display_num}")
+        return ready
+
+    @staticmethod
+    def _wm_running(conn: X11Connection) -> bool:
+        # EWMH: o WM publica _NET_SUPPORTING_WM_CHECK na raiz apontando para uma
+        # janela que contém a mesma propriedade. ICCCM: o WM é dono de WM_S0.
+        check = conn.get_window_property(conn.root, '_NET_SUPPORTING_WM_CHECK')
+        if check and check[0]:
+            return True
+        return conn.get_selection_owner('WM_S0') != 0
+
+    def wait_for_window_manager(self) -> bool:
+        """Aguarda o gerenciador de janelas assumir o display"""
+        start = time.monotonic()
+        try:
+            with X11Connection(self.display_num) as conn:
+                ready = self._wait_until(lambda: self._wm_running(conn), self.settings['wm_timeout'])
+        except (OSError, X11Error) as e:
+            self._fallback("o gerenciador de janelas", e)
+            return False
+
+        if ready:
+            print(f"Gerenciador de janelas pronto no display :{self.display_num} "
+                  f"em {(time.monotonic() - start) * 1000:.0f}ms")
+        else:
+            print(f"Timeout aguardando o gerenciador de janelas no display :{self.display_num}")
+        return ready
+
+    def client_window_count(self) -> Optional[int]:
+        """Quantidade de janelas gerenciadas (_NET_CLIENT_LIST) ou None se indisponível"""
+        try:
+            with X11Connection(self.display_num) as conn:
+                return len(conn.get_window_property(conn.root, '_NET_CLIENT_LIST'))
+        except (OSError, X11Error):
+            return None
+
+    def wait_for_new_window(self, previous_count: Optional[int]) -> bool:
+        """Aguarda uma nova janela ser mapeada depois de lançar um comando"""
+        if previous_count is None:
+            self._fallback("as janelas", X11Error("_NET_CLIENT_LIST indisponível"))
+            return False
+        try:
+            with X11Connection(self.display_num) as conn:
+                return self._wait_until(
+                    lambda: len(conn.get_window_property(conn.root, '_NET_CLIENT_LIST')) > previous_count,
+                    self.settings['window_timeout']
+                )
+        except (OSError, X11Error) as e:
+            self._fallback("as janelas", e)
+            return False
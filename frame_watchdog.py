@@ -0,0 +1,191 @@
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import psutil
+
+
+# Valores padrão da seção "watchdog" do arquivo de configuração
+DEFAULT_WATCHDOG = {
+    'enabled': False,
+    'interval': 5.0,            # Intervalo entre amostras de cada display
+    'frozen_after': 12,         # Amostras seguidas sem mudança (e sem CPU) até marcar como congelada
+    'cpu_threshold': 2.0,       # % de um núcleo abaixo do qual os comandos são considerados parados
+    'restart': False            # Reinicia instâncias congeladas conforme a política de reinício
+}
+
+
+class FrameWatchdog:
+    """Detecta instâncias congeladas: imagem parada e comandos sem CPU
+
+    O Xephyr pode continuar vivo com o cliente travado atrás dele. A cada
+    rodada, o CPU dos comandos (role 'app') é medido pela diferença dos
+    tempos acumulados desde a rodada anterior; só os displays com CPU abaixo
+    de 'cpu_threshold' são capturados, todos de uma vez pela função
+    'capture' (miniaturas do ThumbnailService, reaproveitando as que ainda
+    estão no cache). Cada miniatura vira um CRC32; depois de 'frozen_after'
+    rodadas seguidas com o mesmo hash e sem CPU, a instância é marcada como
+    congelada. Qualquer mudança na imagem ou CPU acima do limite a solta.
+    Instâncias sem comandos rodando não são vigiadas: uma área de trabalho
+    vazia fica parada por natureza.
+    """
+
+    def __init__(self, settings: Optional[Dict] = None,
+                 capture: Optional[Callable[[List[int], float], Dict[int, Dict]]] = None,
+                 on_change: Optional[Callable[[int, bool, Dict], None]] = None):
+        self.settings = dict(DEFAULT_WATCHDOG)
+        if settings:
+            self.settings.update(settings)
+        # Chamado com (displays, idade máxima) e devolve {display: {'ppm', ...}}
+        self.capture = capture
+        # Chamado com (display, congelada, detalhes)
+        self.on_change = on_change
+        # display -> {'hash', 'unchanged', 'since', 'frozen', 'cpu', 'cpu_time', 'sampled_at'}
+        self._states: Dict[int, Dict] = {}
+        self._lock = threading.RLock()
+        self._running = False
+
+    # ----- Amostragem -----
+
+    @staticmethod
+    def _app_cpu_time(instance) -> Optional[float]:
+        """Tempo de CPU acumulado (s) da árvore dos comandos, ou None sem comandos rodando"""
+        procs = {}
+        for process in instance.registry.processes('app'):
+            try:
+                proc = psutil.Process(process.pid)
+                procs[proc.pid] = proc
+                procs.update((child.pid, child) for child in proc.children(recursive=True))
+            except psutil.Error:
+                pass
+        if not procs:
+            return None
+        total = 0.0
+        for proc in procs.values():
+            try:
+                times = proc.cpu_times()
+                total += times.user + times.system
+            except psutil.Error:
+                pass
+        return total
+
+    def _state(self, display_num: int) -> Dict:
+        state = self._states.get(display_num)
+        if state is None:
+            state = {'hash': None, 'unchanged': 0, 'since': None, 'frozen': False,
+                     'cpu': None, 'cpu_time': None, 'sampled_at': None}
+            self._states[display_num] = state
+        return state
+
+    def _sample_cpu(self, display_num: int, instance, now: float) -> Optional[float]:
+        """% de CPU dos comandos desde a rodada anterior (None na primeira ou sem comandos)"""
+        cpu_time = self._app_cpu_time(instance)
+        state = self._state(display_num)
+        previous_time, previous_at = state['cpu_time'], state['sampled_at']
+        state['cpu_time'], state['sampled_at'] = cpu_time, now
+        if cpu_time is None or previous_time is None or now <= previous_at:
+            state['cpu'] = None
+            return None
+        # Filhos que terminaram levam o tempo deles junto: a diferença pode ser negativa
+        state['cpu'] = max(0.0, cpu_time - previous_time) / (now - previous_at) * 100
+        return state['cpu']
+
+    def _set_frozen(self, display_num: int, frozen: bool):
+        with self._lock:
+            state = self._states.get(display_num)
+            if not state or state['frozen'] == frozen:
+                return
+            state['frozen'] = frozen
+            details = {
+                'unchanged_for': round(time.monotonic() - state['since'], 1) if state['since'] else 0.0,
+                'cpu': state['cpu']
+            }
+        if frozen:
+            print(f"Instância :{display_num} congelada: imagem parada há {details['unchanged_for']}s")
+        else:
+            print(f"Instância :{display_num} voltou a responder")
+        if self.on_change:
+            self.on_change(display_num, frozen, details)
+
+    def _reset(self, display_num: int):
+        """Imagem ou CPU mudou: recomeça a contagem e solta a instância"""
+        with self._lock:
+            state = self._state(display_num)
+            state['hash'], state['unchanged'], state['since'] = None, 0, None
+        self._set_frozen(display_num, False)
+
+    def check(self, instances: List[Tuple[int, object]]):
+        """Uma rodada sobre as instâncias prontas; as capturas são feitas em lote"""
+        now = time.monotonic()
+        threshold = self.settings['cpu_threshold']
+        candidates = []
+        for display_num, instance in instances:
+            cpu = self._sample_cpu(display_num, instance, now)
+            if cpu is None or cpu > threshold:
+                self._reset(display_num)
+            else:
+                candidates.append(display_num)
+
+        # Miniaturas capturadas há menos de meio intervalo (ex.: pela pré-visualização) servem
+        thumbnails = self.capture(candidates, self.settings['interval'] / 2) if candidates and self.capture else {}
+        for display_num in candidates:
+            thumbnail = thumbnails.get(display_num)
+            if not thumbnail:
+                continue
+            digest = zlib.crc32(thumbnail['ppm'])
+            with self._lock:
+                state = self._state(display_num)
+                if digest != state['hash']:
+                    state['hash'], state['unchanged'], state['since'] = digest, 0, now
+                    changed = True
+                else:
+                    state['unchanged'] += 1
+                    changed = False
+                frozen = state['unchanged'] >= self.settings['frozen_after']
+            if changed:
+                self._set_frozen(display_num, False)
+            elif frozen:
+                self._set_frozen(display_num, True)
+
+        # Instâncias que deixaram de estar prontas
+        active = {display_num for display_num, _ in instances}
+        with self._lock:
+            gone = [display_num for display_num in self._states if display_num not in active]
+        for display_num in gone:
+            self.forget(display_num)
+
+    # ----- Consulta -----
+
+    def frozen(self, display_num: int) -> Optional[float]:
+        """Segundos desde a última mudança de imagem se a instância estiver congelada, senão None"""
+        with self._lock:
+            state = self._states.get(display_num)
+            if not state or not state['frozen']:
+                return None
+            return round(time.monotonic() - state['since'], 1)
+
+    def forget(self, display_num: int):
+        """Esquece a instância (parada, queda ou remoção) e avisa se ela estava congelada"""
+        self._set_frozen(display_num, False)
+        with self._lock:
+            self._states.pop(display_num, None)
+
+    def start(self, get_instances: Callable[[], List[Tuple[int, object]]]):
+        """Inicia as verificações periódicas em uma thread"""
+        if self._running:
+            return
+        self._running = True
+
+        def check_loop():
+            while self._running:
+                try:
+                    self.check(get_instances())
+                except Exception as e:
+                    print(f"Erro ao verificar congelamento: {e}")
+                time.sleep(self.settings['interval'])
+
+        threading.Thread(target=check_loop, daemon=True).start()
+
+    def stop(self):
+        self._running = False
@@ -1,22 +1,27 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 import threading
-import time
-from xephyr_manager import XephyrManager
+from daemon_client import connect_manager
+from admission_control import QUEUED
 
 class XephyrGUI:
     def __init__(self):
-        self.manager = XephyrManager()
+        # Cliente fino do daemon, se ele estiver rodando; senão gerencia localmente
+        self.manager = connect_manager()
         self.root = tk.Tk()
         self.setup_window()
         self.setup_widgets()
         self.load_last_dimensions()
-        self.update_thread_running = True
-        self.start_update_thread()
+        self.listening_events = True
+        self.refresh_pending = False
+        self.preview_window = None
+        self.preview_labels = {}
+        self.preview_images = {}
+        self.subscribe_to_events()
         
     def setup_window(self):
         self.root.title("Gerenciador de Instâncias Xephyr")
-        self.root.geometry("950x500")
+        self.root.geometry("1150x500")
         self.root.resizable(True, True)
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         style = ttk.Style()
@@ -98,13 +103,21 @@ class XephyrGUI:
         height_entry = ttk.Entry(dimensions_frame, textvariable=self.height_var, width=8)
         height_entry.grid(row=0, column=3, padx=5)
         
+        # Botão para iniciar todas
+        self.start_all_button = ttk.Button(
+            controls_frame,
+            text="Iniciar Todas",
+            command=self.start_all_instances
+        )
+        self.start_all_button.grid(row=2, column=0, pady=5, sticky=(tk.W, tk.E))
+        
         # Botão para parar todas
         self.stop_all_button = ttk.Button(
             controls_frame,
             text="Parar Todas",
             command=self.stop_all_instances
         )
-        self.stop_all_button.grid(row=2, column=0, pady=5, sticky=(tk.W, tk.E))
+        self.stop_all_button.grid(row=3, column=0, pady=5, sticky=(tk.W, tk.E))
         
         # Botão para limpar instâncias mortas
         self.cleanup_button = ttk.Button(
@@ -112,7 +125,15 @@ class XephyrGUI:
             text="Limpar Mortas",
             command=self.cleanup_dead_instances
         )
-        self.cleanup_button.grid(row=3, column=0, pady=5, sticky=(tk.W, tk.E))
+        self.cleanup_button.grid(row=4, column=0, pady=5, sticky=(tk.W, tk.E))
+        
+        # Botão para abrir as prévias das telas
+        self.preview_button = ttk.Button(
+            controls_frame,
+            text="Pré-visualizar",
+            command=self.open_preview_window
+        )
+        self.preview_button.grid(row=5, column=0, pady=5, sticky=(tk.W, tk.E))
         
         # Frame principal das instâncias (contém ações e lista)
         instances_main_frame = ttk.LabelFrame(main_frame, text="Gerenciamento de Instâncias", padding="10")
@@ -124,7 +145,7 @@ class XephyrGUI:
         actions_frame = ttk.Frame(instances_main_frame)
         actions_frame.grid(row=0, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
         
-        ttk.Label(actions_frame, text="Ações da Instância Selecionada:", font=('', 9, 'bold')).grid(row=0, column=0, columnspan=4, sticky=tk.W, pady=(0, 5))
+        ttk.Label(actions_frame, text="Ações da Instância Selecionada:", font=('', 9, 'bold')).grid(row=0, column=0, columnspan=5, sticky=tk.W, pady=(0, 5))
         
         self.start_button = ttk.Button(
             actions_frame,
@@ -156,7 +177,15 @@ class XephyrGUI:
             command=self.execute_command_in_instance,
             state=tk.DISABLED
         )
-        self.execute_button.grid(row=1, column=3, padx=(5, 0))
+        self.execute_button.grid(row=1, column=3, padx=5)
+        
+        self.pause_button = ttk.Button(
+            actions_frame,
+            text="Pausar/Retomar",
+            command=self.toggle_pause_selected_instance,
+            state=tk.DISABLED
+        )
+        self.pause_button.grid(row=1, column=4, padx=(5, 0))
         
         # Frame da lista de instâncias dentro do frame principal
         list_frame = ttk.Frame(instances_main_frame)
@@ -167,7 +196,7 @@ class XephyrGUI:
         ttk.Label(list_frame, text="Lista de Instâncias:", font=('', 9, 'bold')).grid(row=0, column=0, columnspan=2, sticky=tk.W, pady=(0, 5))
         
         # Treeview para listar instâncias
-        columns = ('Nome', 'Display', 'Status', 'Resolução', 'Comando', 'USB')
+        columns = ('Nome', 'Display', 'Status', 'Resolução', 'Comando', 'USB', 'CPU', 'RAM', 'Threads', 'FDs')
         self.tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=15)
         
         # Configura as colunas
@@ -177,6 +206,10 @@ class XephyrGUI:
         self.tree.heading('Resolução', text='Resolução')
         self.tree.heading('Comando', text='Comando')
         self.tree.heading('USB', text='USB')
+        self.tree.heading('CPU', text='CPU')
+        self.tree.heading('RAM', text='RAM')
+        self.tree.heading('Threads', text='Threads')
+        self.tree.heading('FDs', text='FDs')
         
         self.tree.column('Nome', width=120, anchor=tk.W)
         self.tree.column('Display', width=60, anchor=tk.CENTER)
@@ -184,6 +217,10 @@ class XephyrGUI:
         self.tree.column('Resolução', width=80, anchor=tk.CENTER)
         self.tree.column('Comando', width=100, anchor=tk.W)
         self.tree.column('USB', width=80, anchor=tk.W)
+        self.tree.column('CPU', width=60, anchor=tk.E)
+        self.tree.column('RAM', width=70, anchor=tk.E)
+        self.tree.column('Threads', width=60, anchor=tk.E)
+        self.tree.column('FDs', width=50, anchor=tk.E)
         
         # Scrollbar para o treeview
         scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
@@ -192,6 +229,15 @@ class XephyrGUI:
         self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
         
+        self.tree.tag_configure('running', foreground='green')
+        self.tree.tag_configure('stopped', foreground='red')
+        self.tree.tag_configure('queued', foreground='orange')
+        self.tree.tag_configure('paused', foreground='gray')
+        self.tree.tag_configure('frozen', foreground='purple')
+        
+        # Última linha desenhada por display, para atualizar só o que mudou
+        self.row_cache = {}
+        
 
         
         # Bind para seleção no treeview
@@ -240,15 +286,38 @@ class XephyrGUI:
         
         threading.Thread(target=create_thread, daemon=True).start()
     
+    def _report_bulk(self, action, report):
+        """Mostra o resultado de uma operação em lote na barra de status"""
+        total = report['succeeded'] + report['queued'] + report['failed']
+        message = f"{report['succeeded']} de {total} instâncias {action} em {report['elapsed']:.2f}s"
+        if report['queued']:
+            message += f" ({report['queued']} na fila)"
+        failed = [f":{display}" for display, result in report['results'].items() if not result['ok']]
+        if failed:
+            message += f" (falhas: {', '.join(failed)})"
+        self.root.after(0, lambda: self.status_var.set(message))
+    
+    def start_all_instances(self):
+        """Inicia todas as instâncias paradas em paralelo"""
+        self.status_var.set("Iniciando todas as instâncias...")
+        
+        def start_thread():
+            self._report_bulk("iniciadas", self.manager.start_many())
+        
+        threading.Thread(target=start_thread, daemon=True).start()
+    
     def stop_all_instances(self):
         """Para todas as instâncias ativas"""
         if messagebox.askyesno("Confirmar", "Deseja parar todas as instâncias?"):
+            self.status_var.set("Parando todas as instâncias...")
+            
             # Para as instâncias mas mantém os dados salvos
-            for instance in self.manager.instances.values():
-                if instance.is_running:
-                    instance.stop()
-            self.manager.save_config()
-            self.status_var.set("Todas as instâncias foram paradas")
+            def stop_thread():
+                report = self.manager.stop_many()
+                self.manager.save_config()
+                self._report_bulk("paradas", report)
+            
+            threading.Thread(target=stop_thread, daemon=True).start()
     
     def cleanup_dead_instances(self):
         """Remove instâncias que não estão mais rodando"""
@@ -263,11 +332,13 @@ class XephyrGUI:
             self.stop_button.config(state=tk.NORMAL)
             self.remove_button.config(state=tk.NORMAL)
             self.execute_button.config(state=tk.NORMAL)
+            self.pause_button.config(state=tk.NORMAL)
         else:
             self.start_button.config(state=tk.DISABLED)
             self.stop_button.config(state=tk.DISABLED)
             self.remove_button.config(state=tk.DISABLED)
             self.execute_button.config(state=tk.DISABLED)
+            self.pause_button.config(state=tk.DISABLED)
     
     def get_selected_display(self):
         """Retorna o número do display da instância selecionada"""
@@ -279,20 +350,38 @@ class XephyrGUI:
         display_text = item['values'][1]  # Display agora está na coluna 1
         return int(display_text.replace(':', ''))
     
+    def get_selected_displays(self):
+        """Retorna os números dos displays de todas as instâncias selecionadas"""
+        displays = []
+        for item in self.tree.selection():
+            values = self.tree.item(item)['values']
+            if values:
+                displays.append(int(values[1].replace(':', '')))
+        return displays
+    
     def start_selected_instance(self):
-        """Inicia a instância selecionada"""
-        display = self.get_selected_display()
-        if display is None:
+        """Inicia a(s) instância(s) selecionada(s)"""
+        displays = self.get_selected_displays()
+        if not displays:
             return
             
+        if len(displays) > 1:
+            self.status_var.set(f"Iniciando {len(displays)} instâncias...")
+            threading.Thread(
+                target=lambda: self._report_bulk("iniciadas", self.manager.start_many(displays)),
+                daemon=True
+            ).start()
+            return
+            
+        display = displays[0]
         try:
-            instance = self.manager.instances.get(display)
-            if instance and not instance.is_running:
+            instance = self.manager.get_instance(display)
+            if instance and not instance['running']:
                 print(f"Iniciando instância :{display}")
-                if instance.start():
-                    print(f"Xephyr iniciado, executando comandos para :{display}")
-                    # Executa os comandos após iniciar
-                    instance.execute_commands()
+                result = self.manager.start_instance(display)
+                if result == QUEUED:
+                    self.status_var.set(f"Instância :{display} na fila aguardando recursos do host")
+                elif result:
                     self.status_var.set(f"Instância :{display} iniciada com comandos")
                 else:
                     self.status_var.set(f"Falha ao iniciar instância :{display}")
@@ -304,16 +393,108 @@ class XephyrGUI:
             messagebox.showerror("Erro", f"Erro ao iniciar instância: {e}")
     
     def stop_selected_instance(self):
-        """Para a instância selecionada"""
-        display = self.get_selected_display()
-        if display is None:
+        """Para a(s) instância(s) selecionada(s)"""
+        displays = self.get_selected_displays()
+        if not displays:
+            return
+            
+        if len(displays) > 1:
+            self.status_var.set(f"Parando {len(displays)} instâncias...")
+            threading.Thread(
+                target=lambda: self._report_bulk("paradas", self.manager.stop_many(displays)),
+                daemon=True
+            ).start()
             return
             
+        display = displays[0]
         if self.manager.stop_instance(display):
             self.status_var.set(f"Instância :{display} parada")
         else:
             self.status_var.set(f"Falha ao parar instância :{display}")
     
+    def toggle_pause_selected_instance(self):
+        """Pausa os comandos das instâncias selecionadas, ou os retoma se já estiverem pausados"""
+        displays = self.get_selected_displays()
+        if not displays:
+            return
+            
+        paused = resumed = 0
+        for display in displays:
+            info = self.manager.get_instance(display)
+            if not info:
+                continue
+            if info.get('throttled'):
+                resumed += bool(self.manager.resume_instance(display))
+            else:
+                paused += bool(self.manager.pause_instance(display))
+        self.status_var.set(f"{paused} instância(s) pausada(s), {resumed} retomada(s)")
+    
+    def open_preview_window(self):
+        """Abre (ou traz para frente) a janela com as miniaturas das instâncias prontas"""
+        if self.preview_window is not None:
+            self.preview_window.lift()
+            return
+            
+        self.preview_window = tk.Toplevel(self.root)
+        self.preview_window.title("Pré-visualização das telas")
+        self.preview_window.geometry("720x480")
+        self.preview_window.protocol("WM_DELETE_WINDOW", self.close_preview_window)
+        self.preview_frame = ttk.Frame(self.preview_window, padding="10")
+        self.preview_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.preview_labels = {}
+        self.preview_images = {}
+        self.refresh_previews()
+    
+    def close_preview_window(self):
+        if self.preview_window is not None:
+            self.preview_window.destroy()
+        self.preview_window = None
+        self.preview_labels = {}
+        self.preview_images = {}
+    
+    def refresh_previews(self):
+        """Captura as miniaturas em uma thread e reagenda a próxima rodada"""
+        if self.preview_window is None:
+            return
+        
+        def capture():
+            try:
+                thumbnails = self.manager.get_thumbnails()
+            except Exception as e:
+                print(f"Erro ao capturar as prévias: {e}")
+                thumbnails = {}
+            try:
+                self.root.after(0, lambda: self.show_previews(thumbnails))
+            except RuntimeError:
+                pass
+        
+        threading.Thread(target=capture, daemon=True).start()
+    
+    def show_previews(self, thumbnails):
+        if self.preview_window is None:
+            return
+        
+        # Remove displays que pararam
+        for display in list(self.preview_labels):
+            if display not in thumbnails:
+                self.preview_labels.pop(display).destroy()
+                self.preview_images.pop(display, None)
+        
+        columns = 4
+        for index, display in enumerate(sorted(thumbnails)):
+            # A referência à imagem precisa ser mantida, senão o Tk a descarta
+            image = tk.PhotoImage(data=thumbnails[display]['ppm'])
+            self.preview_images[display] = image
+            label = self.preview_labels.get(display)
+            if label is None:
+                label = ttk.Label(self.preview_frame, text=f":{display}", compound=tk.TOP)
+                self.preview_labels[display] = label
+            label.configure(image=image)
+            label.grid(row=index // columns, column=index % columns, padx=5, pady=5)
+        
+        interval = int(self.manager.capture_settings['interval'] * 1000)
+        self.preview_window.after(interval, self.refresh_previews)
+    
     def remove_selected_instance(self):
         """Remove a instância selecionada"""
         display = self.get_selected_display()
@@ -340,63 +521,20 @@ class XephyrGUI:
         )
         
         if command and command.strip():
-            # Mostra mensagem imediata
-            self.status_var.set(f"Aguardando 2s para executar '{command.strip()}' no display :{display}...")
+            command = command.strip()
+            self.status_var.set(f"Executando '{command}' no display :{display}...")
             
-            # Executa em thread para não bloquear a GUI
+            # Mesmo pipeline do início da instância: aguarda o display, só inicia
+            # o xfwm4 se ele ainda não estiver rodando e registra os processos
             def execute_thread():
                 try:
-                    import subprocess
-                    import os
-                    import time
-                    
-                    # Aguarda 2 segundos antes de executar o comando
-                    time.sleep(2)
-                    
-                    # Prepara o ambiente com o DISPLAY correto
-                    env = os.environ.copy()
-                    env['DISPLAY'] = f':{display}'
-                    
-                    # Verifica se xfwm4 já está rodando, se não, inicia
-                    try:
-                        # Tenta verificar se xfwm4 já está rodando
-                        check_cmd = f"DISPLAY=:{display} pgrep -f xfwm4"
-                        result = subprocess.run(check_cmd, shell=True, capture_output=True, text=True, env=env)
-                        
-                        if result.returncode != 0:  # xfwm4 não está rodando
-                            # Inicia xfwm4
-                            subprocess.Popen(
-                                ['xfwm4'],
-                                env=env,
-                                stdout=subprocess.DEVNULL,
-                                stderr=subprocess.DEVNULL,
-                                preexec_fn=os.setsid
-                            )
-                            time.sleep(2)  # Aguarda xfwm4 inicializar
-                    except:
-                        pass  # Se falhar, continua sem o xfwm4
-                    
-                    # Processa comandos separados por vírgula
-                    commands = [cmd.strip() for cmd in command.strip().split(',') if cmd.strip()]
-                    
-                    for i, cmd in enumerate(commands):
-                        if i > 0:  # Aguarda 2 segundos entre comandos
-                            time.sleep(2)
-                        
-                        # Executa o comando usando bash para resolver aliases
-                        subprocess.Popen(
-                            f"bash -i -c '{cmd}'",
-                            shell=True,
-                            env=env,
-                            stdout=subprocess.DEVNULL,
-                            stderr=subprocess.DEVNULL,
-                            preexec_fn=os.setsid
-                        )
-                    
-                    self.status_var.set(f"Comando '{command.strip()}' executado no display :{display}")
-                    
+                    if self.manager.execute_command(display, command):
+                        message = f"Comando '{command}' enviado ao display :{display}"
+                    else:
+                        message = f"Instância :{display} não está rodando"
                 except Exception as e:
-                    self.status_var.set(f"Erro ao executar comando: {e}")
+                    message = f"Erro ao executar comando: {e}"
+                self.root.after(0, lambda: self.status_var.set(message))
             
             threading.Thread(target=execute_thread, daemon=True).start()
     
@@ -424,14 +562,26 @@ class XephyrGUI:
         # Extrai largura e altura da resolução
         width, height = resolution.split('x')
         
+        info = self.manager.get_instance(display_num)
+        restart_policy = info.get('restart_policy', 'never') if info else 'never'
+        backend = info.get('backend', 'xephyr') if info else 'xephyr'
+        profile = info.get('profile', 'default') if info else 'default'
+        
         # Cria janela de edição
-        self.create_edit_window(display_num, name, command, int(width), int(height), usb_port)
+        self.create_edit_window(display_num, name, command, int(width), int(height), usb_port, restart_policy, backend,
+                                profile)
+    
+    # Rótulos das políticas de reinício automático
+    RESTART_LABELS = {'never': "Nunca", 'on-failure': "Se falhar", 'always': "Sempre"}
+    # Rótulos dos servidores X
+    BACKEND_LABELS = {'xephyr': "Xephyr (janela)", 'xvfb': "Xvfb (sem janela)"}
     
-    def create_edit_window(self, display_num, current_name, current_command, current_width, current_height, current_usb_port=""):
+    def create_edit_window(self, display_num, current_name, current_command, current_width, current_height, current_usb_port="",
+                           current_restart_policy='never', current_backend='xephyr', current_profile='default'):
         """Cria janela para editar instância"""
         edit_window = tk.Toplevel(self.root)
         edit_window.title(f"Editar Instância :{display_num}")
-        edit_window.geometry("400x350")
+        edit_window.geometry("400x470")
         edit_window.resizable(False, False)
         edit_window.transient(self.root)
         
@@ -468,9 +618,30 @@ class XephyrGUI:
         usb_entry = ttk.Entry(main_frame, textvariable=usb_var, width=30)
         usb_entry.grid(row=3, column=1, sticky=(tk.W, tk.E), padx=(10, 0), pady=5)
         
+        # Campo Reinício automático
+        ttk.Label(main_frame, text="Reiniciar:").grid(row=4, column=0, sticky=tk.W, pady=5)
+        restart_var = tk.StringVar(value=self.RESTART_LABELS.get(current_restart_policy, "Nunca"))
+        restart_combo = ttk.Combobox(main_frame, textvariable=restart_var, state='readonly', width=28,
+                                     values=list(self.RESTART_LABELS.values()))
+        restart_combo.grid(row=4, column=1, sticky=(tk.W, tk.E), padx=(10, 0), pady=5)
+        
+        # Campo Servidor X (vale a partir do próximo início)
+        ttk.Label(main_frame, text="Servidor:").grid(row=5, column=0, sticky=tk.W, pady=5)
+        backend_var = tk.StringVar(value=self.BACKEND_LABELS.get(current_backend, "Xephyr (janela)"))
+        backend_combo = ttk.Combobox(main_frame, textvariable=backend_var, state='readonly', width=28,
+                                     values=list(self.BACKEND_LABELS.values()))
+        backend_combo.grid(row=5, column=1, sticky=(tk.W, tk.E), padx=(10, 0), pady=5)
+        
+        # Campo Perfil de lançamento (vale a partir do próximo início)
+        ttk.Label(main_frame, text="Perfil:").grid(row=6, column=0, sticky=tk.W, pady=5)
+        profile_var = tk.StringVar(value=current_profile)
+        profile_combo = ttk.Combobox(main_frame, textvariable=profile_var, state='readonly', width=28,
+                                     values=sorted(self.manager.get_profiles()))
+        profile_combo.grid(row=6, column=1, sticky=(tk.W, tk.E), padx=(10, 0), pady=5)
+        
         # Frame para dimensões
         dimensions_frame = ttk.Frame(main_frame)
-        dimensions_frame.grid(row=4, column=0, columnspan=2, pady=10, sticky=(tk.W, tk.E))
+        dimensions_frame.grid(row=7, column=0, columnspan=2, pady=10, sticky=(tk.W, tk.E))
         
         ttk.Label(dimensions_frame, text="Largura:").grid(row=0, column=0, sticky=tk.W)
         width_var = tk.StringVar(value=str(current_width))
@@ -484,7 +655,7 @@ class XephyrGUI:
         
         # Frame para botões
         buttons_frame = ttk.Frame(main_frame)
-        buttons_frame.grid(row=5, column=0, columnspan=2, pady=(20, 0))
+        buttons_frame.grid(row=8, column=0, columnspan=2, pady=(20, 0))
         
         def save_changes():
             try:
@@ -502,13 +673,28 @@ class XephyrGUI:
                 
                 new_command = command_var.get().strip()
                 new_usb_port = usb_var.get().strip()
+                new_restart_policy = next(policy for policy, label in self.RESTART_LABELS.items()
+                                          if label == restart_var.get())
+                new_backend = next(backend for backend, label in self.BACKEND_LABELS.items()
+                                   if label == backend_var.get())
                 
-                # Atualiza a instância no gerenciador
-                if self.manager.update_instance(display_num, new_name, new_command, new_width, new_height, new_usb_port):
-                    self.status_var.set(f"Instância :{display_num} atualizada")
-                    edit_window.destroy()
-                else:
-                    messagebox.showerror("Erro", "Falha ao atualizar instância")
+                # Atualiza a instância no gerenciador; em instância rodando, novas
+                # dimensões são aplicadas ao vivo (ou com reinício), fora do loop do Tk
+                def update():
+                    updated = self.manager.update_instance(display_num, new_name, new_command, new_width, new_height,
+                                                           new_usb_port, new_restart_policy, backend=new_backend,
+                                                           profile=profile_var.get())
+                    self.root.after(0, lambda: finish(updated))
+                
+                def finish(updated):
+                    if updated:
+                        self.status_var.set(f"Instância :{display_num} atualizada")
+                        edit_window.destroy()
+                    else:
+                        messagebox.showerror("Erro", "Falha ao atualizar instância")
+                
+                self.status_var.set(f"Atualizando instância :{display_num}...")
+                threading.Thread(target=update, daemon=True).start()
                     
             except ValueError:
                 messagebox.showerror("Erro", "Dimensões devem ser números válidos!")
@@ -544,63 +730,111 @@ class XephyrGUI:
             messagebox.showerror("Erro", f"Erro ao buscar portas USB: {e}")
     
     def update_instances_list(self):
-        """Atualiza a lista de instâncias na interface"""
-        # Preserva a seleção atual
-        selected_items = self.tree.selection()
-        selected_displays = []
-        for item in selected_items:
-            values = self.tree.item(item)['values']
-            if values:
-                selected_displays.append(values[1])  # Display está na coluna 1
+        """Atualiza a lista de instâncias na interface
+
+        As linhas são identificadas pelo número do display: só insere as novas,
+        remove as que sumiram e altera apenas as que mudaram, preservando
+        seleção e rolagem sem redesenhar a lista inteira.
+        """
+        current_rows = set(self.tree.get_children())
+        seen_rows = set()
         
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
         instances = self.manager.get_instances()
         for instance in instances:
+            row_id = str(instance['display'])
             name = instance['name']
             display = f":{instance['display']}"
-            status = "Rodando" if instance['running'] else "Parada"
+            state = instance.get('state')
+            if instance.get('queued'):
+                status, tags = "Na fila", ('queued',)
+            elif state == 'starting':
+                status, tags = "Iniciando", ('queued',)
+            elif state == 'stopping':
+                status, tags = "Parando", ('queued',)
+            elif instance.get('throttled') == 'manual':
+                status, tags = "Pausada", ('paused',)
+            elif instance.get('throttled'):
+                status, tags = "Ociosa", ('paused',)
+            elif instance.get('frozen') is not None:
+                status, tags = "Congelada", ('frozen',)
+            elif instance['running']:
+                status, tags = "Rodando", ('running',)
+            elif state == 'crashed':
+                status, tags = "Caiu", ('stopped',)
+            else:
+                status, tags = "Parada", ('stopped',)
             resolution = f"{instance['width']}x{instance['height']}"
             command = instance['command'] if instance['command'] else "-"
             usb_port = instance['usb_port'] if instance['usb_port'] else "-"
+            resources = self.format_resources(instance.get('resources'))
             
-            tags = ('running',) if instance['running'] else ('stopped',)
-            
-            item = self.tree.insert('', tk.END, values=(name, display, status, resolution, command, usb_port), tags=tags)
+            row = ((name, display, status, resolution, command, usb_port) + resources, tags)
+            seen_rows.add(row_id)
             
-            if display in selected_displays:
-                self.tree.selection_add(item)
-        
-        self.tree.tag_configure('running', foreground='green')
-        self.tree.tag_configure('stopped', foreground='red')
+            if row_id not in current_rows:
+                self.tree.insert('', tk.END, iid=row_id, values=row[0], tags=tags)
+            elif self.row_cache.get(row_id) != row:
+                self.tree.item(row_id, values=row[0], tags=tags)
+            self.row_cache[row_id] = row
+        
+        removed_rows = current_rows - seen_rows
+        if removed_rows:
+            self.tree.delete(*removed_rows)
+            for row_id in removed_rows:
+                self.row_cache.pop(row_id, None)
+    
+    @staticmethod
+    def format_resources(resources):
+        """Formata a última amostra de recursos para as colunas CPU/RAM/Threads/FDs"""
+        if not resources:
+            return ("-", "-", "-", "-")
+        return (
+            f"{resources['cpu_percent']:.1f}%",
+            f"{resources['rss'] / (1024 * 1024):.0f} MB",
+            str(resources['threads']),
+            str(resources['fds'])
+        )
     
     def load_last_dimensions(self):
         last_width, last_height = self.manager.get_last_dimensions()
         self.width_var.set(str(last_width))
         self.height_var.set(str(last_height))
     
-    def start_update_thread(self):
-        def update_loop():
-            while self.update_thread_running:
-                try:
-                    self.root.after(0, self.update_instances_list)
-                    time.sleep(3)  # Atualiza a cada 3 segundos
-                except:
-                    break
-        
-        threading.Thread(target=update_loop, daemon=True).start()
+    def subscribe_to_events(self):
+        """Redesenha a lista apenas quando o gerenciador publica uma mudança"""
+        self.manager.subscribe(self.on_manager_event)
+        self.manager.start_telemetry()
+        self.manager.start_warm_pool()
+        self.manager.start_idle_throttling()
+        self.manager.start_watchdog()
+        self.update_instances_list()
+    
+    def on_manager_event(self, event):
+        # Chamado de outras threads: agenda um único redesenho no loop do Tk
+        if not self.listening_events or self.refresh_pending:
+            return
+        self.refresh_pending = True
+        try:
+            self.root.after(0, self.refresh_from_events)
+        except RuntimeError:
+            pass
+    
+    def refresh_from_events(self):
+        self.refresh_pending = False
+        self.update_instances_list()
     
     def on_closing(self):
         if messagebox.askyesno("Sair", "Deseja parar todas as instâncias antes de sair?"):
-            # Para as instâncias mas mantém os dados salvos
-            for instance in self.manager.instances.values():
-                if instance.is_running:
-                    instance.stop()
-            # Salva as configurações antes de sair
-            self.manager.save_config()
-        
-        self.update_thread_running = False
+            # Para as instâncias em paralelo mas mantém os dados salvos
+            self.manager.shutdown_all()
+        
+        self.listening_events = False
+        self.manager.unsubscribe(self.on_manager_event)
+        self.manager.stop_telemetry()
+        self.manager.stop_warm_pool()
+        self.manager.stop_idle_throttling()
+        self.manager.stop_watchdog()
+        self.close_preview_window()
         self.root.destroy()
     
     def run(self):
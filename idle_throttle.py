@@ -0,0 +1,288 @@
+import os
+import signal
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import psutil
+
+from x11_client import X11Connection, X11Error
+
+
+# Ações aplicadas aos comandos de uma instância ociosa
+IDLE_ACTIONS = ('freeze', 'weight', 'renice')
+
+# Valores padrão da seção "idle" do arquivo de configuração
+DEFAULT_IDLE = {
+    'enabled': False,
+    'action': 'freeze',         # 'freeze' (congela), 'weight' (cpu.weight baixo) ou 'renice'
+    'idle_after': 300.0,        # Segundos sem entrada no display até estrangular (0 desliga)
+    'schedule': [],             # Janelas "HH:MM-HH:MM" em que todas as instâncias ficam estranguladas
+    'interval': 1.0,            # Intervalo entre verificações
+    'idle_weight': 1,           # cpu.weight durante o estrangulamento ('weight')
+    'idle_nice': 19             # nice dos comandos durante o estrangulamento ('renice')
+}
+
+
+def parse_window(window: str) -> Tuple[int, int]:
+    """Converte "HH:MM-HH:MM" em minutos do dia (início, fim)"""
+    start, _, end = window.partition('-')
+    minutes = []
+    for value in (start, end):
+        hours, _, mins = value.strip().partition(':')
+        minutes.append(int(hours) * 60 + int(mins or 0))
+    return minutes[0], minutes[1]
+
+
+def in_schedule(windows: List[str], now: Optional[float] = None) -> bool:
+    """Verifica se o horário está em alguma janela (janelas podem virar a meia-noite)"""
+    local = time.localtime(now)
+    minute = local.tm_hour * 60 + local.tm_min
+    for window in windows:
+        start, end = parse_window(window)
+        if start <= end:
+            if start <= minute < end:
+                return True
+        elif minute >= start or minute < end:
+            return True
+    return False
+
+
+class IdleThrottler:
+    """Estrangula os comandos de instâncias ociosas e os solta na hora ao voltar
+
+    Uma instância é estrangulada quando está pausada manualmente, quando o
+    horário cai em uma janela de 'schedule' ou quando o display passa
+    'idle_after' segundos sem entrada (extensão MIT-SCREEN-SAVER, consultada
+    pelo x11_client). Só os comandos (role 'app') são afetados: o Xephyr e
+    o xfwm4 continuam respondendo, então a entrada do usuário é percebida e
+    a instância é solta na verificação seguinte.
+
+    Ações:
+      freeze  congela o cgroup 'apps' da instância (cgroup.freeze) ou, sem
+              cgroup, envia SIGSTOP aos grupos de processos; SIGCONT solta
+      weight  baixa o cpu.weight do cgroup da instância (renice sem cgroup)
+      renice  aumenta o nice dos comandos; voltar a um nice menor exige
+              privilégio (CAP_SYS_NICE ou RLIMIT_NICE)
+    """
+
+    def __init__(self, settings: Optional[Dict] = None,
+                 on_change: Optional[Callable[[int, Optional[str], str], None]] = None):
+        self.settings = dict(DEFAULT_IDLE)
+        if settings:
+            self.settings.update(settings)
+        # Chamado com (display, motivo ou None ao retomar, ação)
+        self.on_change = on_change
+        # display -> (instância, motivo, ação); motivo: 'manual', 'schedule' ou 'idle'
+        self._throttled: Dict[int, Tuple[object, str, str]] = {}
+        # display -> 'pause' ou 'resume' definido pelo usuário
+        self._manual: Dict[int, str] = {}
+        self._connections: Dict[int, X11Connection] = {}
+        self._lock = threading.RLock()
+        self._running = False
+
+    # ----- Ações -----
+
+    @staticmethod
+    def _app_groups(instance) -> List[int]:
+        groups = set()
+        for entry in instance.registry.entries():
+            if entry['role'] == 'app' and entry['pgid'] and entry['process'].poll() is None:
+                groups.add(entry['pgid'])
+        return sorted(groups)
+
+    @staticmethod
+    def _app_tree(instance) -> List[psutil.Process]:
+        procs = {}
+        for entry in instance.registry.entries():
+            if entry['role'] != 'app' or entry['process'].poll() is not None:
+                continue
+            try:
+                proc = psutil.Process(entry['process'].pid)
+                procs[proc.pid] = proc
+                procs.update((child.pid, child) for child in proc.children(recursive=True))
+            except psutil.Error:
+                pass
+        return list(procs.values())
+
+    def _signal_apps(self, instance, sig: int):
+        for pgid in self._app_groups(instance):
+            if pgid == os.getpgrp():
+                continue
+            try:
+                os.killpg(pgid, sig)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+    def _renice_apps(self, instance, nice: int):
+        for proc in self._app_tree(instance):
+            try:
+                proc.nice(nice)
+            except (psutil.Error, OSError) as e:
+                print(f"Não foi possível mudar o nice do processo {proc.pid}: {e}")
+
+    def _apply(self, display_num: int, instance, action: str, throttle: bool) -> str:
+        """Aplica ou desfaz a ação; retorna a ação realmente usada"""
+        resources = instance.resources
+        if action == 'freeze':
+            if resources and resources.freeze_apps(display_num, throttle):
+                return action
+            # Sem cgroup: sinais para cada grupo de processos dos comandos
+            self._signal_apps(instance, signal.SIGSTOP if throttle else signal.SIGCONT)
+            return action
+        if action == 'weight':
+            weight = self.settings['idle_weight'] if throttle else instance.effective_limits.get('cpu_weight', 100)
+            if resources and resources.set_cpu_weight(display_num, weight):
+                return action
+            action = 'renice'
+        self._renice_apps(instance, self.settings['idle_nice'] if throttle else instance.effective_limits.get('nice', 0))
+        return action
+
+    def throttle(self, display_num: int, instance, reason: str) -> bool:
+        """Estrangula a instância pronta; retorna False se já estava estrangulada"""
+        with self._lock:
+            # Instância parando: o estado muda antes do SIGTERM, que precisa ser entregue
+            if instance.state != 'ready':
+                return False
+            current = self._throttled.get(display_num)
+            if current and current[0] is instance:
+                self._throttled[display_num] = (instance, reason, current[2])
+                if current[2] != 'weight':
+                    # Comandos lançados depois do estrangulamento também são afetados
+                    self._apply(display_num, instance, current[2], True)
+                return False
+            action = self._apply(display_num, instance, self.settings['action'], True)
+            self._throttled[display_num] = (instance, reason, action)
+        print(f"Instância :{display_num} estrangulada ({reason}, {action})")
+        if self.on_change:
+            self.on_change(display_num, reason, action)
+        return True
+
+    def release(self, display_num: int) -> bool:
+        """Solta a instância na hora (antes de parar, de remover ou com entrada do usuário)"""
+        with self._lock:
+            current = self._throttled.pop(display_num, None)
+            if not current:
+                return False
+            instance, reason, action = current
+            self._apply(display_num, instance, action, False)
+        print(f"Instância :{display_num} retomada")
+        if self.on_change:
+            self.on_change(display_num, None, action)
+        return True
+
+    def reason(self, display_num: int) -> Optional[str]:
+        with self._lock:
+            current = self._throttled.get(display_num)
+            return current[1] if current else None
+
+    # ----- Gatilhos -----
+
+    def pause(self, display_num: int, instance) -> bool:
+        """Pausa manual: vale até resume(), independente da entrada e do horário"""
+        with self._lock:
+            self._manual[display_num] = 'pause'
+            current = self._throttled.get(display_num)
+            if current and current[0] is instance:
+                self._throttled[display_num] = (instance, 'manual', current[2])
+                return True
+            return self.throttle(display_num, instance, 'manual')
+
+    def resume(self, display_num: int) -> bool:
+        """Retomada manual: solta na hora e ignora os gatilhos automáticos enquanto durarem"""
+        with self._lock:
+            self._manual[display_num] = 'resume'
+            return self.release(display_num)
+
+    def forget(self, display_num: int):
+        """Solta e esquece a instância (parada ou remoção)"""
+        with self._lock:
+            self.release(display_num)
+            self._manual.pop(display_num, None)
+            connection = self._connections.pop(display_num, None)
+        if connection:
+            connection.close()
+
+    def _idle_time(self, display_num: int) -> Optional[float]:
+        connection = self._connections.get(display_num)
+        try:
+            if connection is None:
+                connection = X11Connection(display_num)
+                self._connections[display_num] = connection
+            return connection.idle_time()
+        except (OSError, X11Error):
+            self._connections.pop(display_num, None)
+            if connection:
+                connection.close()
+            return None
+
+    def _wanted_reason(self, display_num: int, scheduled: bool) -> Optional[str]:
+        # Desabilitado: só a pausa manual estrangula
+        if not self.settings['enabled']:
+            return None
+        if scheduled:
+            return 'schedule'
+        idle_after = self.settings['idle_after']
+        if idle_after:
+            idle = self._idle_time(display_num)
+            if idle is not None and idle >= idle_after:
+                return 'idle'
+        return None
+
+    def check(self, instances: List[Tuple[int, object]]):
+        """Uma rodada: estrangula ou solta cada instância pronta conforme os gatilhos"""
+        scheduled = self.settings['enabled'] and in_schedule(self.settings['schedule'])
+        active = set()
+        for display_num, instance in instances:
+            active.add(display_num)
+            with self._lock:
+                manual = self._manual.get(display_num)
+            if manual == 'pause':
+                self.throttle(display_num, instance, 'manual')
+                continue
+            reason = self._wanted_reason(display_num, scheduled)
+            if manual == 'resume':
+                if reason is not None:
+                    continue
+                # Os gatilhos passaram: a próxima ociosidade volta a estrangular
+                with self._lock:
+                    self._manual.pop(display_num, None)
+            if reason:
+                self.throttle(display_num, instance, reason)
+            else:
+                self.release(display_num)
+
+        # Instâncias que deixaram de estar prontas
+        with self._lock:
+            gone = [display_num for display_num in set(self._throttled) | set(self._connections)
+                    if display_num not in active]
+        for display_num in gone:
+            with self._lock:
+                self.release(display_num)
+                connection = self._connections.pop(display_num, None)
+            if connection:
+                connection.close()
+
+    def start(self, get_instances: Callable[[], List[Tuple[int, object]]]):
+        """Inicia as verificações periódicas em uma thread"""
+        if self._running:
+            return
+        self._running = True
+
+        def check_loop():
+            while self._running:
+                try:
+                    self.check(get_instances())
+                except Exception as e:
+                    print(f"Erro ao verificar ociosidade: {e}")
+                time.sleep(self.settings['interval'])
+
+        threading.Thread(target=check_loop, daemon=True).start()
+
+    def stop(self):
+        """Para as verificações e solta todas as instâncias"""
+        self._running = False
+        with self._lock:
+            displays = list(self._throttled)
+        for display_num in displays:
+            self.release(display_num)
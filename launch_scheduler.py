@@ -0,0 +1,52 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable
+
+from admission_control import QUEUED
+
+
+class LaunchScheduler:
+    """Executa operações em lote sobre instâncias com concorrência limitada"""
+
+    def __init__(self, max_concurrency: int = 8):
+        self.max_concurrency = max(1, int(max_concurrency))
+
+    def run(self, keys: Iterable, operation: Callable, max_concurrency: int = None) -> Dict:
+        """Aplica a operação a cada chave e reporta resultado e latência individuais
+
+        Retorna um dicionário com 'results' ({chave: {'ok', 'queued', 'elapsed', 'error'}}),
+        'succeeded', 'queued', 'failed' e 'elapsed' (latência total do lote em
+        segundos). Chaves cuja operação retornou QUEUED contam em 'queued', e
+        não em 'succeeded'.
+        """
+        keys = list(keys)
+        limit = max(1, int(max_concurrency or self.max_concurrency))
+        results: Dict = {}
+        batch_start = time.monotonic()
+
+        def timed(key):
+            start = time.monotonic()
+            try:
+                value = operation(key)
+                error = None
+            except Exception as e:
+                value = False
+                error = str(e)
+            return {'ok': bool(value), 'queued': value == QUEUED, 'elapsed': time.monotonic() - start,
+                    'error': error}
+
+        if keys:
+            with ThreadPoolExecutor(max_workers=min(limit, len(keys))) as executor:
+                futures = {executor.submit(timed, key): key for key in keys}
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+
+        succeeded = sum(1 for result in results.values() if result['ok'] and not result['queued'])
+        queued = sum(1 for result in results.values() if result['queued'])
+        return {
+            'results': results,
+            'succeeded': succeeded,
+            'queued': queued,
+            'failed': len(results) - succeeded - queued,
+            'elapsed': time.monotonic() - batch_start
+        }
@@ -0,0 +1,163 @@
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional
+
+import psutil
+
+
+class ProcessRegistry:
+    """Registro de todos os processos lançados por uma instância
+
+    Guarda o Xephyr, o gerenciador de janelas e cada comando do usuário com
+    seus grupos de processos (setsid), para que o encerramento derrube
+    grupos inteiros de uma vez e recolha descendentes órfãos com psutil.
+    """
+
+    def __init__(self):
+        self._entries: List[Dict] = []
+        self._descendants: List[psutil.Process] = []
+        self._lock = threading.Lock()
+
+    def register(self, process: subprocess.Popen, role: str, command: Optional[str] = None) -> subprocess.Popen:
+        try:
+            pgid = os.getpgid(process.pid)
+        except OSError:
+            pgid = None
+        with self._lock:
+            self._entries.append({'process': process, 'role': role, 'pgid': pgid, 'command': command})
+        return process
+
+    def command_of(self, pid: int) -> Optional[str]:
+        """Comando do usuário que originou o processo com este PID"""
+        with self._lock:
+            for entry in self._entries:
+                if entry['process'].pid == pid:
+                    return entry['command']
+        return None
+
+    def processes(self, role: Optional[str] = None, alive_only: bool = True) -> List[subprocess.Popen]:
+        with self._lock:
+            entries = list(self._entries)
+        return [entry['process'] for entry in entries
+                if (role is None or entry['role'] == role)
+                and (not alive_only or entry['process'].poll() is None)]
+
+    def entries(self) -> List[Dict]:
+        """Cópia das entradas registradas ({'process', 'role', 'pgid', 'command'})"""
+        with self._lock:
+            return [dict(entry) for entry in self._entries]
+
+    def describe(self) -> List[Dict]:
+        """Resumo dos processos registrados, usado por XephyrManager.get_instances"""
+        with self._lock:
+            entries = list(self._entries)
+        return [{
+            'pid': entry['process'].pid,
+            'role': entry['role'],
+            'pgid': entry['pgid'],
+            'command': entry['command'],
+            'running': entry['process'].poll() is None
+        } for entry in entries]
+
+    def forget(self, pid: int):
+        """Esquece o processo com este PID (depois que seu evento de término foi tratado)"""
+        with self._lock:
+            self._entries = [entry for entry in self._entries if entry['process'].pid != pid]
+
+    def _own_group(self, pgid: Optional[int]) -> bool:
+        # Nunca sinaliza o grupo do próprio gerenciador
+        return pgid is not None and pgid != os.getpgrp()
+
+    def signal_all(self, sig: int = signal.SIGTERM, role: Optional[str] = None) -> int:
+        """Envia o sinal a todos os grupos (ou só aos de 'role') de uma vez; retorna quantos foram sinalizados
+
+        Antes de sinalizar, guarda os descendentes atuais para a varredura de
+        órfãos, já que depois do término eles são adotados pelo init.
+        """
+        with self._lock:
+            entries = [entry for entry in self._entries
+                       if entry['process'].poll() is None and (role is None or entry['role'] == role)]
+
+        known = {proc.pid: proc for proc in self._descendants}
+        known.update((proc.pid, proc) for proc in self._snapshot_descendants(entries))
+        self._descendants = list(known.values())
+        signaled_groups = set()
+        count = 0
+        for entry in entries:
+            pgid = entry['pgid']
+            try:
+                if self._own_group(pgid):
+                    if pgid in signaled_groups:
+                        continue
+                    os.killpg(pgid, sig)
+                    signaled_groups.add(pgid)
+                else:
+                    entry['process'].send_signal(sig)
+                count += 1
+            except (ProcessLookupError, PermissionError):
+                pass
+        return count
+
+    @staticmethod
+    def _snapshot_descendants(entries: List[Dict]) -> List[psutil.Process]:
+        descendants = {}
+        for entry in entries:
+            try:
+                for child in psutil.Process(entry['process'].pid).children(recursive=True):
+                    descendants[child.pid] = child
+            except psutil.Error:
+                pass
+        return list(descendants.values())
+
+    def wait_all(self, timeout: float = 5) -> bool:
+        """Aguarda todos os processos com um prazo único e força o que restar
+
+        Retorna True se tudo terminou com SIGTERM, False se foi preciso SIGKILL.
+        """
+        deadline = time.monotonic() + timeout
+        graceful = True
+        for process in self.processes(alive_only=False):
+            remaining = max(0.0, deadline - time.monotonic())
+            try:
+                process.wait(timeout=remaining)
+            except subprocess.TimeoutExpired:
+                graceful = False
+
+        if not graceful:
+            self.signal_all(signal.SIGKILL)
+            for process in self.processes(alive_only=False):
+                try:
+                    process.wait(timeout=1)
+                except subprocess.TimeoutExpired:
+                    print(f"Processo {process.pid} não terminou após SIGKILL")
+
+        self._sweep_orphans(max(0.0, deadline - time.monotonic()))
+        return graceful
+
+    def _sweep_orphans(self, timeout: float):
+        """Encerra descendentes que escaparam dos grupos (ex.: fizeram setsid próprio)"""
+        orphans = [proc for proc in self._descendants if proc.is_running()]
+        self._descendants = []
+        if not orphans:
+            return
+        for proc in orphans:
+            try:
+                proc.terminate()
+            except psutil.Error:
+                pass
+        _, alive = psutil.wait_procs(orphans, timeout=min(timeout, 1.0))
+        for proc in alive:
+            try:
+                proc.kill()
+            except psutil.Error:
+                pass
+        if alive:
+            psutil.wait_procs(alive, timeout=1.0)
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+        self._descendants = []
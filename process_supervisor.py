@@ -0,0 +1,128 @@
+import os
+import selectors
+import subprocess
+import threading
+from typing import Callable, Dict, List
+
+
+class ProcessSupervisor:
+    """Acompanha o término dos processos filhos por eventos, sem polling
+
+    Usa pidfd (os.pidfd_open) registrado em um selector quando o kernel
+    suporta; caso contrário, uma thread bloqueada em wait() por processo.
+    Cada término é publicado imediatamente para os assinantes.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Callable[[Dict], None]] = []
+        self._subscribers_lock = threading.Lock()
+        self._watched: Dict[int, tuple] = {}
+        self._pending: List[tuple] = []
+        self._lock = threading.Lock()
+        self._selector = None
+        self._wakeup_r = None
+        self._wakeup_w = None
+        self._use_pidfd = hasattr(os, 'pidfd_open')
+
+    # ----- Assinaturas -----
+
+    def subscribe(self, callback: Callable[[Dict], None]) -> Callable[[Dict], None]:
+        """Registra um callback que recebe cada evento (chamado em outra thread)"""
+        with self._subscribers_lock:
+            self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback: Callable[[Dict], None]):
+        with self._subscribers_lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, event: Dict):
+        """Entrega um evento a todos os assinantes"""
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Erro ao processar evento {event.get('type')}: {e}")
+
+    # ----- Monitoramento -----
+
+    def watch(self, display_num: int, process: subprocess.Popen, role: str = 'xephyr'):
+        """Passa a acompanhar o término de um processo de uma instância"""
+        entry = (display_num, role, process)
+        if self._use_pidfd:
+            try:
+                fd = os.pidfd_open(process.pid)
+            except ProcessLookupError:
+                # Já terminou antes de ser registrado
+                self._publish_exit(entry)
+                return
+            except OSError:
+                # Kernel sem suporte a pidfd: usa threads bloqueadas em wait()
+                self._use_pidfd = False
+            else:
+                with self._lock:
+                    self._ensure_loop()
+                    self._pending.append((fd, entry))
+                os.write(self._wakeup_w, b'\x00')
+                return
+
+        threading.Thread(target=self._wait_process, args=(entry,), daemon=True).start()
+
+    def _ensure_loop(self):
+        if self._selector is not None:
+            return
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def _loop(self):
+        while True:
+            for key, _ in self._selector.select():
+                fd = key.fd
+                if fd == self._wakeup_r:
+                    self._drain_wakeup()
+                    continue
+                entry = self._watched.pop(fd, None)
+                self._selector.unregister(fd)
+                os.close(fd)
+                if entry:
+                    self._publish_exit(entry)
+
+    def _drain_wakeup(self):
+        try:
+            while os.read(self._wakeup_r, 512):
+                pass
+        except BlockingIOError:
+            pass
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for fd, entry in pending:
+            self._watched[fd] = entry
+            self._selector.register(fd, selectors.EVENT_READ)
+
+    def _wait_process(self, entry: tuple):
+        try:
+            entry[2].wait()
+        except Exception:
+            pass
+        self._publish_exit(entry)
+
+    def _publish_exit(self, entry: tuple):
+        display_num, role, process = entry
+        try:
+            # O processo já terminou: wait() apenas o coleta
+            returncode = process.wait()
+        except Exception:
+            returncode = process.returncode
+        self.publish({
+            'type': 'exit',
+            'display': display_num,
+            'role': role,
+            'pid': process.pid,
+            'returncode': returncode
+        })
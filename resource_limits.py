@@ -0,0 +1,408 @@
+import errno
+import glob
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+import psutil
+
+
+# Valores padrão da seção "limits" do arquivo de configuração
+DEFAULT_LIMITS = {
+    'cgroup': False,            # Usa um cgroup v2 por instância (opcional: exige delegação)
+    'cgroup_parent': '',        # Cgroup (delegado) onde criar os das instâncias; '' = o do gerenciador
+    'auto_pin': False,          # Fixa automaticamente instâncias sem 'cpus' em núcleos próprios
+    'cpus_per_instance': 1      # Núcleos entregues a cada instância no fixamento automático
+}
+
+# Limites aceitos por instância (campo "limits" de cada instância)
+INSTANCE_LIMIT_KEYS = ('cpus', 'nice', 'ionice', 'memory_max', 'cpu_weight')
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+# Folha para onde o gerenciador se muda quando usa o próprio cgroup como pai
+MANAGER_LEAF = 'pyluiz-manager'
+IONICE_CLASSES = {
+    'realtime': psutil.IOPRIO_CLASS_RT,
+    'best-effort': psutil.IOPRIO_CLASS_BE,
+    'idle': psutil.IOPRIO_CLASS_IDLE
+}
+SIZE_SUFFIXES = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_cpus(value) -> List[int]:
+    """Lista de núcleos a partir de [0, 2] ou de uma string no formato cpulist ("0-3,6")"""
+    if isinstance(value, (list, tuple, set)):
+        return sorted({int(cpu) for cpu in value})
+    cpus = set()
+    for part in str(value).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        cpus.update(range(int(first), int(last or first) + 1))
+    return sorted(cpus)
+
+
+def parse_size(value) -> int:
+    """Bytes a partir de um inteiro ou de "512M", "2G" etc."""
+    if isinstance(value, int):
+        return value
+    text = str(value).strip().upper().rstrip('B')
+    if text and text[-1] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def normalize_limits(limits: Optional[Dict]) -> Dict:
+    """Valida os limites de uma instância; levanta ValueError com a mensagem de erro"""
+    normalized = {}
+    for key, value in (limits or {}).items():
+        if key not in INSTANCE_LIMIT_KEYS:
+            raise ValueError(f"Limite desconhecido '{key}'")
+        if value is None or value == '':
+            continue
+        if key == 'cpus':
+            value = parse_cpus(value)
+            unknown = set(value) - set(range(os.cpu_count() or 1))
+            if not value or unknown:
+                raise ValueError(f"Núcleos inválidos: {limits[key]}")
+        elif key == 'nice':
+            value = int(value)
+            if not -20 <= value <= 19:
+                raise ValueError("nice deve estar entre -20 e 19")
+        elif key == 'ionice':
+            io_class, _, level = str(value).partition(':')
+            if io_class not in IONICE_CLASSES or (level and not 0 <= int(level) <= 7):
+                raise ValueError("ionice deve ser 'idle', 'best-effort[:0-7]' ou 'realtime[:0-7]'")
+        elif key == 'memory_max':
+            value = parse_size(value)
+            if value <= 0:
+                raise ValueError("memory_max deve ser positivo")
+        elif key == 'cpu_weight':
+            value = int(value)
+            if not 1 <= value <= 10000:
+                raise ValueError("cpu_weight deve estar entre 1 e 10000")
+        normalized[key] = value
+    return normalized
+
+
+def numa_nodes() -> List[List[int]]:
+    """Núcleos permitidos ao processo agrupados por nó NUMA (um grupo só, sem NUMA)"""
+    allowed = os.sched_getaffinity(0)
+    nodes = []
+    for path in sorted(glob.glob('/sys/devices/system/node/node*/cpulist'),
+                       key=lambda path: int(path.split('/')[-2][4:])):
+        try:
+            with open(path, 'r') as f:
+                cpus = [cpu for cpu in parse_cpus(f.read()) if cpu in allowed]
+        except (OSError, ValueError):
+            continue
+        if cpus:
+            nodes.append(cpus)
+    return nodes or [sorted(allowed)]
+
+
+class CpuPinner:
+    """Fixamento automático: espalha as instâncias pelos nós NUMA e núcleos
+
+    Cada instância recebe 'cpus_per_instance' núcleos do nó com menos
+    instâncias, escolhendo dentro dele os núcleos menos usados; todos os
+    núcleos de uma instância ficam no mesmo nó (memória local). Com mais
+    instâncias que núcleos, os núcleos passam a ser compartilhados.
+    """
+
+    def __init__(self, cpus_per_instance: int = 1, nodes: Optional[List[List[int]]] = None):
+        self.nodes = nodes or numa_nodes()
+        self.cpus_per_instance = max(1, cpus_per_instance)
+        self._load: Dict[int, int] = {cpu: 0 for node in self.nodes for cpu in node}
+        self._node_load: List[int] = [0] * len(self.nodes)
+        self._assigned: Dict[int, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def assign(self, key: int) -> List[int]:
+        with self._lock:
+            if key in self._assigned:
+                return list(self._assigned[key])
+            node_index = min(range(len(self.nodes)), key=lambda index: (self._node_load[index], index))
+            node = self.nodes[node_index]
+            count = min(self.cpus_per_instance, len(node))
+            cpus = sorted(sorted(node, key=lambda cpu: (self._load[cpu], cpu))[:count])
+            for cpu in cpus:
+                self._load[cpu] += 1
+            self._node_load[node_index] += 1
+            self._assigned[key] = cpus
+            return list(cpus)
+
+    def release(self, key: int):
+        with self._lock:
+            cpus = self._assigned.pop(key, None)
+            if not cpus:
+                return
+            for cpu in cpus:
+                self._load[cpu] -= 1
+            for index, node in enumerate(self.nodes):
+                if cpus[0] in node:
+                    self._node_load[index] -= 1
+                    break
+
+    def assignments(self) -> Dict[int, List[int]]:
+        with self._lock:
+            return {key: list(cpus) for key, cpus in self._assigned.items()}
+
+
+class ResourceLimiter:
+    """Aplica os limites de CPU/memória de cada instância à sua árvore de processos
+
+    Cada processo lançado pela instância (Xephyr, xfwm4, comandos) recebe os
+    limites do pai logo depois do Popen: entra no cgroup v2 da instância, tem
+    a afinidade de CPU fixada e o nice e o ionice ajustados. Nada roda no
+    filho entre o fork e o exec, porque preexec_fn pode travar com as threads
+    do gerenciador; os filhos criados depois herdam tudo, e os poucos que
+    nascerem antes da aplicação são cobertos pela varredura da árvore.
+
+    O cgroup da instância (cpu.weight, memory.max e cpuset.cpus) é criado no
+    início e removido na parada, só com 'cgroup' habilitado: ele exige cgroup
+    v2 com os controladores delegados ao usuário em 'cgroup_parent', e a
+    hierarquia não é tocada sem essa escolha. Sem 'cgroup_parent', os cgroups
+    ficam no do próprio gerenciador, que antes se muda para a folha
+    'pyluiz-manager' (a regra "sem processos internos" impede habilitar
+    controladores em um cgroup com processos). Sem cgroup, afinidade, nice e
+    ionice continuam valendo e pedidos de memory_max/cpu_weight geram erro.
+    """
+
+    def __init__(self, settings: Optional[Dict] = None):
+        self.settings = dict(DEFAULT_LIMITS)
+        if settings:
+            self.settings.update(settings)
+        self.pinner = CpuPinner(self.settings['cpus_per_instance'])
+        self._parent: Optional[str] = None
+        self._controllers: Set[str] = set()
+        self._cgroup_checked = False
+        self._cgroups: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    # ----- cgroup v2 -----
+
+    @staticmethod
+    def _own_cgroup() -> Optional[str]:
+        try:
+            with open('/proc/self/cgroup', 'r') as f:
+                for line in f:
+                    if line.startswith('0::'):
+                        return line[3:].strip()
+        except OSError:
+            pass
+        return None
+
+    def _cgroup_parent(self) -> Optional[str]:
+        """Prepara (uma vez) o cgroup pai, habilitando cpu/memory/cpuset para os filhos"""
+        with self._lock:
+            if self._cgroup_checked:
+                return self._parent
+            self._cgroup_checked = True
+            if not self.settings['cgroup'] or not os.path.exists(os.path.join(CGROUP_ROOT, 'cgroup.controllers')):
+                return None
+
+            parent = self.settings['cgroup_parent']
+            own_cgroup = not parent
+            if own_cgroup:
+                own = self._own_cgroup()
+                if own is None:
+                    return None
+                parent = os.path.join(CGROUP_ROOT, own.lstrip('/'))
+            elif not parent.startswith(CGROUP_ROOT):
+                parent = os.path.join(CGROUP_ROOT, parent.lstrip('/'))
+
+            try:
+                with open(os.path.join(parent, 'cgroup.controllers'), 'r') as f:
+                    available = set(f.read().split())
+                wanted = available & {'cpu', 'memory', 'cpuset'}
+                self._enable_controllers(parent, wanted, own_cgroup)
+                os.makedirs(os.path.join(parent, 'pyluiz-probe'), exist_ok=True)
+                os.rmdir(os.path.join(parent, 'pyluiz-probe'))
+            except OSError as e:
+                print(f"cgroup v2 indisponível em {parent} ({e}); usando só afinidade, nice e ionice "
+                      f"(defina 'cgroup_parent' com um cgroup delegado para memory_max/cpu_weight)")
+                return None
+
+            self._parent = parent
+            self._controllers = wanted
+            return parent
+
+    @staticmethod
+    def _enable_controllers(parent: str, controllers: Set[str], move_self: bool):
+        """Habilita os controladores para os filhos de 'parent'
+
+        Um cgroup com processos não pode distribuir controladores (EBUSY). No
+        cgroup do próprio gerenciador, ele primeiro se muda para a folha
+        MANAGER_LEAF; se outros processos continuarem lá, o erro segue adiante.
+        """
+        control = ' '.join(f'+{controller}' for controller in sorted(controllers))
+        try:
+            with open(os.path.join(parent, 'cgroup.subtree_control'), 'w') as f:
+                f.write(control)
+            return
+        except OSError as e:
+            if e.errno != errno.EBUSY or not move_self:
+                raise
+        leaf = os.path.join(parent, MANAGER_LEAF)
+        os.makedirs(leaf, exist_ok=True)
+        with open(os.path.join(leaf, 'cgroup.procs'), 'w') as f:
+            f.write(str(os.getpid()))
+        with open(os.path.join(parent, 'cgroup.subtree_control'), 'w') as f:
+            f.write(control)
+
+    def _prepare_cgroup(self, display_num: int, limits: Dict) -> Optional[str]:
+        parent = self._cgroup_parent()
+        if parent is None:
+            if 'memory_max' in limits or 'cpu_weight' in limits:
+                reason = "não há cgroup v2 utilizável" if self.settings['cgroup'] else "'cgroup' está desabilitado"
+                print(f"Erro: display :{display_num}: memory_max/cpu_weight pedidos, mas {reason}; "
+                      f"a instância roda SEM esses limites")
+            return None
+
+        path = os.path.join(parent, f'pyluiz-display-{display_num}')
+        values = {
+            'cpu.weight': str(limits.get('cpu_weight', 100)) if 'cpu' in self._controllers else None,
+            'memory.max': str(limits.get('memory_max', 'max')) if 'memory' in self._controllers else None,
+            'cpuset.cpus': ','.join(map(str, limits['cpus'])) if 'cpus' in limits and 'cpuset' in self._controllers else None
+        }
+        try:
+            # Os comandos ficam em um cgroup filho, que pode ser congelado sem o Xephyr
+            os.makedirs(os.path.join(path, 'apps'), exist_ok=True)
+            for name, value in values.items():
+                if value is not None:
+                    with open(os.path.join(path, name), 'w') as f:
+                        f.write(value)
+        except OSError as e:
+            print(f"Erro ao configurar o cgroup do display :{display_num}: {e}")
+            return None
+        with self._lock:
+            self._cgroups[display_num] = path
+        return path
+
+    # ----- Aplicação -----
+
+    def prepare(self, display_num: int, limits: Dict) -> Dict:
+        """Limites efetivos da instância (com fixamento automático) e o cgroup dela
+
+        Chamado no início da instância e quando os limites mudam; o resultado
+        é usado por apply() em cada processo lançado.
+        """
+        effective = dict(limits)
+        if 'cpus' in effective:
+            self.pinner.release(display_num)
+        elif self.settings['auto_pin']:
+            effective['cpus'] = self.pinner.assign(display_num)
+        cgroup = self._prepare_cgroup(display_num, effective)
+        if cgroup:
+            effective['cgroup'] = cgroup
+        return effective
+
+    @staticmethod
+    def _cgroup_for(effective: Dict, role: Optional[str]) -> Optional[str]:
+        cgroup = effective.get('cgroup')
+        if cgroup and role == 'app':
+            return os.path.join(cgroup, 'apps')
+        return cgroup
+
+    @staticmethod
+    def _ionice(proc: psutil.Process, ionice: str):
+        io_class, _, level = ionice.partition(':')
+        if io_class == 'idle':
+            proc.ionice(IONICE_CLASSES[io_class])
+        else:
+            proc.ionice(IONICE_CLASSES[io_class], int(level or 4))
+
+    def apply(self, pid: int, effective: Dict, role: Optional[str] = None):
+        """Aplica os limites a um processo recém-lançado (e a filhos que ele já tenha criado)
+
+        Comandos do usuário (role 'app') entram no cgroup filho 'apps'.
+        """
+        if effective:
+            self.apply_tree([pid], effective, role)
+
+    def apply_tree(self, pids: Iterable[int], effective: Dict, role: Optional[str] = None):
+        """Aplica os limites a processos já em execução e a todos os descendentes
+
+        Usado em cada processo lançado, quando um display do pool é adotado
+        e quando os limites de uma instância rodando são editados.
+        """
+        cgroup = self._cgroup_for(effective, role)
+        procs = {}
+        for pid in pids:
+            try:
+                proc = psutil.Process(pid)
+                procs[pid] = proc
+                procs.update((child.pid, child) for child in proc.children(recursive=True))
+            except psutil.Error:
+                pass
+
+        for proc in procs.values():
+            try:
+                if cgroup:
+                    with open(os.path.join(cgroup, 'cgroup.procs'), 'w') as f:
+                        f.write(str(proc.pid))
+                if 'cpus' in effective:
+                    proc.cpu_affinity(effective['cpus'])
+                if 'nice' in effective:
+                    proc.nice(effective['nice'])
+                if 'ionice' in effective:
+                    self._ionice(proc, effective['ionice'])
+            except (psutil.Error, OSError) as e:
+                print(f"Não foi possível aplicar limites ao processo {proc.pid}: {e}")
+
+    def release(self, display_num: int):
+        """Remove o cgroup (já vazio) e devolve os núcleos fixados da instância"""
+        self.pinner.release(display_num)
+        with self._lock:
+            path = self._cgroups.pop(display_num, None)
+        if path:
+            try:
+                os.rmdir(os.path.join(path, 'apps'))
+                os.rmdir(path)
+            except OSError as e:
+                print(f"Não foi possível remover o cgroup {path}: {e}")
+
+    def _write_cgroup(self, display_num: int, name: str, value: str) -> bool:
+        with self._lock:
+            path = self._cgroups.get(display_num)
+        if not path:
+            return False
+        try:
+            with open(os.path.join(path, name), 'w') as f:
+                f.write(value)
+            return True
+        except OSError as e:
+            print(f"Erro ao escrever {name} no cgroup do display :{display_num}: {e}")
+            return False
+
+    def set_cpu_weight(self, display_num: int, weight: int) -> bool:
+        """Troca o cpu.weight da instância na hora; False sem cgroup com controlador cpu"""
+        if 'cpu' not in self._controllers:
+            return False
+        return self._write_cgroup(display_num, 'cpu.weight', str(weight))
+
+    def freeze_apps(self, display_num: int, frozen: bool) -> bool:
+        """Congela/descongela o cgroup 'apps' (freezer do cgroup v2); False sem cgroup"""
+        return self._write_cgroup(display_num, os.path.join('apps', 'cgroup.freeze'), '1' if frozen else '0')
+
+    def usage(self, display_num: int) -> Optional[Dict]:
+        """Uso de memória e CPU registrado pelo cgroup da instância"""
+        with self._lock:
+            path = self._cgroups.get(display_num)
+        if not path:
+            return None
+        usage = {}
+        try:
+            if 'memory' in self._controllers:
+                with open(os.path.join(path, 'memory.current'), 'r') as f:
+                    usage['memory_current'] = int(f.read())
+            with open(os.path.join(path, 'cpu.stat'), 'r') as f:
+                for line in f:
+                    name, _, value = line.partition(' ')
+                    if name == 'usage_usec':
+                        usage['cpu_usage_usec'] = int(value)
+        except (OSError, ValueError):
+            pass
+        return usage
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+import psutil
+
+
+# Atributos lidos de cada processo em uma única passada de process_iter
+SAMPLE_ATTRS = ['pid', 'ppid', 'cpu_percent', 'memory_info', 'num_threads', 'num_fds']
+
+
+class ResourceSampler:
+    """Amostra CPU, memória, threads e FDs da árvore de processos de cada instância
+
+    Cada rodada faz uma única chamada a psutil.process_iter para o sistema
+    inteiro e monta as árvores a partir do mapa de pais, de modo que o custo
+    não cresce com chamadas por PID. As amostras ficam em um buffer circular
+    de tamanho fixo por instância.
+    """
+
+    def __init__(self, history: int = 60, interval: float = 2.0, include_pss: bool = False):
+        self.history = history
+        self.interval = interval
+        self.include_pss = include_pss
+        self.samples: Dict[int, Deque[Dict]] = {}
+        self._lock = threading.Lock()
+        self._running = False
+
+    def sample(self, roots: Dict[int, List[int]]) -> Dict[int, Dict]:
+        """Faz uma rodada de amostragem; roots mapeia display -> PIDs raiz da instância"""
+        procs: Dict[int, Dict] = {}
+        children: Dict[int, List[int]] = {}
+        for proc in psutil.process_iter(SAMPLE_ATTRS):
+            info = proc.info
+            info['process'] = proc
+            procs[info['pid']] = info
+            children.setdefault(info['ppid'], []).append(info['pid'])
+
+        timestamp = time.time()
+        results = {}
+        for display_num, root_pids in roots.items():
+            tree = self._walk(root_pids, procs, children)
+            results[display_num] = self._aggregate(tree, timestamp)
+
+        with self._lock:
+            for display_num, result in results.items():
+                if display_num not in self.samples:
+                    self.samples[display_num] = deque(maxlen=self.history)
+                self.samples[display_num].append(result)
+            # Esquece instâncias que não existem mais
+            for display_num in list(self.samples):
+                if display_num not in roots:
+                    del self.samples[display_num]
+        return results
+
+    @staticmethod
+    def _walk(root_pids: List[int], procs: Dict[int, Dict], children: Dict[int, List[int]]) -> List[Dict]:
+        tree = []
+        seen = set()
+        stack = [pid for pid in root_pids if pid in procs]
+        while stack:
+            pid = stack.pop()
+            if pid in seen:
+                continue
+            seen.add(pid)
+            tree.append(procs[pid])
+            stack.extend(children.get(pid, []))
+        return tree
+
+    def _aggregate(self, tree: List[Dict], timestamp: float) -> Dict:
+        result = {
+            'timestamp': timestamp,
+            'processes': len(tree),
+            'cpu_percent': 0.0,
+            'rss': 0,
+            'pss': None,
+            'threads': 0,
+            'fds': 0
+        }
+        pss = 0
+        for info in tree:
+            result['cpu_percent'] += info['cpu_percent'] or 0.0
+            if info['memory_info']:
+                result['rss'] += info['memory_info'].rss
+            result['threads'] += info['num_threads'] or 0
+            result['fds'] += info['num_fds'] or 0
+            if self.include_pss:
+                # PSS exige ler smaps, bem mais caro: só quando pedido
+                try:
+                    pss += info['process'].memory_full_info().pss
+                except (psutil.Error, AttributeError):
+                    pass
+        if self.include_pss:
+            result['pss'] = pss
+        return result
+
+    def latest(self, display_num: int) -> Optional[Dict]:
+        with self._lock:
+            buffer = self.samples.get(display_num)
+            return buffer[-1] if buffer else None
+
+    def get_history(self, display_num: int) -> List[Dict]:
+        with self._lock:
+            return list(self.samples.get(display_num, []))
+
+    def start(self, get_roots: Callable[[], Dict[int, List[int]]], on_sample: Optional[Callable[[Dict], None]] = None):
+        """Inicia a amostragem periódica em uma thread"""
+        if self._running:
+            return
+        self._running = True
+
+        def sample_loop():
+            while self._running:
+                try:
+                    results = self.sample(get_roots())
+                    if on_sample:
+                        on_sample(results)
+                except Exception as e:
+                    print(f"Erro ao amostrar recursos: {e}")
+                time.sleep(self.interval)
+
+        threading.Thread(target=sample_loop, daemon=True).start()
+
+    def stop(self):
+        self._running = False
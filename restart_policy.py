@@ -0,0 +1,173 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Hashable, List, Optional
+
+
+# Políticas aceitas por instância
+RESTART_POLICIES = ('never', 'on-failure', 'always')
+
+# Valores padrão da seção "restart" do arquivo de configuração
+DEFAULT_RESTART = {
+    'backoff_initial': 1.0,     # Espera antes do primeiro reinício (segundos)
+    'backoff_factor': 2.0,      # Multiplicador a cada falha seguida
+    'backoff_max': 60.0,        # Espera máxima entre reinícios
+    'jitter': 0.2,              # Variação aleatória de ±20% na espera
+    'reset_after': 60.0,        # Segundos rodando que zeram o backoff
+    'max_restarts': 5,          # Falhas toleradas dentro de 'window'...
+    'window': 300.0,            # ...antes de abrir o circuito
+    'cooldown': 900.0           # Circuito aberto: tempo até permitir uma nova tentativa
+}
+
+
+def should_restart(policy: str, returncode: Optional[int]) -> bool:
+    """Decide pelo código de saída se a política pede reinício"""
+    if policy == 'always':
+        return True
+    if policy == 'on-failure':
+        return returncode != 0
+    return False
+
+
+class RestartController:
+    """Reinícios automáticos com backoff exponencial e disjuntor de crash-loop
+
+    Cada falha agenda a ação de reinício depois de
+    backoff_initial * backoff_factor^tentativa (limitado a backoff_max, com
+    jitter). Se a chave falhar mais de max_restarts vezes dentro de 'window'
+    segundos, o circuito abre e os reinícios automáticos param por
+    'cooldown' segundos; depois disso é feita uma única tentativa, e se ela
+    falhar antes de 'reset_after' o circuito reabre. Um início manual
+    (reset) fecha o circuito.
+    """
+
+    def __init__(self, settings: Optional[Dict] = None):
+        self.settings = dict(DEFAULT_RESTART)
+        if settings:
+            self.settings.update(settings)
+        self._states: Dict[Hashable, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, key: Hashable) -> Dict:
+        state = self._states.get(key)
+        if state is None:
+            state = {
+                'failures': deque(),    # Horários das falhas recentes
+                'attempt': 0,
+                'last_restart': 0.0,
+                'open_until': 0.0,
+                'half_open': False,
+                'timer': None,
+                'next_at': None,
+                'restarts': 0
+            }
+            self._states[key] = state
+        return state
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.settings['backoff_max'],
+                    self.settings['backoff_initial'] * self.settings['backoff_factor'] ** attempt)
+        jitter = self.settings['jitter']
+        return max(0.0, delay * (1 + random.uniform(-jitter, jitter)))
+
+    def on_failure(self, key: Hashable, action: Callable[[], None]) -> Optional[float]:
+        """Registra uma falha e agenda a ação; retorna a espera, ou None se nada foi agendado
+
+        None significa que já havia um reinício agendado ou que o circuito
+        abriu (ver is_open); com o circuito aberto, a ação só roda como
+        tentativa única depois de 'cooldown'.
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(key)
+            if state['timer'] is not None:
+                # Já há um reinício (ou tentativa) agendado para esta chave
+                return None
+
+            failures: Deque[float] = state['failures']
+            failures.append(now)
+            while failures and now - failures[0] > self.settings['window']:
+                failures.popleft()
+
+            # Ficou rodando tempo suficiente: recomeça o backoff e fecha o circuito
+            if state['last_restart'] and now - state['last_restart'] > self.settings['reset_after']:
+                state['attempt'] = 0
+                state['half_open'] = False
+
+            if state['half_open'] or len(failures) > self.settings['max_restarts']:
+                state['open_until'] = now + self.settings['cooldown']
+                state['half_open'] = True
+                failures.clear()
+                self._schedule(state, key, action, self.settings['cooldown'])
+                return None
+
+            delay = self._backoff(state['attempt'])
+            state['attempt'] += 1
+            self._schedule(state, key, action, delay)
+            return delay
+
+    def _schedule(self, state: Dict, key: Hashable, action: Callable[[], None], delay: float):
+        state['next_at'] = time.monotonic() + delay
+        timer = threading.Timer(delay, self._fire, args=(key, action))
+        timer.daemon = True
+        state['timer'] = timer
+        timer.start()
+
+    def is_open(self, key: Hashable) -> bool:
+        with self._lock:
+            state = self._states.get(key)
+            return bool(state) and time.monotonic() < state['open_until']
+
+    def _fire(self, key: Hashable, action: Callable[[], None]):
+        with self._lock:
+            state = self._states.get(key)
+            if state is None or state['timer'] is None:
+                return
+            state['timer'] = None
+            state['next_at'] = None
+            state['last_restart'] = time.monotonic()
+            state['restarts'] += 1
+        try:
+            action()
+        except Exception as e:
+            print(f"Erro ao reiniciar automaticamente: {e}")
+
+    def cancel(self, key: Hashable):
+        """Desiste de um reinício agendado (parada ou remoção manual)"""
+        with self._lock:
+            state = self._states.get(key)
+            if state and state['timer'] is not None:
+                state['timer'].cancel()
+                state['timer'] = None
+                state['next_at'] = None
+
+    def reset(self, key: Hashable):
+        """Início manual: fecha o circuito e zera o backoff"""
+        with self._lock:
+            state = self._states.get(key)
+            if state:
+                if state['timer'] is not None:
+                    state['timer'].cancel()
+                self._states.pop(key)
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._states)
+
+    def status(self, key: Hashable) -> Dict:
+        """Resumo para a interface: reinícios feitos, circuito e próximo reinício"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return {'restarts': 0, 'circuit': 'closed', 'next_restart_in': None}
+            if now < state['open_until']:
+                circuit = 'open'
+            else:
+                circuit = 'half-open' if state['half_open'] else 'closed'
+            return {
+                'restarts': state['restarts'],
+                'circuit': circuit,
+                'next_restart_in': max(0.0, state['next_at'] - now) if state['next_at'] else None
+            }
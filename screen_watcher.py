@@ -0,0 +1,155 @@
+import selectors
+import socket
+import struct
+import threading
+from typing import Callable, Dict, Optional, Set
+
+from x11_client import X11Connection, X11Error
+
+
+STRUCTURE_NOTIFY_MASK = 1 << 17
+CONFIGURE_NOTIFY = 22
+
+
+class ScreenSizeWatcher:
+    """Acompanha o tamanho da tela de vários displays por eventos
+
+    Cada display observado mantém uma única conexão X aberta, com
+    StructureNotify selecionado na raiz: a RandR (inclusive a do Xephyr com
+    -resizeable, quando a janela no host muda de tamanho) gera um
+    ConfigureNotify na raiz com o novo tamanho. Uma só thread espera em todas
+    as conexões com selectors, então nada é feito enquanto nenhuma tela muda,
+    seja qual for o número de displays. Conexões são abertas e fechadas na
+    própria thread; watch/unwatch só deixam o pedido e a acordam.
+    """
+
+    def __init__(self, on_resize: Callable[[int, int, int], None]):
+        # Chamado com (display, largura, altura) ao começar a observar e a cada mudança
+        self.on_resize = on_resize
+        self._wanted: Set[int] = set()
+        self._connections: Dict[int, X11Connection] = {}
+        self._buffers: Dict[int, bytearray] = {}
+        self._lock = threading.Lock()
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._wakeup: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def watch(self, display_num: int):
+        with self._lock:
+            self._wanted.add(display_num)
+        self._wake()
+
+    def unwatch(self, display_num: int):
+        with self._lock:
+            self._wanted.discard(display_num)
+        self._wake()
+
+    def _wake(self):
+        wakeup = self._wakeup
+        if wakeup is not None:
+            try:
+                wakeup.send(b'\0')
+            except OSError:
+                pass
+
+    # ----- Thread de eventos -----
+
+    def _open(self, display_num: int):
+        try:
+            conn = X11Connection(display_num)
+            conn.select_input(conn.root, STRUCTURE_NOTIFY_MASK)
+            size = conn.get_geometry()
+        except (OSError, X11Error) as e:
+            print(f"Não foi possível acompanhar o tamanho do display :{display_num}: {e}")
+            with self._lock:
+                self._wanted.discard(display_num)
+            return
+        self._connections[display_num] = conn
+        self._buffers[display_num] = bytearray()
+        self._selector.register(conn.sock, selectors.EVENT_READ, display_num)
+        # Mudanças anteriores à conexão (entre o início e a observação)
+        self.on_resize(display_num, *size)
+
+    def _close(self, display_num: int):
+        conn = self._connections.pop(display_num, None)
+        self._buffers.pop(display_num, None)
+        if conn is not None:
+            self._selector.unregister(conn.sock)
+            conn.close()
+
+    def _sync_wanted(self):
+        with self._lock:
+            wanted = set(self._wanted)
+        for display_num in list(self._connections):
+            if display_num not in wanted:
+                self._close(display_num)
+        for display_num in wanted - set(self._connections):
+            self._open(display_num)
+
+    def _read(self, display_num: int):
+        conn = self._connections[display_num]
+        try:
+            data = conn.sock.recv(4096)
+        except OSError:
+            data = b''
+        if not data:
+            # Servidor encerrado: a parada da instância também chama unwatch
+            self._close(display_num)
+            with self._lock:
+                self._wanted.discard(display_num)
+            return
+        buffer = self._buffers[display_num]
+        buffer.extend(data)
+        # Sem requisições pendentes, só chegam eventos e erros de 32 bytes
+        while len(buffer) >= 32:
+            code = buffer[0] & 0x7F
+            if code == CONFIGURE_NOTIFY:
+                window, = struct.unpack_from('<I', buffer, 8)
+                width, height = struct.unpack_from('<HH', buffer, 20)
+                if window == conn.root:
+                    self.on_resize(display_num, width, height)
+            del buffer[:32]
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._selector = selectors.DefaultSelector()
+        self._wakeup, wakeup_reader = socket.socketpair()
+        wakeup_reader.setblocking(False)
+        self._selector.register(wakeup_reader, selectors.EVENT_READ, None)
+
+        def event_loop():
+            while self._running:
+                self._sync_wanted()
+                for key, _ in self._selector.select():
+                    if key.data is None:
+                        try:
+                            wakeup_reader.recv(4096)
+                        except OSError:
+                            pass
+                    elif key.data in self._connections:
+                        try:
+                            self._read(key.data)
+                        except Exception as e:
+                            print(f"Erro ao acompanhar o tamanho do display :{key.data}: {e}")
+            for display_num in list(self._connections):
+                self._close(display_num)
+            self._selector.close()
+            wakeup_reader.close()
+
+        self._thread = threading.Thread(target=event_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        self._wake()
+        # A thread fecha as conexões e o seletor antes de um novo start()
+        if self._thread is not threading.current_thread():
+            self._thread.join(2.0)
+        wakeup, self._wakeup = self._wakeup, None
+        if wakeup is not None:
+            wakeup.close()
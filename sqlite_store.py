@@ -0,0 +1,161 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config_store import ConfigStore
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS instances (
+    display_num INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    command TEXT NOT NULL DEFAULT '',
+    usb_port TEXT NOT NULL DEFAULT '',
+    peak_rss INTEGER NOT NULL DEFAULT 0,
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS instances_name ON instances (name);
+CREATE INDEX IF NOT EXISTS instances_usb_port ON instances (usb_port);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    display_num INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    returncode INTEGER
+);
+CREATE INDEX IF NOT EXISTS events_display_ts ON events (display_num, ts);
+CREATE INDEX IF NOT EXISTS events_type_ts ON events (type, ts);
+"""
+
+# Colunas próprias; os demais campos da instância ficam em JSON na coluna 'extra'
+INSTANCE_COLUMNS = ('name', 'width', 'height', 'command', 'usb_port', 'peak_rss')
+
+
+class SQLiteStore(ConfigStore):
+    """Backend SQLite: instâncias indexadas e histórico de ciclo de vida
+
+    Mesma interface do ConfigStore (gravação agrupada por 'delay'), mas cada
+    gravação só envia as linhas que mudaram desde a anterior, junto com os
+    eventos pendentes, em uma única transação. A tabela events é somente de
+    inserção (start, stop, crash e exit com código de saída) e nunca é lida
+    na inicialização; fica disponível para consultas como crash_counts().
+    """
+
+    def __init__(self, path: str, snapshot: Callable[[], Dict], delay: float = 0.5):
+        super().__init__(path, snapshot, delay)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        # Estado já gravado, para enviar só as diferenças
+        self._settings: Dict[str, str] = {}
+        self._rows: Dict[int, Tuple] = {}
+        self._pending_events: List[Tuple] = []
+        self._events_lock = threading.Lock()
+
+    def _migrate(self):
+        """Acrescenta colunas criadas depois da primeira versão do banco"""
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(instances)')}
+        if 'extra' not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE instances ADD COLUMN extra TEXT NOT NULL DEFAULT '{}'")
+
+    @staticmethod
+    def _row(instance: Dict) -> Tuple:
+        extra = {key: value for key, value in instance.items()
+                 if key not in INSTANCE_COLUMNS and key != 'display_num'}
+        return tuple(instance[column] for column in INSTANCE_COLUMNS) + \
+            (json.dumps(extra, ensure_ascii=False, sort_keys=True),)
+
+    def load(self) -> Optional[Dict]:
+        with self._write_lock:
+            self._settings = dict(self.conn.execute('SELECT key, value FROM settings'))
+            rows = self.conn.execute(
+                'SELECT display_num, ' + ', '.join(INSTANCE_COLUMNS) + ', extra FROM instances ORDER BY display_num'
+            ).fetchall()
+        self._rows = {row[0]: tuple(row[1:]) for row in rows}
+        if not self._settings and not rows:
+            return None
+
+        data = {key: json.loads(value) for key, value in self._settings.items()}
+        self.version = data.pop('version', 0)
+        data['instances'] = {
+            str(row[0]): {**json.loads(row[-1]), 'display_num': row[0], **dict(zip(INSTANCE_COLUMNS, row[1:-1]))}
+            for row in rows
+        }
+        return data
+
+    def record_event(self, display_num: int, event_type: str, returncode: Optional[int] = None):
+        """Enfileira um evento; ele entra no banco junto com a próxima gravação"""
+        with self._events_lock:
+            self._pending_events.append((time.time(), display_num, event_type, returncode))
+        self.schedule()
+
+    def _write(self):
+        with self._write_lock:
+            try:
+                data = self._snapshot()
+                instances = data.pop('instances', {})
+                settings = {key: json.dumps(value, ensure_ascii=False, sort_keys=True)
+                            for key, value in data.items()}
+                rows = {int(display): self._row(instance) for display, instance in instances.items()}
+
+                changed_settings = [(key, value) for key, value in settings.items()
+                                    if self._settings.get(key) != value]
+                changed_rows = [(display, *row) for display, row in rows.items()
+                                if self._rows.get(display) != row]
+                removed = [(display,) for display in self._rows if display not in rows]
+                with self._events_lock:
+                    events, self._pending_events = self._pending_events, []
+
+                if not (changed_settings or changed_rows or removed or events):
+                    return
+
+                version = self.version + 1
+                changed_settings.append(('version', json.dumps(version)))
+                with self.conn:
+                    self.conn.executemany(
+                        'INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)', changed_settings)
+                    self.conn.executemany(
+                        'INSERT OR REPLACE INTO instances (display_num, ' + ', '.join(INSTANCE_COLUMNS) + ', extra)'
+                        ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)', changed_rows)
+                    self.conn.executemany('DELETE FROM instances WHERE display_num = ?', removed)
+                    self.conn.executemany(
+                        'INSERT INTO events (ts, display_num, type, returncode) VALUES (?, ?, ?, ?)', events)
+
+                self._settings.update(changed_settings)
+                self._rows = rows
+                self.version = version
+                self.writes += 1
+            except Exception as e:
+                print(f"Erro ao salvar configurações: {e}")
+
+    def crash_counts(self, since: float, minimum: int = 1) -> Dict[int, int]:
+        """Quedas por display desde o timestamp 'since' (com pelo menos 'minimum')"""
+        self.flush()
+        with self._write_lock:
+            rows = self.conn.execute(
+                "SELECT display_num, COUNT(*) FROM events WHERE type = 'crash' AND ts >= ?"
+                " GROUP BY display_num HAVING COUNT(*) >= ?",
+                (since, minimum)
+            ).fetchall()
+        return dict(rows)
+
+    def history(self, display_num: int, limit: int = 100) -> List[Dict]:
+        """Eventos mais recentes de um display, do mais novo para o mais antigo"""
+        self.flush()
+        with self._write_lock:
+            rows = self.conn.execute(
+                'SELECT ts, type, returncode FROM events WHERE display_num = ? ORDER BY ts DESC LIMIT ?',
+                (display_num, limit)
+            ).fetchall()
+        return [{'ts': ts, 'type': event_type, 'returncode': returncode} for ts, event_type, returncode in rows]
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Os módulos do gerenciador ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission_control import AdmissionController  # noqa: E402
+from restart_policy import RestartController  # noqa: E402
+
+
+@pytest.fixture
+def wait_for():
+    """Espera (por polling) até a condição valer, falhando depois de 'timeout' segundos"""
+    def wait(condition, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < deadline, "tempo esgotado"
+            time.sleep(0.005)
+    return wait
+
+
+@pytest.fixture
+def admission_controller():
+    """Fábrica de AdmissionController onde só o orçamento (100 MB) decide
+
+    Retorna (controlador, displays lançados pela fila, em ordem).
+    """
+    def make(**settings):
+        # Sem mínimo de memória livre e sem limite de carga
+        controller = AdmissionController(dict({
+            'enabled': True,
+            'min_free_mb': 0,
+            'max_load_per_cpu': 0,
+            'memory_budget_mb': 100,
+            'base_cost_mb': 0,
+            'framebuffer_copies': 1,
+            'retry_interval': 0.01
+        }, **settings))
+        launched = []
+
+        def launch(display_num):
+            launched.append(display_num)
+            return True
+
+        controller.bind(launch, lambda reserved: 0)
+        return controller, launched
+    return make
+
+
+@pytest.fixture
+def restart_controller():
+    """Fábrica de RestartController com backoff curto; cancela os reinícios pendentes no fim"""
+    controllers = []
+
+    def make(**settings):
+        controller = RestartController(dict({
+            'backoff_initial': 0.01,
+            'backoff_factor': 2.0,
+            'backoff_max': 0.04,
+            'jitter': 0.0,
+            'max_restarts': 3,
+            'window': 60.0,
+            'cooldown': 60.0
+        }, **settings))
+        controllers.append(controller)
+        return controller
+    yield make
+    for controller in controllers:
+        for key in controller.keys():
+            controller.cancel(key)
@@ -0,0 +1,49 @@
+from admission_control import AdmissionController
+
+MB = 1024 * 1024
+
+
+def test_estimate_cost_uses_framebuffer_or_peak_rss():
+    controller = AdmissionController({'base_cost_mb': 10, 'framebuffer_copies': 2})
+    framebuffer = 800 * 600 * 4 * 2 + 10 * MB
+    assert controller.estimate_cost(800, 600) == framebuffer
+    assert controller.estimate_cost(800, 600, peak_rss=framebuffer + 1) == framebuffer + 1
+
+
+def test_request_admits_within_budget_and_queues_beyond_it(admission_controller):
+    controller, _ = admission_controller()
+    assert controller.request(1, 60 * MB)
+    assert not controller.request(2, 60 * MB)
+    assert controller.is_queued(2)
+    assert not controller.is_queued(1)
+
+
+def test_new_requests_do_not_jump_the_queue(admission_controller):
+    controller, _ = admission_controller()
+    controller.request(1, 60 * MB)
+    controller.request(2, 60 * MB)
+    # Caberia no orçamento, mas há alguém esperando antes
+    assert not controller.request(3, 10 * MB)
+    assert controller.is_queued(3)
+
+
+def test_cancel_removes_only_queued_instances(admission_controller):
+    controller, _ = admission_controller()
+    controller.request(1, 60 * MB)
+    controller.request(2, 60 * MB)
+    assert controller.cancel(2)
+    assert not controller.is_queued(2)
+    assert not controller.cancel(1)
+
+
+def test_queue_drains_in_order_after_release(admission_controller, wait_for):
+    controller, launched = admission_controller()
+    controller.request(1, 60 * MB)
+    controller.request(2, 60 * MB)
+    controller.request(3, 10 * MB)
+    assert launched == []
+
+    controller.release(1)
+    wait_for(lambda: len(launched) == 2)
+    assert launched == [2, 3]
+    assert not controller.is_queued(2) and not controller.is_queued(3)
@@ -0,0 +1,103 @@
+import os
+import shutil
+
+import pytest
+
+from command_launcher import CommandLauncher
+
+
+class FixedShellLauncher(CommandLauncher):
+    """Launcher com um snapshot do shell definido pelo teste, sem rodar 'bash -i'"""
+
+    def __init__(self, aliases=None, functions=(), path=''):
+        super().__init__()
+        self.snapshot = (dict(aliases or {}), set(functions), {'PATH': path, 'HOME': '/home/teste'})
+
+    @staticmethod
+    def _current_rc_mtimes():
+        return {}
+
+    def _capture(self):
+        return self.snapshot
+
+
+@pytest.fixture
+def bin_dir(tmp_path):
+    """PATH com um único executável, 'app'"""
+    directory = tmp_path / 'bin'
+    directory.mkdir()
+    app = directory / 'app'
+    app.write_text('#!/bin/sh\n')
+    app.chmod(0o755)
+    return str(directory)
+
+
+def test_simple_command_runs_without_shell(bin_dir):
+    launcher = FixedShellLauncher(path=bin_dir)
+    assert launcher.resolve('app --fullscreen "meu perfil"') == ['app', '--fullscreen', 'meu perfil']
+
+
+def test_paths_and_tilde_are_expanded_directly(bin_dir):
+    launcher = FixedShellLauncher(path=bin_dir)
+    assert launcher.resolve('/opt/jogo/start -x') == ['/opt/jogo/start', '-x']
+    assert launcher.resolve('~/bin/start') == [os.path.expanduser('~/bin/start')]
+
+
+def test_alias_of_first_word_is_expanded(bin_dir):
+    launcher = FixedShellLauncher({'jogo': 'app --windowed', 'j': 'jogo'}, path=bin_dir)
+    assert launcher.resolve('j --server 2') == ['app', '--windowed', '--server', '2']
+
+
+def test_recursive_alias_does_not_loop(bin_dir):
+    launcher = FixedShellLauncher({'app': 'app --safe'}, path=bin_dir)
+    assert launcher.resolve('app') == ['app', '--safe']
+
+
+@pytest.mark.parametrize('command', [
+    'app | tee log',
+    'app > saida.txt',
+    'app && app',
+    'app $HOME',
+    'app *.cfg',
+    'VAR=1 app',
+    'cd /tmp',
+])
+def test_shell_syntax_builtins_and_assignments_use_bash_c(bin_dir, command):
+    launcher = FixedShellLauncher(path=bin_dir)
+    assert launcher.resolve(command) == ['bash', '-c', command]
+
+
+def test_shell_syntax_in_alias_uses_expanded_command(bin_dir):
+    launcher = FixedShellLauncher({'logado': 'app | tee log'}, path=bin_dir)
+    assert launcher.resolve('logado -v') == ['bash', '-c', 'app | tee log -v']
+
+
+def test_bashrc_function_needs_interactive_shell(bin_dir):
+    launcher = FixedShellLauncher(functions={'abrir_jogo'}, path=bin_dir)
+    assert launcher.resolve('abrir_jogo 3') == ['bash', '-i', '-c', 'abrir_jogo 3']
+
+
+def test_unbalanced_quotes_fall_back_to_bash(bin_dir):
+    launcher = FixedShellLauncher(path=bin_dir)
+    assert launcher.resolve('app "sem fim') == ['bash', '-c', 'app "sem fim']
+
+
+def test_environment_overrides_snapshot(bin_dir):
+    launcher = FixedShellLauncher(path=bin_dir)
+    env = launcher.environment({'DISPLAY': ':5'})
+    assert env['DISPLAY'] == ':5'
+    assert env['PATH'] == bin_dir
+
+
+@pytest.mark.skipif(shutil.which('bash') is None, reason="bash não instalado")
+def test_capture_reads_aliases_functions_and_environment(tmp_path, monkeypatch):
+    (tmp_path / '.bashrc').write_text(
+        "alias jogo='app --windowed'\n"
+        "abrir_jogo() { app; }\n"
+        "export PYLUIZ_TESTE=1\n"
+    )
+    monkeypatch.setenv('HOME', str(tmp_path))
+    aliases, functions, environment = CommandLauncher()._capture()
+    assert aliases['jogo'] == 'app --windowed'
+    assert 'abrir_jogo' in functions
+    assert environment['PYLUIZ_TESTE'] == '1'
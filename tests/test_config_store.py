@@ -0,0 +1,91 @@
+import json
+import os
+import time
+
+from config_store import ConfigStore, open_store
+
+
+def make_store(tmp_path, state, delay=0.0):
+    return ConfigStore(str(tmp_path / 'config.json'), lambda: dict(state), delay)
+
+
+def read(store):
+    with open(store.path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_schedule_without_delay_writes_with_version(tmp_path):
+    state = {'last_width': 800}
+    store = make_store(tmp_path, state)
+    store.schedule()
+    assert read(store) == {'last_width': 800, 'version': 1}
+    assert store.writes == 1
+
+
+def test_requests_within_delay_become_one_write(tmp_path):
+    state = {'last_width': 800}
+    store = make_store(tmp_path, state, delay=0.05)
+    for width in (801, 802, 803):
+        state['last_width'] = width
+        store.schedule()
+    assert not os.path.exists(store.path)
+    time.sleep(0.2)
+    assert store.writes == 1
+    assert read(store)['last_width'] == 803
+
+
+def test_flush_writes_only_when_pending(tmp_path):
+    state = {'last_width': 800}
+    store = make_store(tmp_path, state, delay=60.0)
+    store.flush()
+    assert not os.path.exists(store.path)
+
+    store.schedule()
+    store.flush()
+    assert store.writes == 1
+    # O estado mudou, mas ninguém pediu gravação
+    state['last_width'] = 1024
+    store.flush()
+    assert store.writes == 1
+
+
+def test_unchanged_content_is_not_rewritten(tmp_path):
+    state = {'last_width': 800}
+    store = make_store(tmp_path, state)
+    store.schedule()
+    store.schedule()
+    assert store.writes == 1
+    state['last_width'] = 1024
+    store.schedule()
+    assert store.writes == 2
+    assert read(store)['version'] == 2
+
+
+def test_load_does_not_cause_a_rewrite(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps({'last_width': 640, 'version': 7}), encoding='utf-8')
+    mtime = os.stat(path).st_mtime_ns
+
+    store = ConfigStore(str(path), lambda: {'last_width': 640})
+    assert store.load()['last_width'] == 640
+    store.schedule()
+    store.flush()
+    assert store.writes == 0
+    assert os.stat(path).st_mtime_ns == mtime
+    assert store.version == 7
+
+
+def test_write_keeps_permissions_and_leaves_no_temp_files(tmp_path):
+    state = {'last_width': 800}
+    store = make_store(tmp_path, state)
+    store.schedule()
+    os.chmod(store.path, 0o640)
+    state['last_width'] = 1024
+    store.schedule()
+    assert os.stat(store.path).st_mode & 0o777 == 0o640
+    assert os.listdir(tmp_path) == ['config.json']
+
+
+def test_open_store_picks_backend_by_extension(tmp_path):
+    assert type(open_store(str(tmp_path / 'config.json'), dict)) is ConfigStore
+    assert type(open_store(str(tmp_path / 'config.db'), dict)).__name__ == 'SQLiteStore'
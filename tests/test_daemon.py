@@ -0,0 +1,117 @@
+import os
+import signal
+import socket
+import stat
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from daemon_client import DaemonClient, DaemonError, daemon_available
+
+DAEMON = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'xephyr_daemon.py')
+
+
+def run_daemon(socket_path, config_path):
+    return subprocess.Popen([sys.executable, DAEMON, '--socket', socket_path, '--config', config_path],
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+
+@pytest.fixture
+def daemon(tmp_path, wait_for):
+    """Daemon de verdade em um subprocesso, com socket e configuração temporários"""
+    socket_path = str(tmp_path / 'daemon.sock')
+    process = run_daemon(socket_path, str(tmp_path / 'config.json'))
+    wait_for(lambda: daemon_available(socket_path) or process.poll() is not None, timeout=10.0)
+    assert process.poll() is None, process.stdout.read().decode()
+    yield socket_path
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=10)
+    process.stdout.close()
+
+
+@pytest.fixture
+def client(daemon):
+    client = DaemonClient(daemon, timeout=10.0)
+    yield client
+    client.close()
+
+
+def test_socket_is_private(daemon):
+    assert stat.S_IMODE(os.stat(daemon).st_mode) == 0o600
+
+
+def test_create_list_and_get(client):
+    display = client.call('create', name="teste", width=640, height=480)
+    listed = client.call('list')
+    assert [(item['display'], item['name'], item['state']) for item in listed] == [(display, "teste", 'created')]
+    assert client.call('get', display=display)['width'] == 640
+    assert client.call('get', display=display + 100) is None
+
+
+def test_errors_are_returned_per_request(client):
+    with pytest.raises(DaemonError, match="Método desconhecido"):
+        client.call('nao_existe')
+    # Parâmetro obrigatório ausente vira erro da chamada, e a conexão continua usável
+    with pytest.raises(DaemonError):
+        client.call('get')
+    assert client.call('ping') == 'pong'
+
+
+def test_invalid_json_gets_an_error_reply(daemon):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(10)
+        sock.connect(daemon)
+        sock.sendall(b'isto nao e json\n')
+        reply = sock.makefile('rb').readline()
+    assert b'"error"' in reply and b'"id": null' in reply
+
+
+def test_subscribers_receive_events(daemon, client, wait_for):
+    listener = DaemonClient(daemon, timeout=10.0)
+    received = []
+
+    def listen():
+        try:
+            for event in listener.events():
+                received.append(event)
+        except (OSError, ValueError, DaemonError):
+            pass
+
+    threading.Thread(target=listen, daemon=True).start()
+    # A assinatura acontece na thread: cria instâncias até o evento chegar
+    created = []
+    wait_for(lambda: created.append(client.call('create', name="eventos"))
+             or any(event['type'] == 'created' for event in received), timeout=5.0)
+    # Desbloqueia a leitura da thread antes de fechar
+    listener.sock.shutdown(socket.SHUT_RDWR)
+    listener.close()
+    assert {event['display'] for event in received if event['type'] == 'created'} <= set(created)
+
+
+def test_second_daemon_on_the_same_socket_is_refused(daemon, tmp_path):
+    second = run_daemon(daemon, str(tmp_path / 'outro.json'))
+    output, _ = second.communicate(timeout=10)
+    assert second.returncode == 1
+    assert "já há um daemon" in output.decode()
+    assert daemon_available(daemon)
+
+
+def test_stale_socket_is_replaced(tmp_path, wait_for):
+    socket_path = str(tmp_path / 'daemon.sock')
+    # Socket de um daemon que caiu: o arquivo existe, mas ninguém atende
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+    process = run_daemon(socket_path, str(tmp_path / 'config.json'))
+    try:
+        wait_for(lambda: daemon_available(socket_path) or process.poll() is not None, timeout=10.0)
+        assert process.poll() is None
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=10)
+        process.stdout.close()
+    # Encerrado com SIGTERM, o daemon remove o próprio socket
+    assert not os.path.exists(socket_path)
@@ -0,0 +1,100 @@
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+import display_allocator
+from display_allocator import DisplayAllocator
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    """Diretórios de sockets e locks isolados do X real da máquina"""
+    sockets = tmp_path / 'x11-unix'
+    locks = tmp_path / 'locks'
+    sockets.mkdir()
+    locks.mkdir()
+    monkeypatch.setattr(display_allocator, 'X11_SOCKET_DIR', str(sockets))
+    monkeypatch.setattr(display_allocator, 'LOCK_DIR', str(locks))
+    return sockets, locks
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def write_lock(locks, display_num, pid):
+    (locks / f'.X{display_num}-lock').write_text(f"{pid:>10}\n")
+
+
+def test_reserve_hands_out_lowest_free_number(dirs):
+    allocator = DisplayAllocator()
+    assert [allocator.reserve() for _ in range(3)] == [1, 2, 3]
+    allocator.release(2)
+    assert not allocator.is_reserved(2)
+    assert allocator.reserve() == 2
+    assert allocator.reserve() == 4
+
+
+def test_release_of_unknown_number_is_ignored(dirs):
+    allocator = DisplayAllocator()
+    allocator.release(5)
+    assert allocator.reserve() == 1
+
+
+def test_claim_skips_numbers_of_loaded_instances(dirs):
+    allocator = DisplayAllocator()
+    allocator.claim([1, 3])
+    assert allocator.is_reserved(3)
+    assert [allocator.reserve() for _ in range(2)] == [2, 4]
+
+
+def test_scan_reclaims_leftovers_of_dead_servers(dirs):
+    sockets, locks = dirs
+    write_lock(locks, 1, dead_pid())
+    (sockets / 'X2').touch()        # Socket sem ninguém escutando
+    allocator = DisplayAllocator()
+    assert allocator.scan() == set()
+    assert not (locks / '.X1-lock').exists()
+    assert not (sockets / 'X2').exists()
+    assert allocator.reserve() == 1
+
+
+def test_scan_keeps_displays_of_live_servers(dirs):
+    sockets, locks = dirs
+    write_lock(locks, 1, os.getpid())
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(sockets / 'X2'))
+    listener.listen(1)
+    try:
+        allocator = DisplayAllocator()
+        assert allocator.scan() == {1, 2}
+        assert allocator.reserve() == 3
+    finally:
+        listener.close()
+
+
+def test_reserve_skips_lock_created_after_scan(dirs):
+    _, locks = dirs
+    allocator = DisplayAllocator()
+    allocator.scan()
+    write_lock(locks, 1, os.getpid())
+    assert allocator.reserve() == 2
+
+
+def test_external_number_freed_on_next_scan(dirs):
+    _, locks = dirs
+    allocator = DisplayAllocator()
+    allocator.reserve()
+    allocator.release(1)
+    write_lock(locks, 1, os.getpid())
+    allocator.scan()
+    assert allocator.reserve() == 2
+
+    write_lock(locks, 1, dead_pid())
+    allocator.scan()
+    assert allocator.reserve() == 1
@@ -0,0 +1,87 @@
+import subprocess
+import threading
+
+import pytest
+
+from process_supervisor import ProcessSupervisor
+from xephyr_manager import (CRASHED, CREATED, READY, STARTING, STOPPED, STOPPING, TRANSITIONS, XephyrInstance)
+
+
+def instance_in(state):
+    instance = XephyrInstance(5)
+    instance.state = state
+    return instance
+
+
+def test_lifecycle_path():
+    instance = XephyrInstance(5)
+    assert instance.state == CREATED and not instance.is_running
+    for state in (STARTING, READY, STOPPING, STOPPED, STARTING, CRASHED):
+        assert instance.set_state(state)
+        assert instance.state == state
+    assert instance.is_running is False
+
+
+@pytest.mark.parametrize('current, target', [
+    (current, target) for current in TRANSITIONS for target in TRANSITIONS
+    if target not in TRANSITIONS[current]
+])
+def test_disallowed_transitions_are_refused(current, target):
+    instance = instance_in(current)
+    assert not instance.set_state(target)
+    assert instance.state == current
+
+
+def test_expected_states_guard_the_transition():
+    instance = instance_in(STARTING)
+    # Uma queda só vale se a instância ainda estava subindo ou pronta
+    assert not instance.set_state(STOPPING, {READY})
+    assert instance.set_state(CRASHED, {STARTING, READY})
+    assert not instance.set_state(CRASHED, {STARTING, READY})
+
+
+def test_only_one_thread_wins_a_transition():
+    instance = instance_in(READY)
+    barrier = threading.Barrier(8)
+    winners = []
+
+    def stop():
+        barrier.wait()
+        if instance.set_state(STOPPING, {READY}):
+            winners.append(threading.get_ident())
+
+    threads = [threading.Thread(target=stop) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(winners) == 1
+
+
+def test_transitions_are_published():
+    instance = XephyrInstance(5)
+    instance.supervisor = ProcessSupervisor()
+    events = []
+    instance.supervisor.subscribe(events.append)
+    instance.set_state(STARTING)
+    instance.set_state(STOPPED)
+    instance.set_state(READY)
+    assert events == [{'type': 'state', 'display': 5, 'state': STARTING},
+                      {'type': 'state', 'display': 5, 'state': STOPPED}]
+
+
+def test_begin_start_after_crash_collects_leftovers():
+    instance = instance_in(CRASHED)
+    # xfwm4 que sobreviveu à queda do Xephyr
+    leftover = subprocess.Popen(['sleep', '30'], start_new_session=True)
+    instance.registry.register(leftover, 'wm')
+    assert instance.begin_start()
+    assert instance.state == STARTING
+    assert leftover.poll() is not None
+    assert instance.registry.entries() == []
+
+
+def test_begin_start_is_refused_while_running():
+    instance = instance_in(READY)
+    assert not instance.begin_start()
+    assert instance.state == READY
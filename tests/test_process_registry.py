@@ -0,0 +1,103 @@
+import signal
+import subprocess
+import sys
+
+import psutil
+import pytest
+
+from process_registry import ProcessRegistry
+
+
+def gone(proc: psutil.Process) -> bool:
+    # Órfãos são recolhidos pelo init, que pode demorar a fazer o wait()
+    try:
+        return not proc.is_running() or proc.status() == psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return True
+
+
+def spawn(*args, **kwargs):
+    # Como os processos das instâncias: cada um no próprio grupo (setsid)
+    return subprocess.Popen(list(args), start_new_session=True, **kwargs)
+
+
+@pytest.fixture
+def registry():
+    registry = ProcessRegistry()
+    yield registry
+    registry.signal_all(signal.SIGKILL)
+    registry.wait_all(timeout=1)
+
+
+def test_register_describe_and_forget(registry):
+    server = registry.register(spawn('sleep', '30'), 'xephyr')
+    app = registry.register(spawn('sleep', '30'), 'app', 'sleep 30')
+
+    assert registry.command_of(app.pid) == 'sleep 30'
+    assert registry.command_of(server.pid) is None
+    assert registry.processes('app') == [app]
+    described = {entry['pid']: entry for entry in registry.describe()}
+    assert described[app.pid]['role'] == 'app'
+    assert described[app.pid]['pgid'] == app.pid
+    assert described[app.pid]['running']
+
+    registry.forget(app.pid)
+    assert registry.command_of(app.pid) is None
+    assert registry.processes() == [server]
+    app.kill()
+    app.wait()
+
+
+def test_processes_skips_finished_unless_asked(registry):
+    finished = registry.register(spawn('true'), 'app', 'true')
+    finished.wait()
+    assert registry.processes() == []
+    assert registry.processes(alive_only=False) == [finished]
+
+
+def test_signal_all_takes_down_whole_groups(registry, wait_for):
+    # O sh fica esperando o filho: os dois estão no mesmo grupo
+    shell = registry.register(spawn('sh', '-c', 'sleep 30 & wait'), 'app', 'sleep 30')
+    wait_for(lambda: psutil.Process(shell.pid).children())
+    child = psutil.Process(shell.pid).children()[0]
+
+    assert registry.signal_all(signal.SIGTERM) == 1
+    assert registry.wait_all(timeout=2)
+    assert shell.returncode is not None
+    assert gone(child)
+
+
+def test_signal_all_filters_by_role(registry):
+    server = registry.register(spawn('sleep', '30'), 'xephyr')
+    app = registry.register(spawn('sleep', '30'), 'app', 'sleep 30')
+    assert registry.signal_all(signal.SIGTERM, 'app') == 1
+    app.wait(timeout=2)
+    assert server.poll() is None
+
+
+def test_wait_all_kills_what_ignores_sigterm(registry):
+    stubborn = registry.register(spawn(sys.executable, '-c',
+                                       'import signal, time\n'
+                                       'signal.signal(signal.SIGTERM, signal.SIG_IGN)\n'
+                                       'print("pronto", flush=True)\n'
+                                       'time.sleep(30)', stdout=subprocess.PIPE), 'app', 'teimoso')
+    stubborn.stdout.readline()
+    registry.signal_all(signal.SIGTERM)
+    assert not registry.wait_all(timeout=0.2)
+    assert stubborn.returncode == -signal.SIGKILL
+    stubborn.stdout.close()
+
+
+def test_wait_all_sweeps_descendants_that_left_the_group(registry):
+    # O neto faz setsid próprio e escaparia do killpg do grupo do pai
+    parent = registry.register(spawn(sys.executable, '-c',
+                                     'import subprocess, time\n'
+                                     'child = subprocess.Popen(["sleep", "30"], start_new_session=True)\n'
+                                     'print(child.pid, flush=True)\n'
+                                     'time.sleep(30)', stdout=subprocess.PIPE), 'app', 'pai')
+    orphan = psutil.Process(int(parent.stdout.readline()))
+    parent.stdout.close()
+
+    registry.signal_all(signal.SIGTERM)
+    registry.wait_all(timeout=2)
+    assert gone(orphan)
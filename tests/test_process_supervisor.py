@@ -0,0 +1,75 @@
+import subprocess
+import threading
+
+import pytest
+
+from process_supervisor import ProcessSupervisor
+
+
+@pytest.fixture(params=['pidfd', 'thread'])
+def supervisor(request):
+    supervisor = ProcessSupervisor()
+    if request.param == 'thread':
+        # Kernels sem pidfd: uma thread bloqueada em wait() por processo
+        supervisor._use_pidfd = False
+    elif not supervisor._use_pidfd:
+        pytest.skip("os.pidfd_open indisponível")
+    return supervisor
+
+
+def collect(supervisor):
+    events = []
+    supervisor.subscribe(events.append)
+    return events
+
+
+def test_exit_is_published_with_returncode(supervisor, wait_for):
+    events = collect(supervisor)
+    process = subprocess.Popen(['sh', '-c', 'exit 3'])
+    supervisor.watch(7, process, 'app')
+    wait_for(lambda: events)
+    assert events == [{'type': 'exit', 'display': 7, 'role': 'app', 'pid': process.pid, 'returncode': 3}]
+    # O processo já foi recolhido antes da publicação
+    assert process.returncode == 3
+
+
+def test_process_that_exited_before_watch_is_reported(supervisor, wait_for):
+    events = collect(supervisor)
+    process = subprocess.Popen(['true'])
+    process.wait()
+    supervisor.watch(1, process)
+    wait_for(lambda: events)
+    assert events[0]['role'] == 'xephyr' and events[0]['returncode'] == 0
+
+
+def test_each_watched_process_gets_one_event(supervisor, wait_for):
+    events = collect(supervisor)
+    sleepers = [subprocess.Popen(['sleep', '30']) for _ in range(3)]
+    for display_num, process in enumerate(sleepers):
+        supervisor.watch(display_num, process)
+    assert events == []
+
+    for process in sleepers:
+        process.kill()
+    wait_for(lambda: len(events) == 3)
+    assert sorted(event['pid'] for event in events) == sorted(process.pid for process in sleepers)
+    assert {event['returncode'] for event in events} == {-9}
+
+
+def test_subscriber_errors_do_not_stop_delivery(supervisor):
+    delivered = threading.Event()
+
+    def broken(event):
+        raise RuntimeError("falhou")
+
+    supervisor.subscribe(broken)
+    supervisor.subscribe(lambda event: delivered.set())
+    supervisor.publish({'type': 'state', 'display': 1})
+    assert delivered.is_set()
+
+
+def test_unsubscribe_stops_delivery(supervisor):
+    events = collect(supervisor)
+    supervisor.unsubscribe(events.append)
+    supervisor.publish({'type': 'state', 'display': 1})
+    assert events == []
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from restart_policy import should_restart
+
+
+@pytest.mark.parametrize('policy, returncode, expected', [
+    ('never', 1, False),
+    ('on-failure', 0, False),
+    ('on-failure', 1, True),
+    ('on-failure', -15, True),
+    ('always', 0, True),
+])
+def test_should_restart(policy, returncode, expected):
+    assert should_restart(policy, returncode) is expected
+
+
+def test_backoff_grows_up_to_the_maximum(restart_controller, wait_for):
+    controller = restart_controller(max_restarts=10)
+    runs = []
+    delays = []
+    for attempt in range(4):
+        delays.append(controller.on_failure('key', lambda: runs.append(True)))
+        wait_for(lambda: len(runs) == attempt + 1)
+    assert delays == pytest.approx([0.01, 0.02, 0.04, 0.04])
+    assert controller.status('key')['restarts'] == 4
+
+
+def test_failure_while_restart_is_pending_is_ignored(restart_controller):
+    controller = restart_controller(backoff_initial=10.0, backoff_max=10.0)
+    assert controller.on_failure('key', lambda: None) == pytest.approx(10.0)
+    assert controller.on_failure('key', lambda: None) is None
+    assert controller.status('key')['next_restart_in'] > 9.0
+    controller.cancel('key')
+
+
+def test_circuit_opens_after_too_many_failures(restart_controller, wait_for):
+    controller = restart_controller()
+    runs = []
+    for attempt in range(3):
+        assert controller.on_failure('key', lambda: runs.append(True)) is not None
+        wait_for(lambda: len(runs) == attempt + 1)
+    assert controller.on_failure('key', lambda: runs.append(True)) is None
+    assert controller.is_open('key')
+    assert controller.status('key')['circuit'] == 'open'
+
+    # Início manual fecha o circuito e zera o backoff
+    controller.reset('key')
+    assert not controller.is_open('key')
+    assert controller.status('key') == {'restarts': 0, 'circuit': 'closed', 'next_restart_in': None}
+    assert controller.on_failure('key', lambda: None) == pytest.approx(0.01)
+
+
+def test_cancel_drops_the_scheduled_restart(restart_controller):
+    controller = restart_controller(backoff_initial=0.05)
+    runs = []
+    controller.on_failure('key', lambda: runs.append(True))
+    controller.cancel('key')
+    time.sleep(0.1)
+    assert runs == []
+    assert controller.status('key')['next_restart_in'] is None
+
+
+def test_keys_are_independent(restart_controller):
+    controller = restart_controller(backoff_initial=10.0, backoff_max=10.0)
+    controller.on_failure(('a', 'xephyr'), lambda: None)
+    assert controller.on_failure(('b', 'xephyr'), lambda: None) == pytest.approx(10.0)
+    assert set(controller.keys()) == {('a', 'xephyr'), ('b', 'xephyr')}
+    for key in controller.keys():
+        controller.cancel(key)
@@ -0,0 +1,260 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# Valores padrão da seção "warm_pool" do arquivo de configuração
+DEFAULT_WARM_POOL = {
+    'enabled': False,
+    'sizes': {'1920x1080': 1, '1280x720': 1},   # Displays ociosos mantidos por resolução
+    'max_total': 4,                             # Limite de displays no pool
+    'idle_timeout': 600.0                       # Segundos ocioso antes de ser descartado
+}
+
+
+def parse_size(size: str) -> Tuple[int, int]:
+    width, height = size.lower().split('x')
+    return int(width), int(height)
+
+
+class WarmPool:
+    """Pool de displays Xephyr + xfwm4 pré-iniciados para instâncias paradas
+
+    Um display do X não muda de número depois de iniciado, e o número é a
+    identidade da instância (seletores, configuração, histórico). Por isso
+    cada display ocioso já sobe no número e com o título de uma instância
+    parada da resolução; quando ela inicia, só adota o servidor que já está
+    rodando. Mantém até 'sizes' displays ociosos por resolução (respeitando
+    'max_total') e os repõe em segundo plano depois de cada adoção. Displays
+    ociosos por mais de 'idle_timeout' são descartados e a resolução só volta
+    a ser reposta quando houver nova demanda por ela.
+    """
+
+    def __init__(self, settings: Optional[Dict], select_display: Callable[[int, int, List[int]], Optional[int]],
+                 create_display: Callable[[int, int, int], Optional[object]]):
+        self.settings = dict(DEFAULT_WARM_POOL)
+        if settings:
+            self.settings.update(settings)
+        # select_display(largura, altura, ocupados) -> número de uma instância parada fora
+        # de 'ocupados', ou None. Chamado com o lock do pool: não pode esperar por ele
+        self._select_display = select_display
+        # create_display(número, largura, altura) -> XephyrInstance já aquecida ou None
+        self._create_display = create_display
+        self._idle: Dict[Tuple[int, int], List[Tuple[object, float]]] = {}
+        self._last_demand: Dict[Tuple[int, int], float] = {}
+        # Displays subindo para o pool e saindo dele em segundo plano (ver _settle)
+        self._warming: Dict[int, threading.Event] = {}
+        self._discarding: Dict[int, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settings.get('enabled'))
+
+    def _targets(self) -> Dict[Tuple[int, int], int]:
+        return {parse_size(size): count for size, count in self.settings['sizes'].items()}
+
+    def displays(self) -> List[int]:
+        """Números de display com um servidor ocioso do pool"""
+        with self._lock:
+            return [pooled.display_num for entries in self._idle.values() for pooled, _ in entries]
+
+    def _take(self, display_num: int) -> Optional[object]:
+        # Chamado com self._lock: retira o display ocioso deste número
+        for entries in self._idle.values():
+            for entry in entries:
+                if entry[0].display_num == display_num:
+                    entries.remove(entry)
+                    return entry[0]
+        return None
+
+    def _settle(self, display_num: int):
+        # Espera o display deste número terminar de subir ou de ser descartado
+        with self._lock:
+            warming = self._warming.get(display_num)
+        if warming is not None:
+            warming.wait()
+        with self._lock:
+            thread = self._discarding.get(display_num)
+        if thread is not None:
+            thread.join()
+
+    def acquire(self, display_num: int, width: int, height: int) -> Optional[object]:
+        """Entrega o display ocioso já aberto no número da instância, ou None (miss)
+
+        Depois de um miss, o número está livre para um início normal: um
+        display morto, de outra resolução ou em descarte é encerrado antes de
+        retornar. Um display ainda subindo neste número é esperado.
+        """
+        self._settle(display_num)
+        with self._lock:
+            self._last_demand[(width, height)] = time.monotonic()
+            pooled = self._take(display_num)
+            if pooled is not None and ((pooled.width, pooled.height) != (width, height) or not pooled.is_alive()):
+                self.evictions += 1
+                dead, pooled = pooled, None
+            else:
+                dead = None
+            if pooled:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if dead is not None:
+            dead.stop()
+        self._settle(display_num)
+        # Repõe em segundo plano
+        self._wakeup.set()
+        return pooled
+
+    def discard(self, display_num: int) -> bool:
+        """Encerra o display ocioso deste número, se houver (instância editada ou removida)"""
+        self._settle(display_num)
+        with self._lock:
+            pooled = self._take(display_num)
+        if pooled is not None:
+            pooled.stop()
+            self._wakeup.set()
+        self._settle(display_num)
+        return pooled is not None
+
+    def on_exit(self, display_num: int, pid: int) -> bool:
+        """Trata o término de um processo; True se ele era de um display ocioso do pool
+
+        Chamado pelo supervisor de processos: o display sai do pool na hora e o
+        encerramento do que restou roda em outra thread para não segurar os
+        eventos (acquire e discard esperam por ele).
+        """
+        with self._lock:
+            pooled = None
+            for entries in self._idle.values():
+                for candidate, _ in entries:
+                    if candidate.display_num == display_num:
+                        pooled = candidate
+            if pooled is None or pid not in [process.pid for process in pooled.registry.processes(alive_only=False)]:
+                return False
+            self._take(display_num)
+            self.evictions += 1
+            thread = threading.Thread(target=self._finish_discard, args=(pooled,), daemon=True)
+            self._discarding[display_num] = thread
+        print(f"Display ocioso :{display_num} do pool terminou, descartando")
+        thread.start()
+        return True
+
+    def _finish_discard(self, pooled):
+        try:
+            pooled.stop()
+        finally:
+            with self._lock:
+                self._discarding.pop(pooled.display_num, None)
+            # O número volta a poder receber um display ocioso
+            self._wakeup.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            idle = {f"{w}x{h}": len(entries) for (w, h), entries in self._idle.items()}
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'evictions': self.evictions,
+            'idle': idle
+        }
+
+    def start(self):
+        """Preenche o pool e mantém a reposição/expiração rodando em segundo plano"""
+        if self._running or not self.enabled:
+            return
+        self._running = True
+        now = time.monotonic()
+        with self._lock:
+            for size in self._targets():
+                self._last_demand.setdefault(size, now)
+        threading.Thread(target=self._maintain_loop, daemon=True).start()
+
+    def stop(self):
+        """Para a manutenção e encerra todos os displays ociosos"""
+        self._running = False
+        self._wakeup.set()
+        with self._lock:
+            pooled = [entry for entries in self._idle.values() for entry, _ in entries]
+            self._idle = {}
+            warming = list(self._warming.values())
+            discarding = list(self._discarding.values())
+        for display in pooled:
+            display.request_stop()
+        for display in pooled:
+            display.wait_stopped()
+        # Um display que terminar de subir agora é encerrado pela própria reposição
+        for event in warming:
+            event.wait()
+        for thread in discarding:
+            thread.join()
+
+    def _maintain_loop(self):
+        interval = max(1.0, min(30.0, self.settings['idle_timeout'] / 4))
+        while self._running:
+            try:
+                self._evict_idle()
+                self._refill()
+            except Exception as e:
+                print(f"Erro ao manter o pool de displays: {e}")
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        timeout = self.settings['idle_timeout']
+        expired = []
+        with self._lock:
+            for size, entries in self._idle.items():
+                keep = []
+                for pooled, since in entries:
+                    if now - since > timeout or not pooled.is_alive():
+                        expired.append(pooled)
+                    else:
+                        keep.append((pooled, since))
+                self._idle[size] = keep
+            self.evictions += len(expired)
+        for pooled in expired:
+            print(f"Descartando display ocioso :{pooled.display_num} do pool")
+            pooled.stop()
+
+    def _refill(self):
+        now = time.monotonic()
+        timeout = self.settings['idle_timeout']
+        for size, target in self._targets().items():
+            while self._running:
+                with self._lock:
+                    # Só repõe resoluções com demanda recente
+                    if now - self._last_demand.get(size, 0) > timeout:
+                        break
+                    total = sum(len(entries) for entries in self._idle.values())
+                    if len(self._idle.get(size, [])) >= target or total >= self.settings['max_total']:
+                        break
+                    busy = [pooled.display_num for entries in self._idle.values() for pooled, _ in entries]
+                    busy += list(self._warming) + list(self._discarding)
+                    display_num = self._select_display(size[0], size[1], busy)
+                    if display_num is None:
+                        break
+                    warming = self._warming[display_num] = threading.Event()
+                try:
+                    pooled = self._create_display(display_num, size[0], size[1])
+                    if pooled is not None and not self._running:
+                        pooled.stop()
+                        pooled = None
+                    if pooled is not None:
+                        with self._lock:
+                            self._idle.setdefault(size, []).append((pooled, time.monotonic()))
+                finally:
+                    with self._lock:
+                        del self._warming[display_num]
+                    warming.set()
+                if pooled is None:
+                    break
+                print(f"Display :{pooled.display_num} ({size[0]}x{size[1]}) pronto no pool")
@@ -0,0 +1,313 @@
+import os
+import socket
+import struct
+from typing import Dict, List, Optional, Tuple
+
+
+class X11Error(Exception):
+    """Erro retornado pelo servidor X ou falha de protocolo"""
+
+
+class X11Connection:
+    """Cliente X11 mínimo, sem dependências, falando o protocolo direto no socket
+
+    Implementa só as poucas requisições que o gerenciador precisa para
+    observar os displays (átomos, propriedades, seleções e extensões),
+    evitando lançar ferramentas externas como xprop a cada verificação.
+    """
+
+    ANY_PROPERTY_TYPE = 0
+
+    def __init__(self, display_num: int, timeout: float = 1.0):
+        self.display_num = display_num
+        self.socket_path = f"/tmp/.X11-unix/X{display_num}"
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self._atoms: Dict[str, int] = {}
+        self._extensions: Dict[str, Optional[Tuple[int, int, int]]] = {}
+        try:
+            self.sock.connect(self.socket_path)
+            self._setup()
+        except Exception:
+            self.sock.close()
+            raise
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # ----- Baixo nível -----
+
+    def _recv_exact(self, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise X11Error("Conexão fechada pelo servidor X")
+            data.extend(chunk)
+        return bytes(data)
+
+    def _setup(self):
+        # Sem autenticação: as instâncias são iniciadas com -ac
+        self.sock.sendall(struct.pack('<BxHHHHxx', 0x6C, 11, 0, 0, 0))
+        header = self._recv_exact(8)
+        status, _, _, _, extra_len = struct.unpack('<BBHHH', header)
+        data = self._recv_exact(extra_len * 4)
+        if status != 1:
+            reason_len = header[1]
+            reason = data[:reason_len].decode('latin-1', 'replace')
+            raise X11Error(f"Servidor X recusou a conexão: {reason}")
+
+        (self.resource_id_base, self.resource_id_mask, vendor_len,
+         self.max_request_length, num_screens, num_formats,
+         self.image_byte_order) = struct.unpack_from('<4xII4xHHBBB', data, 0)
+        offset = 32 + vendor_len + (-vendor_len % 4)
+
+        self.pixmap_formats: Dict[int, Tuple[int, int]] = {}
+        for _ in range(num_formats):
+            depth, bpp, scanline_pad = struct.unpack_from('<BBB', data, offset)
+            self.pixmap_formats[depth] = (bpp, scanline_pad)
+            offset += 8
+
+        if num_screens < 1:
+            raise X11Error("Servidor X sem telas")
+        (self.root, self.root_width, self.root_height,
+         self.root_visual, self.root_depth) = struct.unpack_from('<I16xHH8xI2xB', data, offset)
+        self._next_resource = 1
+
+    def allocate_id(self) -> int:
+        """Reserva um novo XID para recursos criados pelo cliente"""
+        xid = self.resource_id_base | (self._next_resource & self.resource_id_mask)
+        self._next_resource += 1
+        return xid
+
+    def request(self, data: bytes) -> None:
+        """Envia uma requisição sem resposta"""
+        self.sock.sendall(data)
+
+    def _reply_header(self) -> bytes:
+        """Lê até o cabeçalho de 32 bytes da próxima resposta, descartando eventos"""
+        while True:
+            header = self._recv_exact(32)
+            kind = header[0]
+            if kind == 0:
+                code = header[1]
+                raise X11Error(f"Erro X {code} na requisição {header[10]}")
+            if kind == 1:
+                return header
+            # Eventos não interessam a este cliente: descarta
+
+    def request_reply(self, data: bytes) -> bytes:
+        """Envia uma requisição e devolve a resposta completa (cabeçalho + dados)"""
+        self.sock.sendall(data)
+        header = self._reply_header()
+        extra_len = struct.unpack_from('<I', header, 4)[0]
+        return header + self._recv_exact(extra_len * 4)
+
+    def sync(self) -> None:
+        """Garante que as requisições anteriores foram processadas (GetInputFocus)"""
+        self.request_reply(struct.pack('<BxH', 43, 1))
+
+    # ----- Requisições -----
+
+    @staticmethod
+    def _pad(data: bytes) -> bytes:
+        return data + b'\x00' * (-len(data) % 4)
+
+    def intern_atom(self, name: str, only_if_exists: bool = False) -> int:
+        if name in self._atoms:
+            return self._atoms[name]
+        encoded = name.encode('latin-1')
+        payload = self._pad(encoded)
+        reply = self.request_reply(
+            struct.pack('<BBHHxx', 16, int(only_if_exists), 2 + len(payload) // 4, len(encoded)) + payload
+        )
+        atom = struct.unpack_from('<I', reply, 8)[0]
+        if atom:
+            self._atoms[name] = atom
+        return atom
+
+    def get_selection_owner(self, selection: str) -> int:
+        atom = self.intern_atom(selection)
+        reply = self.request_reply(struct.pack('<BxHI', 23, 2, atom))
+        return struct.unpack_from('<I', reply, 8)[0]
+
+    def get_property(self, window: int, name: str, max_length: int = 1024) -> Optional[Tuple[int, bytes]]:
+        """Retorna (formato, dados) da propriedade ou None se ela não existir"""
+        atom = self.intern_atom(name, only_if_exists=True)
+        if not atom:
+            return None
+        reply = self.request_reply(
+            struct.pack('<BBHIIIII', 20, 0, 6, window, atom, self.ANY_PROPERTY_TYPE, 0, max_length)
+        )
+        fmt = reply[1]
+        prop_type, _, value_len = struct.unpack_from('<III', reply, 8)
+        if prop_type == 0:
+            return None
+        return fmt, reply[32:32 + value_len * (fmt // 8)]
+
+    def get_window_property(self, window: int, name: str) -> List[int]:
+        """Lê uma propriedade de formato 32 (WINDOW, CARDINAL, ...) como lista de inteiros"""
+        result = self.get_property(window, name)
+        if not result or result[0] != 32:
+            return []
+        data = result[1]
+        return list(struct.unpack(f'<{len(data) // 4}I', data))
+
+    def query_extension(self, name: str) -> Optional[Tuple[int, int, int]]:
+        """Retorna (opcode, primeiro evento, primeiro erro) ou None se indisponível"""
+        if name in self._extensions:
+            return self._extensions[name]
+        encoded = name.encode('latin-1')
+        payload = self._pad(encoded)
+        reply = self.request_reply(
+            struct.pack('<BxHHxx', 98, 2 + len(payload) // 4, len(encoded)) + payload
+        )
+        present, opcode, first_event, first_error = struct.unpack_from('<BBBB', reply, 8)
+        self._extensions[name] = (opcode, first_event, first_error) if present else None
+        return self._extensions[name]
+
+    def idle_time(self) -> Optional[float]:
+        """Segundos desde a última entrada do usuário no display (ScreenSaverQueryInfo)
+
+        Usa a extensão MIT-SCREEN-SAVER; retorna None se ela não existir.
+        """
+        extension = self.query_extension('MIT-SCREEN-SAVER')
+        if not extension:
+            return None
+        reply = self.request_reply(struct.pack('<BBHI', extension[0], 1, 2, self.root))
+        return struct.unpack_from('<I', reply, 16)[0] / 1000.0
+
+    # ----- Geometria e RandR -----
+
+    def get_geometry(self, drawable: Optional[int] = None) -> Tuple[int, int]:
+        """Largura e altura atuais do drawable (a raiz, por padrão)"""
+        reply = self.request_reply(struct.pack('<BxHI', 14, 2, drawable or self.root))
+        return struct.unpack_from('<HH', reply, 16)
+
+    def select_input(self, window: int, event_mask: int):
+        """ChangeWindowAttributes só com a máscara de eventos; erros são verificados na hora"""
+        self.request(struct.pack('<BxHIII', 2, 4, window, 0x800, event_mask))
+        self.sync()
+
+    def query_tree(self, window: Optional[int] = None) -> List[int]:
+        """Filhos diretos da janela (da raiz, por padrão)"""
+        reply = self.request_reply(struct.pack('<BxHI', 15, 2, window or self.root))
+        count = struct.unpack_from('<H', reply, 16)[0]
+        return list(struct.unpack_from(f'<{count}I', reply, 32))
+
+    def resize_window(self, window: int, width: int, height: int):
+        """ConfigureWindow só com largura e altura; erros são verificados na hora"""
+        self.request(struct.pack('<BxHIHxxII', 12, 5, window, 0x4 | 0x8, width, height))
+        self.sync()
+
+    def randr_version(self, major: int = 1, minor: int = 2) -> Optional[Tuple[int, int]]:
+        """Negocia a versão da RandR (requisições 1.2 exigem anunciar 1.2), ou None sem a extensão"""
+        extension = self.query_extension('RANDR')
+        if not extension:
+            return None
+        reply = self.request_reply(struct.pack('<BBHII', extension[0], 0, 3, major, minor))
+        return struct.unpack_from('<II', reply, 8)
+
+    def randr_screen_info(self) -> Dict:
+        """RRGetScreenInfo: tamanhos oferecidos (largura, altura, mm) e o atual"""
+        opcode = self.query_extension('RANDR')[0]
+        reply = self.request_reply(struct.pack('<BBHI', opcode, 5, 2, self.root))
+        config_timestamp, count, current = struct.unpack_from('<IHH', reply, 16)
+        sizes = [struct.unpack_from('<HHHH', reply, 32 + index * 8) for index in range(count)]
+        return {'sizes': sizes, 'current': current, 'config_timestamp': config_timestamp}
+
+    def randr_set_screen_config(self, size_index: int, config_timestamp: int) -> int:
+        """RRSetScreenConfig (RandR 1.0) para um dos tamanhos oferecidos; retorna o status (0 = sucesso)"""
+        opcode = self.query_extension('RANDR')[0]
+        reply = self.request_reply(struct.pack('<BBHIIIHHHxx', opcode, 2, 6, self.root, 0,
+                                               config_timestamp, size_index, 1, 0))
+        return reply[1]
+
+    def randr_set_screen_size(self, width: int, height: int, mm_width: int, mm_height: int):
+        """RRSetScreenSize (RandR 1.2): tamanho arbitrário dentro da faixa do servidor"""
+        opcode = self.query_extension('RANDR')[0]
+        self.request(struct.pack('<BBHIHHII', opcode, 7, 5, self.root, width, height, mm_width, mm_height))
+        self.sync()
+
+    # ----- Captura de tela -----
+
+    def get_image_into(self, buffer, x: int, y: int, width: int, height: int,
+                       drawable: Optional[int] = None) -> int:
+        """GetImage (ZPixmap) lendo os pixels direto no buffer dado; retorna a profundidade
+
+        O buffer é reaproveitado entre capturas: nenhum objeto é alocado por quadro.
+        """
+        self.sock.sendall(struct.pack('<BBHIhhHHI', 73, 2, 5, drawable or self.root,
+                                      x, y, width, height, 0xFFFFFFFF))
+        header = self._reply_header()
+        size = struct.unpack_from('<I', header, 4)[0] * 4
+        view = memoryview(buffer)
+        if size > len(view):
+            self._recv_exact(size)
+            raise X11Error(f"Imagem de {size} bytes não cabe no buffer de {len(view)}")
+        received = 0
+        while received < size:
+            count = self.sock.recv_into(view[received:size])
+            if not count:
+                raise X11Error("Conexão fechada pelo servidor X")
+            received += count
+        return header[1]
+
+    def shm_version(self) -> Optional[Tuple[int, int]]:
+        """Versão da extensão MIT-SHM, ou None se ela não existir"""
+        extension = self.query_extension('MIT-SHM')
+        if not extension:
+            return None
+        reply = self.request_reply(struct.pack('<BBH', extension[0], 0, 1))
+        return struct.unpack_from('<HH', reply, 8)
+
+    def shm_attach_fd(self, fd: int, read_only: bool = False) -> int:
+        """ShmAttachFd (MIT-SHM 1.2): entrega ao servidor um descritor de memória compartilhada
+
+        O descritor vai junto da requisição (SCM_RIGHTS); o chamador pode
+        fechá-lo depois. Retorna o XID do segmento.
+        """
+        opcode = self.query_extension('MIT-SHM')[0]
+        shmseg = self.allocate_id()
+        self.sock.sendmsg([struct.pack('<BBHIB3x', opcode, 6, 3, shmseg, int(read_only))],
+                          [(socket.SOL_SOCKET, socket.SCM_RIGHTS, struct.pack('i', fd))])
+        # Erros de anexação chegam de forma assíncrona: força o processamento
+        self.sync()
+        return shmseg
+
+    def shm_get_image(self, shmseg: int, x: int, y: int, width: int, height: int,
+                      offset: int = 0, drawable: Optional[int] = None) -> int:
+        """ShmGetImage (ZPixmap) para o segmento; retorna o tamanho da imagem em bytes"""
+        opcode = self.query_extension('MIT-SHM')[0]
+        reply = self.request_reply(struct.pack('<BBHIhhHHIB3xII', opcode, 4, 8, drawable or self.root,
+                                               x, y, width, height, 0xFFFFFFFF, 2, shmseg, offset))
+        return struct.unpack_from('<I', reply, 12)[0]
+
+    def shm_detach(self, shmseg: int):
+        opcode = self.query_extension('MIT-SHM')[0]
+        self.request(struct.pack('<BBHI', opcode, 2, 2, shmseg))
+
+
+def display_socket_ready(display_num: int) -> bool:
+    """Verifica se o socket do display existe e aceita conexões"""
+    socket_path = f"/tmp/.X11-unix/X{display_num}"
+    if not os.path.exists(socket_path):
+        return False
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(0.5)
+        sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
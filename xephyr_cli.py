@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Linha de comando para operações em lote nas instâncias Xephyr
+
+Não importa tkinter: inicia rápido o bastante para cron e laços de shell.
+Todas as saídas são JSON. start, stop, exec, pause e resume precisam do daemon
+(xephyr_daemon.py); create, list, resize e rm também funcionam direto no
+arquivo de configuração quando o daemon não está rodando (resize então só
+muda as dimensões salvas).
+
+Seletores de instância: "3" ou ":3", faixas "1-5", globs de nome
+("Tibia - *") e "all".
+"""
+import argparse
+import fnmatch
+import json
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from daemon_client import RemoteManager, daemon_available
+from display_backends import BACKENDS
+from resource_limits import INSTANCE_LIMIT_KEYS
+from restart_policy import RESTART_POLICIES
+
+
+SINGLE_RE = re.compile(r'^:?(\d+)$')
+RANGE_RE = re.compile(r'^:?(\d+)-:?(\d+)$')
+
+
+def resolve_selectors(selectors: List[str], instances: List[Dict]) -> List[int]:
+    """Converte seletores (números, faixas, globs de nome, all) em displays existentes"""
+    existing = {instance['display']: instance for instance in instances}
+    selected = set()
+    for selector in selectors:
+        selector = selector.strip()
+        if selector == 'all':
+            selected.update(existing)
+            continue
+        match = SINGLE_RE.match(selector)
+        if match:
+            selected.add(int(match.group(1)))
+            continue
+        match = RANGE_RE.match(selector)
+        if match:
+            first, last = sorted((int(match.group(1)), int(match.group(2))))
+            selected.update(num for num in existing if first <= num <= last)
+            continue
+        selected.update(num for num, instance in existing.items()
+                        if fnmatch.fnmatchcase(instance['name'], selector))
+    return sorted(num for num in selected if num in existing)
+
+
+def run_concurrently(keys: List, operation, concurrency: int) -> Dict:
+    """Executa a operação para cada chave em paralelo, no formato dos relatórios em lote"""
+    results = {}
+    batch_start = time.monotonic()
+
+    def timed(key):
+        start = time.monotonic()
+        try:
+            value = operation(key)
+            return key, {'ok': bool(value), 'elapsed': time.monotonic() - start, 'error': None, 'value': value}
+        except Exception as e:
+            return key, {'ok': False, 'elapsed': time.monotonic() - start, 'error': str(e), 'value': None}
+
+    if keys:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(keys)))) as executor:
+            for key, result in executor.map(timed, keys):
+                results[key] = result
+
+    succeeded = sum(1 for result in results.values() if result['ok'])
+    return {
+        'results': results,
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'elapsed': time.monotonic() - batch_start
+    }
+
+
+class CLI:
+
+    def __init__(self, args):
+        self.args = args
+        if daemon_available(args.socket):
+            self.manager = RemoteManager(args.socket)
+            self.remote = True
+        else:
+            from xephyr_manager import XephyrManager
+            self.manager = XephyrManager(args.config)
+            self.remote = False
+        self._local = threading.local()
+
+    def _manager_for(self):
+        # Cada thread usa sua própria conexão com o daemon
+        if not self.remote:
+            return self.manager
+        if not hasattr(self._local, 'manager'):
+            self._local.manager = RemoteManager(self.args.socket)
+        return self._local.manager
+
+    def require_daemon(self):
+        if not self.remote:
+            raise SystemExit(self.fail("Este comando precisa do daemon rodando (python xephyr_daemon.py)"))
+
+    def fail(self, message: str) -> int:
+        self.output({'error': message})
+        return 2
+
+    @staticmethod
+    def output(data):
+        print(json.dumps(data, indent=2, ensure_ascii=False, default=str))
+
+    def selected(self) -> List[int]:
+        displays = resolve_selectors(self.args.selectors, self.manager.get_instances())
+        if not displays:
+            raise SystemExit(self.fail(f"Nenhuma instância corresponde a {self.args.selectors}"))
+        return displays
+
+    def cmd_list(self) -> int:
+        instances = self.manager.get_instances()
+        if self.args.selectors:
+            wanted = set(resolve_selectors(self.args.selectors, instances))
+            instances = [instance for instance in instances if instance['display'] in wanted]
+        self.output(instances)
+        return 0
+
+    def limits(self) -> Dict:
+        # Só os limites passados na linha de comando
+        return {key: getattr(self.args, key) for key in INSTANCE_LIMIT_KEYS if getattr(self.args, key) is not None}
+
+    def cmd_create(self) -> int:
+        # "{i}" no nome ou no comando vira o índice (a partir de --start-index)
+        def create(index):
+            return self._manager_for().create_instance(
+                self.args.width, self.args.height,
+                self.args.name.replace('{i}', str(index)),
+                self.args.command.replace('{i}', str(index)),
+                self.args.usb_port,
+                self.args.restart,
+                self.limits(),
+                self.args.backend,
+                self.args.profile
+            )
+
+        indexes = list(range(self.args.start_index, self.args.start_index + self.args.count))
+        # Sem daemon, as criações escrevem no mesmo arquivo: uma de cada vez
+        concurrency = self.args.concurrency if self.remote else 1
+        report = run_concurrently(indexes, create, concurrency)
+        report['displays'] = [result['value'] for result in report['results'].values() if result['ok']]
+        self.output(report)
+        return 0 if not report['failed'] else 1
+
+    def cmd_start(self) -> int:
+        self.require_daemon()
+        report = self.manager.start_many(self.selected(), self.args.concurrency)
+        self.output(report)
+        return 0 if not report['failed'] else 1
+
+    def cmd_stop(self) -> int:
+        self.require_daemon()
+        report = self.manager.stop_many(self.selected(), self.args.concurrency)
+        self.output(report)
+        return 0 if not report['failed'] else 1
+
+    def cmd_pause(self) -> int:
+        self.require_daemon()
+        report = run_concurrently(self.selected(), lambda display: self._manager_for().pause_instance(display),
+                                  self.args.concurrency)
+        self.output(report)
+        return 0 if not report['failed'] else 1
+
+    def cmd_resume(self) -> int:
+        self.require_daemon()
+        report = run_concurrently(self.selected(), lambda display: self._manager_for().resume_instance(display),
+                                  self.args.concurrency)
+        self.output(report)
+        return 0 if not report['failed'] else 1
+
+    def cmd_exec(self) -> int:
+        self.require_daemon()
+        report = run_concurrently(
+            self.selected(),
+            lambda display: self._manager_for().execute_command(display, self.args.exec_command),
+            self.args.concurrency
+        )
+        self.output(report)
+        return 0 if not report['failed'] else 1
+
+    def cmd_resize(self) -> int:
+        width, _, height = self.args.size.lower().partition('x')
+        try:
+            width, height = int(width), int(height)
+        except ValueError:
+            return self.fail(f"Tamanho inválido '{self.args.size}' (use LARGURAxALTURA)")
+        concurrency = self.args.concurrency if self.remote else 1
+        report = run_concurrently(self.selected(),
+                                  lambda display: self._manager_for().resize_instance(display, width, height),
+                                  concurrency)
+        self.output(report)
+        return 0 if not report['failed'] else 1
+
+    def cmd_rm(self) -> int:
+        displays = self.selected()
+        concurrency = self.args.concurrency if self.remote else 1
+        report = run_concurrently(displays, lambda display: self._manager_for().remove_instance(display), concurrency)
+        self.output(report)
+        return 0 if not report['failed'] else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='xephyr_cli.py',
+        description="Operações em lote nas instâncias Xephyr (saída em JSON)"
+    )
+    parser.add_argument('--socket', default=None, help="socket do daemon")
+    parser.add_argument('--config', default="xephyr_config.json", help="configuração usada sem daemon")
+    parser.add_argument('-j', '--concurrency', type=int, default=8, help="operações simultâneas")
+    commands = parser.add_subparsers(dest='command_name', required=True)
+
+    list_parser = commands.add_parser('list', help="lista instâncias")
+    list_parser.add_argument('selectors', nargs='*')
+
+    create_parser = commands.add_parser('create', help="cria instâncias")
+    create_parser.add_argument('--name', required=True, help='nome; "{i}" vira o índice')
+    create_parser.add_argument('--count', type=int, default=1)
+    create_parser.add_argument('--start-index', type=int, default=1)
+    create_parser.add_argument('--width', type=int, default=800)
+    create_parser.add_argument('--height', type=int, default=600)
+    create_parser.add_argument('--command', default="")
+    create_parser.add_argument('--usb-port', default="")
+    create_parser.add_argument('--restart', choices=RESTART_POLICIES, default='never', help="política de reinício automático")
+    create_parser.add_argument('--backend', choices=sorted(BACKENDS), default='xephyr',
+                               help="xephyr (janela no host) ou xvfb (sem janela)")
+    create_parser.add_argument('--profile', help='perfil de lançamento da seção "profiles" (ex.: lean)')
+    create_parser.add_argument('--cpus', help='núcleos fixos, ex.: "0-3,6"')
+    create_parser.add_argument('--nice', type=int)
+    create_parser.add_argument('--ionice', help="idle, best-effort[:0-7] ou realtime[:0-7]")
+    create_parser.add_argument('--memory-max', help='limite de memória do cgroup, ex.: "2G"')
+    create_parser.add_argument('--cpu-weight', type=int, help="peso de CPU do cgroup (1-10000)")
+
+    for name, help_text in (('start', "inicia instâncias"), ('stop', "para instâncias"), ('rm', "remove instâncias"),
+                            ('pause', "estrangula os comandos das instâncias"), ('resume', "retoma instâncias pausadas")):
+        command_parser = commands.add_parser(name, help=help_text)
+        command_parser.add_argument('selectors', nargs='+')
+
+    resize_parser = commands.add_parser('resize', help="muda as dimensões, ao vivo nas instâncias rodando")
+    resize_parser.add_argument('size', help='LARGURAxALTURA, ex.: "1280x720"')
+    resize_parser.add_argument('selectors', nargs='+')
+
+    exec_parser = commands.add_parser('exec', help="executa comando(s) separados por vírgula")
+    exec_parser.add_argument('selectors', nargs='+')
+    exec_parser.add_argument('-c', '--cmd', dest='exec_command', required=True)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    cli = CLI(args)
+    return getattr(cli, f"cmd_{args.command_name}")()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
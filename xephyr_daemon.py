@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import base64
+import json
+import os
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Set
+
+from daemon_client import daemon_available, default_socket_path
+from xephyr_manager import XephyrManager
+
+
+class XephyrDaemon:
+    """Daemon headless que expõe o XephyrManager por um socket Unix
+
+    Protocolo: uma mensagem JSON por linha. Requisição
+    {"id": 1, "method": "start", "params": {"display": 3}} recebe
+    {"id": 1, "result": ...} ou {"id": 1, "error": "..."}. Depois de
+    "subscribe", a conexão também recebe {"event": {...}} a cada mudança.
+    As chamadas bloqueantes do gerenciador rodam no pool de threads do
+    asyncio, então muitos clientes são atendidos ao mesmo tempo.
+    """
+
+    def __init__(self, manager: XephyrManager, socket_path: str = None):
+        self.manager = manager
+        self.socket_path = socket_path or default_socket_path()
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.writers: Set[asyncio.StreamWriter] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.server = None
+        self.methods = {
+            'ping': lambda params: 'pong',
+            'list': lambda params: self.manager.get_instances(),
+            'get': lambda params: self.manager.get_instance(int(params['display'])),
+            'create': self._create,
+            'update': self._update,
+            'start': lambda params: self._bulk(params, self.manager.start_instance, self.manager.start_many),
+            'stop': lambda params: self._bulk(params, self.manager.stop_instance, self.manager.stop_many),
+            'remove': lambda params: self.manager.remove_instance(int(params['display'])),
+            'exec': lambda params: self.manager.execute_command(int(params['display']), params['command']),
+            'cleanup': lambda params: self.manager.cleanup_dead_instances(),
+            'save': lambda params: self.manager.flush_config(),
+            'last_dimensions': lambda params: list(self.manager.get_last_dimensions()),
+            'usb_ports': lambda params: self.manager.get_available_usb_ports(),
+            'pool_stats': lambda params: self.manager.get_pool_stats(),
+            'refresh_shell': lambda params: self.manager.refresh_shell_snapshot(),
+            'profiles': lambda params: self.manager.get_profiles(),
+            'framebuffer': lambda params: self.manager.get_framebuffer_path(int(params['display'])),
+            'thumbnails': self._thumbnails,
+            'resize': lambda params: self.manager.resize_instance(int(params['display']), int(params['width']),
+                                                                  int(params['height'])),
+            'pause': lambda params: self.manager.pause_instance(int(params['display'])),
+            'resume': lambda params: self.manager.resume_instance(int(params['display'])),
+            'crash_counts': lambda params: self.manager.get_crash_counts(params.get('since'), params.get('minimum', 1)),
+            'history': lambda params: self.manager.get_history(int(params['display']), params.get('limit', 100)),
+        }
+
+    def _create(self, params: Dict):
+        return self.manager.create_instance(
+            int(params.get('width', self.manager.last_width)),
+            int(params.get('height', self.manager.last_height)),
+            params.get('name', ""),
+            params.get('command', ""),
+            params.get('usb_port', ""),
+            params.get('restart_policy', 'never'),
+            params.get('limits'),
+            params.get('backend', 'xephyr'),
+            params.get('profile')
+        )
+
+    def _update(self, params: Dict):
+        return self.manager.update_instance(
+            int(params['display']),
+            params['name'],
+            params.get('command', ""),
+            int(params['width']),
+            int(params['height']),
+            params.get('usb_port', ""),
+            params.get('restart_policy'),
+            params.get('limits'),
+            params.get('backend'),
+            params.get('profile')
+        )
+
+    def _thumbnails(self, params: Dict):
+        # PPM em base64 para caber na mensagem JSON
+        displays = params.get('displays')
+        thumbnails = self.manager.get_thumbnails([int(num) for num in displays] if displays is not None else None)
+        return {
+            str(display_num): dict(thumbnail, ppm=base64.b64encode(thumbnail['ppm']).decode('ascii'))
+            for display_num, thumbnail in thumbnails.items()
+        }
+
+    @staticmethod
+    def _bulk(params: Dict, single, many):
+        # "display" opera em uma instância; "displays" (ou nada) usa a operação em lote
+        if 'display' in params:
+            return single(int(params['display']))
+        displays = params.get('displays')
+        if displays is not None:
+            displays = [int(display) for display in displays]
+        return many(displays, params.get('max_concurrency'))
+
+    # ----- Eventos -----
+
+    def _on_manager_event(self, event: Dict):
+        # Chamado nas threads do gerenciador: repassa ao loop do asyncio
+        if self.loop and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._broadcast, event)
+
+    def _broadcast(self, event: Dict):
+        for queue in list(self.subscribers):
+            if queue.qsize() < 1000:
+                queue.put_nowait({'event': event})
+
+    # ----- Conexões -----
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.writers.add(writer)
+        outgoing: asyncio.Queue = asyncio.Queue()
+        sender = asyncio.ensure_future(self._send_loop(writer, outgoing))
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                # Cada requisição roda em paralelo; as respostas levam o id do pedido
+                task = asyncio.ensure_future(self._dispatch(line, outgoing))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.subscribers.discard(outgoing)
+            self.writers.discard(writer)
+            sender.cancel()
+            writer.close()
+
+    async def _send_loop(self, writer: asyncio.StreamWriter, outgoing: asyncio.Queue):
+        try:
+            while True:
+                message = await outgoing.get()
+                writer.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    async def _dispatch(self, line: bytes, outgoing: asyncio.Queue):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            method = request.get('method')
+            params = request.get('params') or {}
+
+            if method == 'subscribe':
+                self.subscribers.add(outgoing)
+                result = True
+            elif method == 'unsubscribe':
+                self.subscribers.discard(outgoing)
+                result = True
+            elif method in self.methods:
+                result = await self.loop.run_in_executor(None, self.methods[method], params)
+            else:
+                raise ValueError(f"Método desconhecido: {method}")
+            response = {'id': request_id, 'result': result}
+        except Exception as e:
+            response = {'id': request_id, 'error': str(e)}
+        await outgoing.put(response)
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.loop.set_default_executor(ThreadPoolExecutor(max_workers=64))
+
+        if os.path.exists(self.socket_path):
+            # Outro daemon atendendo: dois gerenciariam os mesmos displays
+            if daemon_available(self.socket_path):
+                raise RuntimeError(f"Já há um daemon respondendo em {self.socket_path}")
+            # Socket de um daemon que não encerrou direito
+            os.unlink(self.socket_path)
+        # O socket já nasce só do usuário (um chmod depois do bind deixaria uma janela
+        # aberta); a umask vale para o processo todo, por isso o bind vem antes de
+        # iniciar o pool e os serviços que lançam processos e criam arquivos
+        previous_umask = os.umask(0o177)
+        try:
+            self.server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        finally:
+            os.umask(previous_umask)
+        print(f"Daemon ouvindo em {self.socket_path}")
+
+        self.manager.subscribe(self._on_manager_event)
+        self.manager.start_telemetry()
+        self.manager.start_warm_pool()
+        self.manager.start_idle_throttling()
+        self.manager.start_watchdog()
+
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            self.loop.add_signal_handler(sig, stop.set)
+        await stop.wait()
+
+        print("Encerrando daemon...")
+        self.server.close()
+        for writer in list(self.writers):
+            writer.close()
+        await self.server.wait_closed()
+        self.manager.unsubscribe(self._on_manager_event)
+        await self.loop.run_in_executor(None, self.shutdown)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def shutdown(self):
+        self.manager.stop_telemetry()
+        self.manager.stop_warm_pool()
+        self.manager.stop_idle_throttling()
+        self.manager.stop_watchdog()
+        self.manager.shutdown_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daemon do gerenciador de instâncias Xephyr")
+    parser.add_argument('--socket', default=default_socket_path(), help="caminho do socket Unix")
+    parser.add_argument('--config', default="xephyr_config.json", help="arquivo de configuração")
+    args = parser.parse_args()
+
+    if daemon_available(args.socket):
+        print(f"Erro: já há um daemon respondendo em {args.socket}")
+        sys.exit(1)
+    daemon = XephyrDaemon(XephyrManager(args.config), args.socket)
+    try:
+        asyncio.run(daemon.serve())
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        print(f"Erro: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,154 @@
 import subprocess
 import os
 import signal
-import psutil
-import json
 import time
 import threading
-from typing import Dict, List, Optional
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from admission_control import DEFAULT_ADMISSION, QUEUED, AdmissionController
+from capture import DEFAULT_CAPTURE, ThumbnailService
+from command_launcher import get_launcher
+from config_store import open_store
+from display_allocator import DisplayAllocator
+from display_backends import BACKENDS, DEFAULT_PROFILES, DEFAULT_XVFB, Framebuffer, get_backend, resolve_profile
+from display_readiness import DEFAULT_READINESS, DisplayReadiness
+from frame_watchdog import DEFAULT_WATCHDOG, FrameWatchdog
+from idle_throttle import DEFAULT_IDLE, IdleThrottler
+from launch_scheduler import LaunchScheduler
+from process_registry import ProcessRegistry
+from process_supervisor import ProcessSupervisor
+from resource_limits import DEFAULT_LIMITS, ResourceLimiter, normalize_limits
+from resource_telemetry import ResourceSampler
+from restart_policy import DEFAULT_RESTART, RESTART_POLICIES, RestartController, should_restart
+from screen_watcher import ScreenSizeWatcher
+from warm_pool import DEFAULT_WARM_POOL, WarmPool
+
+
+# Estados do ciclo de vida de uma instância e as transições permitidas
+CREATED = 'created'
+STARTING = 'starting'
+READY = 'ready'
+STOPPING = 'stopping'
+STOPPED = 'stopped'
+CRASHED = 'crashed'
+
+TRANSITIONS = {
+    CREATED: {STARTING},
+    STARTING: {READY, STOPPING, STOPPED, CRASHED},
+    READY: {STOPPING, CRASHED},
+    STOPPING: {STOPPED},
+    STOPPED: {STARTING},
+    CRASHED: {STARTING, STOPPING}
+}
+
+# Estados em que o Xephyr foi lançado e ainda não foi recolhido
+ACTIVE_STATES = {STARTING, READY, STOPPING}
 
 
 class XephyrInstance:
 
-    def __init__(self, display_num: int, width: int = 800, height: int = 600, name: str = "", command: str = "", usb_port: str = ""):
+    def __init__(self, display_num: int, width: int = 800, height: int = 600, name: str = "", command: str = "", usb_port: str = "",
+                 restart_policy: str = 'never', limits: Optional[Dict] = None, backend: str = 'xephyr',
+                 profile: str = 'default'):
         self.display_num = display_num
         self.width = width
         self.height = height
         self.name = name.strip() if name.strip() else f"Xephyr :{display_num}"
         self.command = command.strip()
         self.usb_port = usb_port.strip()
+        # Reinício automático: 'never', 'on-failure' ou 'always' (ver RestartController)
+        self.restart_policy = restart_policy
+        # Limites de CPU/memória: cpus, nice, ionice, memory_max, cpu_weight (ver ResourceLimiter)
+        self.limits: Dict = limits or {}
+        self.effective_limits: Dict = {}
+        # Servidor X: 'xephyr' (janela no host) ou 'xvfb' (sem janela, framebuffer mapeável)
+        self.backend = backend
+        self.backend_settings: Dict = dict(DEFAULT_XVFB)
+        # Perfil de lançamento: opções extras do servidor (ver display_backends.PROFILE_OPTIONS)
+        self.profile = profile
+        self.profiles: Dict[str, Dict] = DEFAULT_PROFILES
+        self.framebuffer: Optional[Framebuffer] = None
+        # Título com que o servidor rodando foi aberto (o genérico do pool, em displays adotados)
+        self.window_title = ""
         self.process: Optional[subprocess.Popen] = None
         self.app_process: Optional[subprocess.Popen] = None
-        self.is_running = False
+        self.registry = ProcessRegistry()
+        self.peak_rss = 0
+        self.state = CREATED
+        self._state_lock = threading.Lock()
+        # Serializa iniciar/parar/editar a mesma instância entre threads
+        self.op_lock = threading.RLock()
+        self._wm_lock = threading.Lock()
+        self.readiness_settings: Dict = dict(DEFAULT_READINESS)
+        self.supervisor: Optional[ProcessSupervisor] = None
+        self.resources: Optional[ResourceLimiter] = None
+        self.launcher = get_launcher()
         
+    def _track(self, process: subprocess.Popen, role: str, command: Optional[str] = None):
+        """Aplica os limites ao processo recém-lançado e o registra na instância e no supervisor
+
+        Os processos são lançados com start_new_session, sem preexec_fn (que
+        não é seguro com as threads do gerenciador): cgroup, afinidade, nice
+        e ionice são aplicados daqui, pelo pai, logo depois do Popen.
+        """
+        if self.resources:
+            self.resources.apply(process.pid, self.effective_limits, role)
+        self.registry.register(process, role, command)
+        if self.supervisor:
+            self.supervisor.watch(self.display_num, process, role)
+    
+    def apply_limits(self):
+        """Recalcula os limites e os aplica à árvore de processos já em execução"""
+        if not self.resources:
+            return
+        self.effective_limits = self.resources.prepare(self.display_num, self.limits)
+        running = [proc for proc in self.registry.describe() if proc['running']]
+        self.resources.apply_tree([proc['pid'] for proc in running if proc['role'] != 'app'], self.effective_limits)
+        self.resources.apply_tree([proc['pid'] for proc in running if proc['role'] == 'app'], self.effective_limits, 'app')
+    
+    def server_backend(self):
+        return get_backend(self.backend, self.backend_settings)
+    
+    def _release_limits(self):
+        if self.resources:
+            self.resources.release(self.display_num)
+        self.effective_limits = {}
+    
+    @property
+    def is_running(self) -> bool:
+        return self.state in ACTIVE_STATES
+    
+    def set_state(self, new_state: str, expected: Optional[Set[str]] = None) -> bool:
+        """Muda de estado se a transição for permitida (e o atual estiver em 'expected')
+        
+        A verificação e a troca são atômicas, então só uma thread vence quando
+        várias tentam a mesma transição. Publica um evento 'state'.
+        """
+        with self._state_lock:
+            if expected is not None and self.state not in expected:
+                return False
+            if new_state not in TRANSITIONS[self.state]:
+                return False
+            self.state = new_state
+        if self.supervisor:
+            self.supervisor.publish({'type': 'state', 'display': self.display_num, 'state': new_state})
+        return True
+        
+    def begin_start(self) -> bool:
+        """Passa para 'starting', recolhendo o que sobrou de uma execução que caiu"""
+        previous = self.state
+        if not self.set_state(STARTING):
+            return False
+        if previous == CRASHED:
+            # xfwm4 e aplicativos podem ter sobrevivido ao Xephyr
+            self.registry.signal_all(signal.SIGTERM)
+            self.registry.wait_all()
+            self.registry.clear()
+        return True
+    
     def start(self, width: int = None, height: int = None) -> bool:
-        if self.is_running:
+        if not self.begin_start():
             return False
             
         # Usa as dimensões fornecidas ou as salvas na instância
@@ -30,142 +156,242 @@ class XephyrInstance:
             self.width = width
         if height is not None:
             self.height = height
+        if self.resources:
+            self.effective_limits = self.resources.prepare(self.display_num, self.limits)
             
         try:
-            # Comando para iniciar o Xephyr
-            cmd = [
-                'Xephyr',
-                f':{self.display_num}',
-                '-ac',
-                '-screen', f'{self.width}x{self.height}',
-                '-host-cursor',
-                '-title', self.name
-            ]
+            # Comando para iniciar o servidor X (Xephyr ou Xvfb, ver display_backends)
+            server = self.server_backend()
+            server.prepare(self.display_num)
+            self.window_title = self.name
+            cmd = server.command(self.display_num, self.width, self.height, self.window_title,
+                                 resolve_profile(self.profiles, self.profile))
             
             self.process = subprocess.Popen(
                 cmd,
                 stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL
+                stderr=subprocess.DEVNULL,
+                start_new_session=True
             )
             
-            self.is_running = True
+            self._track(self.process, 'xephyr')
             return True
             
         except Exception as e:
-            print(f"Erro ao iniciar Xephyr :{self.display_num}: {e}")
+            print(f"Erro ao iniciar {self.backend} :{self.display_num}: {e}")
+            self.process = None
+            self.server_backend().cleanup(self.display_num)
+            self._release_limits()
+            self.set_state(STOPPED)
             return False
     
-    def _execute_command(self):
-        try:
-            # Aguarda o Xephyr inicializar completamente
-            time.sleep(2)
-            
-            # Prepara o ambiente com o DISPLAY correto e porta USB
-            env = os.environ.copy()
-            env['DISPLAY'] = f':{self.display_num}'
-            
-            # Adiciona a porta USB se especificada
-            if self.usb_port:
-                env['ESP32_PORT'] = self.usb_port
-                print(f"Usando porta USB {self.usb_port} para display :{self.display_num}")
-            
-            # Primeiro executa o xfwm4 (gerenciador de janelas)
+    def _instance_env(self) -> Dict[str, str]:
+        """Variáveis próprias da instância: DISPLAY correto e porta USB"""
+        env = {'DISPLAY': f':{self.display_num}'}
+        
+        # Adiciona a porta USB se especificada
+        if self.usb_port:
+            env['ESP32_PORT'] = self.usb_port
+            print(f"Usando porta USB {self.usb_port} para display :{self.display_num}")
+        return env
+    
+    def window_manager(self) -> Optional[subprocess.Popen]:
+        """xfwm4 desta instância, se estiver rodando (rastreado por PID no registro)"""
+        processes = self.registry.processes('wm')
+        return processes[0] if processes else None
+    
+    def ensure_window_manager(self, env: Dict[str, str], readiness: DisplayReadiness) -> Optional[subprocess.Popen]:
+        """Executa o xfwm4 se o display ainda não tiver um; retorna o processo novo ou None"""
+        with self._wm_lock:
+            if self.window_manager():
+                return None
             print(f"Iniciando xfwm4 no display :{self.display_num}")
             xfwm4_process = subprocess.Popen(
                 ['xfwm4'],
                 env=env,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
-                preexec_fn=os.setsid
+                start_new_session=True
             )
+            self._track(xfwm4_process, 'wm')
+        
+        readiness.wait_for_window_manager()
+        print(f"xfwm4 iniciado no display :{self.display_num}")
+        return xfwm4_process
+    
+    def _abort_start(self, timeout: float = 5):
+        """Derruba o servidor que não ficou pronto no prazo
+        
+        Com supervisor, o término do Xephyr passa pelo mesmo tratamento de uma
+        queda no gerenciador (estado 'crashed', evento, histórico, reserva de
+        admissão e reinício com backoff); o que ignorar o SIGTERM leva SIGKILL.
+        """
+        print(f"Display :{self.display_num} não respondeu no prazo, encerrando o servidor")
+        self.registry.signal_all(signal.SIGTERM)
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.registry.signal_all(signal.SIGKILL)
+        if not self.supervisor:
+            self.set_state(CRASHED, {STARTING})
+    
+    def warm_up(self) -> bool:
+        """Deixa o display pronto (Xephyr aceitando conexões e xfwm4 ativo), sem comandos"""
+        readiness = DisplayReadiness(self.display_num, self.readiness_settings)
+        if not readiness.wait_for_server():
+            return False
+        env = os.environ.copy()
+        env['DISPLAY'] = f':{self.display_num}'
+        self.ensure_window_manager(env, readiness)
+        return self.set_state(READY, {STARTING})
+    
+    def run_commands(self, command: Optional[str] = None, start_wm: bool = True) -> List[subprocess.Popen]:
+        """Pipeline único de execução: aguarda o display, garante o xfwm4 e lança os comandos
+        
+        Usado no início da instância e por "Executar Comando". Comandos
+        separados por vírgula rodam em ordem. Retorna os processos iniciados
+        (xfwm4, se foi preciso, e cada comando), todos já registrados para
+        encerramento junto com a instância. Se o display não responder no
+        prazo, nada é lançado e o servidor de uma instância ainda iniciando é
+        derrubado (ver _abort_start).
+        """
+        started: List[subprocess.Popen] = []
+        try:
+            readiness = DisplayReadiness(self.display_num, self.readiness_settings)
+
+            # Aguarda o socket do Xephyr aceitar conexões; sem ele não há onde lançar nada
+            if not readiness.wait_for_server():
+                if self.state == STARTING:
+                    self._abort_start()
+                return started
             
-            # Aguarda 2 segundos após xfwm4
-            time.sleep(2)
-            print(f"xfwm4 iniciado no display :{self.display_num}")
+            instance_env = self._instance_env()
+            env = os.environ.copy()
+            env.update(instance_env)
+            
+            # Primeiro o xfwm4, a menos que o display já tenha um
+            if start_wm:
+                wm_process = self.ensure_window_manager(env, readiness)
+                if wm_process:
+                    started.append(wm_process)
+            self.set_state(READY, {STARTING})
             
             # Se há comando(s) do usuário, processa um de cada vez
-            if self.command:
+            command = self.command if command is None else command
+            if command:
                 # Divide comandos por vírgula se houver múltiplos
-                commands = [cmd.strip() for cmd in self.command.split(',') if cmd.strip()]
+                commands = [cmd.strip() for cmd in command.split(',') if cmd.strip()]
+                wait_for_window = self.readiness_settings.get('wait_for_window', False)
                 
-                for i, cmd in enumerate(commands):
-                    if i > 0:  # Aguarda 2 segundos entre comandos (exceto o primeiro)
-                        time.sleep(2)
-                    
+                for cmd in commands:
                     print(f"Executando comando '{cmd}' no display :{self.display_num}")
+                    window_count = readiness.client_window_count() if wait_for_window else None
+                    
+                    # Executa o comando individual, sem bash interativo (ver CommandLauncher)
+                    self.app_process = self.launcher.launch(cmd, instance_env)
+                    self._track(self.app_process, 'app', cmd)
+                    started.append(self.app_process)
                     
-                    # Executa o comando individual
-                    self.app_process = subprocess.Popen(
-                        f"bash -i -c '{cmd}'",
-                        shell=True,
-                        env=env,
-                        stdout=subprocess.DEVNULL,
-                        stderr=subprocess.DEVNULL,
-                        preexec_fn=os.setsid
-                    )
+                    # Opcionalmente aguarda a janela do comando antes do próximo
+                    if wait_for_window:
+                        readiness.wait_for_new_window(window_count)
                     
                     print(f"Comando '{cmd}' executado no display :{self.display_num}")
             
         except Exception as e:
             print(f"Erro ao executar comandos no display :{self.display_num}: {e}")
+        return started
     
-    def execute_commands(self):
-        """Executa xfwm4 e comandos do usuário manualmente"""
-        if self.is_running:
-            print(f"Iniciando thread de comandos para display :{self.display_num}")
-            threading.Thread(target=self._execute_command, daemon=True).start()
-        else:
+    def execute_commands(self, start_wm: bool = True, command: Optional[str] = None) -> Optional[Future]:
+        """Roda run_commands em uma thread; o Future entrega os processos iniciados"""
+        if not self.is_running:
             print(f"Instância :{self.display_num} não está rodando, não pode executar comandos")
+            return None
+            
+        print(f"Iniciando thread de comandos para display :{self.display_num}")
+        future: Future = Future()
+        
+        def run():
+            future.set_result(self.run_commands(command, start_wm))
+        
+        threading.Thread(target=run, daemon=True).start()
+        return future
     
-    def stop(self) -> bool:
-        """Para a instância do Xephyr"""
-        if not self.is_running or not self.process:
+    def request_stop(self) -> bool:
+        """Envia SIGTERM a todos os grupos de processos da instância sem aguardar"""
+        if not self.process or not self.set_state(STOPPING, {STARTING, READY, CRASHED}):
+            return False
+        
+        self.registry.signal_all(signal.SIGTERM)
+        return True
+    
+    def wait_stopped(self, timeout: float = 5) -> bool:
+        """Aguarda o encerramento após request_stop, forçando se necessário"""
+        if not self.process:
             return False
             
         try:
-            # Para o aplicativo primeiro, se estiver rodando
-            if self.app_process and self.app_process.poll() is None:
-                try:
-                    self.app_process.terminate()
-                    self.app_process.wait(timeout=3)
-                except:
-                    try:
-                        self.app_process.kill()
-                    except:
-                        pass
-                self.app_process = None
-            
-            # Para o Xephyr
-            self.process.terminate()
-            self.process.wait(timeout=5)
-            self.is_running = False
-            self.process = None
-            return True
-            
-        except subprocess.TimeoutExpired:
-            # Se não terminou graciosamente, força o encerramento
-            self.process.kill()
-            self.process.wait()
-            self.is_running = False
+            # Aguarda Xephyr, xfwm4 e aplicativos juntos; o que restar leva SIGKILL
+            if not self.registry.wait_all(timeout):
+                print(f"Instância :{self.display_num} encerrada à força")
+            self.registry.clear()
+            self._release_limits()
+            self.close_framebuffer()
+            self.server_backend().cleanup(self.display_num)
+            self.app_process = None
             self.process = None
+            self.set_state(STOPPED)
             return True
             
         except Exception as e:
             print(f"Erro ao parar Xephyr :{self.display_num}: {e}")
             return False
     
+    def resize(self, width: int, height: int) -> Optional[str]:
+        """Aplica o novo tamanho à tela rodando, sem reiniciar; retorna o método usado ou None"""
+        if self.state != READY:
+            return None
+        # A janela no host pode estar com o nome atual ou com o título da abertura
+        titles = [title for title in (self.name, self.window_title) if title]
+        method = self.server_backend().resize(self.display_num, width, height, titles)
+        if method:
+            self.width = width
+            self.height = height
+        return method
+    
+    def open_framebuffer(self) -> Optional[Framebuffer]:
+        """Mapeia o framebuffer do display (só no backend xvfb, com o servidor rodando)"""
+        if self.framebuffer is not None:
+            return self.framebuffer
+        path = self.server_backend().framebuffer_path(self.display_num)
+        if not path or not self.is_running:
+            return None
+        try:
+            self.framebuffer = Framebuffer(path)
+        except (OSError, ValueError) as e:
+            print(f"Não foi possível mapear o framebuffer do display :{self.display_num}: {e}")
+            return None
+        return self.framebuffer
+    
+    def close_framebuffer(self):
+        if self.framebuffer is not None:
+            self.framebuffer.close()
+            self.framebuffer = None
+    
+    def stop(self) -> bool:
+        """Para a instância do Xephyr"""
+        if not self.request_stop():
+            return False
+        return self.wait_stopped()
+    
     def is_alive(self) -> bool:
         """Verifica se a instância ainda está rodando"""
-        if not self.process:
-            self.is_running = False
-            return False
-            
-        poll = self.process.poll()
-        if poll is not None:
-            self.is_running = False
-            return False
-            
-        return True
+        # O estado 'crashed' é definido pelo evento de término (XephyrManager)
+        return self.process is not None and self.process.poll() is None
+
+
+# Eventos publicados que entram no histórico de ciclo de vida (backend SQLite)
+HISTORY_EVENTS = {'started': 'start', 'stopped': 'stop', 'crashed': 'crash', 'frozen': 'freeze'}
 
 
 class XephyrManager:
@@ -173,33 +399,302 @@ class XephyrManager:
     
     def __init__(self, config_file: str = "xephyr_config.json"):
         self.instances: Dict[int, XephyrInstance] = {}
+        # Protege o dicionário de instâncias; cada instância tem seu próprio op_lock
+        self._lock = threading.RLock()
         self.config_file = config_file
         self.last_width = 800
         self.last_height = 600
+        self.readiness_settings: Dict = dict(DEFAULT_READINESS)
+        self.launch_concurrency = 8
+        self.telemetry_interval = 2.0
+        self.telemetry_history = 60
+        self.admission_settings: Dict = dict(DEFAULT_ADMISSION)
+        self.warm_pool_settings: Dict = dict(DEFAULT_WARM_POOL)
+        self.restart_settings: Dict = dict(DEFAULT_RESTART)
+        self.limits_settings: Dict = dict(DEFAULT_LIMITS)
+        self.idle_settings: Dict = dict(DEFAULT_IDLE)
+        self.xvfb_settings: Dict = dict(DEFAULT_XVFB)
+        self.capture_settings: Dict = dict(DEFAULT_CAPTURE)
+        self.profiles: Dict[str, Dict] = {name: dict(options) for name, options in DEFAULT_PROFILES.items()}
+        # Perfil de novas instâncias e dos displays do pool pré-aquecido
+        self.default_profile = 'default'
+        self.watchdog_settings: Dict = dict(DEFAULT_WATCHDOG)
+        # Criado depois de carregar a configuração (depende da seção "limits")
+        self.resources: Optional[ResourceLimiter] = None
+        self.save_delay = 0.5
+        self.supervisor = ProcessSupervisor()
+        self.supervisor.subscribe(self._on_process_event)
+        # JSON por padrão; arquivos .db/.sqlite usam o backend SQLite com histórico
+        self.store = open_store(config_file, self._config_snapshot, self.save_delay)
+        self.supervisor.subscribe(self._record_event)
         self.load_config()
-        
-    def _find_available_display(self) -> int:
-        """Encontra o menor número de display disponível"""
-        display_num = 1
-        while display_num in self.instances or self._display_in_use(display_num):
-            display_num += 1
-        return display_num
+        self.store.delay = self.save_delay
+        self.allocator = DisplayAllocator()
+        self.allocator.claim(self.instances)
+        self.allocator.scan()
+        self.scheduler = LaunchScheduler(self.launch_concurrency)
+        self.restarts = RestartController(self.restart_settings)
+        self.resources = ResourceLimiter(self.limits_settings)
+        for _, instance in self._snapshot():
+            # Instâncias carregadas foram ligadas antes do limitador existir
+            instance.resources = self.resources
+        self.throttler = IdleThrottler(self.idle_settings, self._on_throttle_change)
+        self.thumbnails = ThumbnailService(self.capture_settings)
+        self.watchdog = FrameWatchdog(self.watchdog_settings, self.get_thumbnails, self._on_frozen_change)
+        self.telemetry = ResourceSampler(self.telemetry_history, self.telemetry_interval)
+        self.screens = ScreenSizeWatcher(self._on_screen_size)
+        self.admission = AdmissionController(self.admission_settings)
+        self.admission.bind(self._launch_instance, self._committed_memory)
+        self.warm_pool = WarmPool(self.warm_pool_settings, self._select_pooled_display,
+                                  self._create_pooled_display)
     
-    def _display_in_use(self, display_num: int) -> bool:
-        """Verifica se um display já está em uso pelo sistema"""
-        try:
-            # Verifica se existe um socket X para esse display
-            socket_path = f"/tmp/.X11-unix/X{display_num}"
-            return os.path.exists(socket_path)
-        except:
+    def _attach(self, instance: XephyrInstance):
+        """Liga a instância às configurações e ao supervisor do gerenciador"""
+        instance.readiness_settings = self.readiness_settings
+        instance.backend_settings = self.xvfb_settings
+        instance.profiles = self.profiles
+        instance.supervisor = self.supervisor
+        instance.resources = self.resources
+        with self._lock:
+            self.instances[instance.display_num] = instance
+    
+    def _snapshot(self) -> List[Tuple[int, XephyrInstance]]:
+        """Cópia consistente de (display, instância) para iterar sem o lock"""
+        with self._lock:
+            return list(self.instances.items())
+    
+    def subscribe(self, callback):
+        """Registra um callback para eventos de mudança de estado das instâncias
+
+        Eventos: created, updated, removed, started, stopped, exit (término de
+        um processo da instância, com 'role' e 'returncode'), crashed (o
+        Xephyr terminou sem que a parada tivesse sido pedida), state,
+        restart_scheduled, circuit_open (reinício automático suspenso),
+        throttled (com 'reason' e 'action'), resumed, frozen (imagem parada e
+        comandos sem CPU, com 'unchanged_for' e 'cpu'), unfrozen e resized
+        (com 'width', 'height' e 'method').
+        """
+        return self.supervisor.subscribe(callback)
+    
+    def unsubscribe(self, callback):
+        self.supervisor.unsubscribe(callback)
+    
+    def _publish(self, event_type: str, display_num: int, **extra):
+        self.supervisor.publish({'type': event_type, 'display': display_num, **extra})
+    
+    def _telemetry_roots(self) -> Dict[int, List[int]]:
+        """PIDs registrados de cada instância rodando, raízes das árvores amostradas"""
+        roots = {}
+        for display_num, instance in self._snapshot():
+            if instance.is_running:
+                roots[display_num] = [proc['pid'] for proc in instance.registry.describe() if proc['running']]
+        return roots
+    
+    def start_telemetry(self):
+        """Inicia a amostragem periódica de recursos; publica um evento 'telemetry' por rodada
+
+        Também passa a acompanhar, por eventos e fora das rodadas de
+        amostragem, o tamanho das telas Xephyr prontas (ver ScreenSizeWatcher).
+        """
+        self.telemetry.start(self._telemetry_roots, self._on_telemetry)
+        for display_num, instance in self._snapshot():
+            if instance.state == READY and instance.backend == 'xephyr':
+                self.screens.watch(display_num)
+        self.screens.start()
+    
+    def _on_telemetry(self, results: Dict[int, Dict]):
+        # Guarda o pico de RSS de cada instância para estimar o custo dos próximos inícios
+        # (gravado junto com a instância, vale também depois de reiniciar o gerenciador)
+        changed = False
+        for display_num, result in results.items():
+            instance = self.instances.get(display_num)
+            if instance and result['rss'] > instance.peak_rss:
+                instance.peak_rss = result['rss']
+                changed = True
+        if changed:
+            self.save_config()
+        self._publish('telemetry', None)
+    
+    def _committed_memory(self, exclude: Set[int]) -> int:
+        """Memória usada (ou estimada) pelas instâncias rodando, para o orçamento"""
+        committed = 0
+        for display_num, instance in self._snapshot():
+            if not instance.is_running or display_num in exclude:
+                continue
+            latest = self.telemetry.latest(display_num)
+            if latest:
+                committed += latest['rss']
+            else:
+                committed += self.admission.estimate_cost(instance.width, instance.height, instance.peak_rss)
+        return committed
+    
+    def stop_telemetry(self):
+        self.telemetry.stop()
+        self.screens.stop()
+    
+    def start_idle_throttling(self):
+        """Inicia as verificações de ociosidade (horário e falta de entrada; ver IdleThrottler)"""
+        self.throttler.start(lambda: [(num, inst) for num, inst in self._snapshot() if inst.state == READY])
+    
+    def stop_idle_throttling(self):
+        """Para as verificações e retoma todas as instâncias estranguladas"""
+        self.throttler.stop()
+    
+    def _on_throttle_change(self, display_num: int, reason: Optional[str], action: str):
+        if reason:
+            self._publish('throttled', display_num, reason=reason, action=action)
+        else:
+            self._publish('resumed', display_num, action=action)
+    
+    def start_watchdog(self):
+        """Inicia a detecção de instâncias congeladas, se habilitada (ver FrameWatchdog)"""
+        if not self.watchdog.settings['enabled']:
+            return
+        # Instâncias estranguladas estão paradas de propósito
+        self.watchdog.start(lambda: [(num, inst) for num, inst in self._snapshot()
+                                     if inst.state == READY and not self.throttler.reason(num)])
+    
+    def stop_watchdog(self):
+        self.watchdog.stop()
+    
+    def _on_frozen_change(self, display_num: int, frozen: bool, details: Dict):
+        if not frozen:
+            self._publish('unfrozen', display_num)
+            return
+        self._publish('frozen', display_num, **details)
+        instance = self.instances.get(display_num)
+        if not instance or not self.watchdog.settings['restart']:
+            return
+        # Um cliente travado pode ignorar o SIGTERM; o término dispara o reinício dos
+        # comandos pela política da instância, com o mesmo backoff e disjuntor
+        if should_restart(instance.restart_policy, -signal.SIGKILL):
+            print(f"Encerrando os comandos congelados da instância :{display_num}")
+            instance.registry.signal_all(signal.SIGKILL, 'app')
+    
+    def pause_instance(self, display_num: int) -> bool:
+        """Pausa manual: estrangula os comandos da instância até resume_instance"""
+        instance = self.instances.get(display_num)
+        if not instance or instance.state != READY:
             return False
+        self.throttler.pause(display_num, instance)
+        return True
+    
+    def resume_instance(self, display_num: int) -> bool:
+        """Solta os comandos da instância na hora"""
+        if display_num not in self.instances:
+            return False
+        self.throttler.resume(display_num)
+        return True
+    
+    def _on_process_event(self, event: Dict):
+        """Atualiza o estado da instância assim que um processo dela termina
+        
+        Quedas do Xephyr e términos de comandos do usuário disparam o
+        reinício automático conforme a política da instância.
+        """
+        if event['type'] == 'state' and event['state'] == READY:
+            instance = self.instances.get(event['display'])
+            if instance and instance.backend == 'xephyr':
+                self.screens.watch(event['display'])
+            return
+        if event['type'] == 'state' and event['state'] in (STOPPING, CRASHED):
+            # Comandos congelados precisam voltar a rodar para receber o SIGTERM
+            self.throttler.forget(event['display'])
+            self.thumbnails.forget(event['display'])
+            self.watchdog.forget(event['display'])
+            self.screens.unwatch(event['display'])
+            return
+        if event['type'] != 'exit':
+            return
+        if self.warm_pool.on_exit(event['display'], event['pid']):
+            # Processo de um display ocioso do pool
+            return
+        instance = self.instances.get(event['display'])
+        if not instance:
+            return
+            
+        if event['role'] == 'xephyr':
+            # Término durante 'stopping' é o esperado; nos demais estados é uma queda
+            if (instance.process and instance.process.pid == event['pid']
+                    and instance.set_state(CRASHED, {STARTING, READY})):
+                self.admission.release(event['display'])
+                self._publish('crashed', event['display'], returncode=event['returncode'])
+                if should_restart(instance.restart_policy, event['returncode']):
+                    self._schedule_restart(instance, 'xephyr', lambda: self._start_instance(instance.display_num))
+                    
+        elif event['role'] == 'app' and instance.state == READY:
+            command = instance.registry.command_of(event['pid'])
+            if command and should_restart(instance.restart_policy, event['returncode']):
+                def relaunch():
+                    if instance.state == READY:
+                        instance.execute_commands(command=command)
+                self._schedule_restart(instance, command, relaunch)
+        
+        # O processo sai do registro (lista de processos, sinais e varredura de órfãos) só
+        # depois da decisão de reinício; outros que terminaram juntos têm o próprio evento
+        instance.registry.forget(event['pid'])
+    
+    def _schedule_restart(self, instance: XephyrInstance, target: str, action):
+        """Agenda o reinício com backoff; o disjuntor é por instância e alvo"""
+        key = (instance, target)
+        delay = self.restarts.on_failure(key, action)
+        if delay is not None:
+            print(f"Reiniciando '{target}' da instância :{instance.display_num} em {delay:.1f}s")
+            self._publish('restart_scheduled', instance.display_num, target=target, delay=delay)
+        elif self.restarts.is_open(key):
+            print(f"Instância :{instance.display_num} em crash-loop ('{target}'): reinício automático suspenso")
+            self._publish('circuit_open', instance.display_num, target=target)
+    
+    def _restart_keys(self, instance: XephyrInstance) -> List:
+        return [key for key in self.restarts.keys() if key[0] is instance]
     
-    def create_instance(self, width: int = 800, height: int = 600, name: str = "", command: str = "", usb_port: str = "") -> Optional[int]:
-        """Cria uma nova instância do Xephyr (sem iniciar)"""
+    def _record_event(self, event: Dict):
+        if event['type'] in HISTORY_EVENTS:
+            self.store.record_event(event['display'], HISTORY_EVENTS[event['type']],
+                                    event.get('returncode'))
+        elif event['type'] == 'exit' and event['role'] == 'xephyr':
+            # Só o Xephyr da própria instância (não o de um display ocioso do pool no mesmo número)
+            instance = self.instances.get(event['display'])
+            if instance and instance.process and instance.process.pid == event['pid']:
+                self.store.record_event(event['display'], 'exit', event['returncode'])
+    
+    def get_crash_counts(self, since: Optional[float] = None, minimum: int = 1) -> Dict[int, int]:
+        """Quedas por instância desde 'since' (padrão: início do dia)"""
+        if since is None:
+            since = time.mktime(time.localtime()[:3] + (0, 0, 0, 0, 0, -1))
+        return self.store.crash_counts(since, minimum)
+    
+    def get_history(self, display_num: int, limit: int = 100) -> List[Dict]:
+        """Eventos de ciclo de vida mais recentes de uma instância"""
+        return self.store.history(display_num, limit)
+        
+    def _find_available_display(self) -> int:
+        """Reserva o menor número de display disponível (ver DisplayAllocator)"""
+        return self.allocator.reserve()
+    
+    def create_instance(self, width: int = 800, height: int = 600, name: str = "", command: str = "", usb_port: str = "",
+                        restart_policy: str = 'never', limits: Optional[Dict] = None,
+                        backend: str = 'xephyr', profile: Optional[str] = None) -> Optional[int]:
+        """Cria uma nova instância do Xephyr (sem iniciar); profile None usa o perfil padrão"""
         # Valida se o nome foi fornecido
         if not name.strip():
             print("Erro: Nome da instância é obrigatório")
             return None
+        if restart_policy not in RESTART_POLICIES:
+            print(f"Erro: Política de reinício inválida '{restart_policy}'")
+            return None
+        if backend not in BACKENDS:
+            print(f"Erro: Backend inválido '{backend}'")
+            return None
+        profile = profile or self.default_profile
+        if profile not in self.profiles:
+            print(f"Erro: Perfil de lançamento inválido '{profile}'")
+            return None
+        try:
+            limits = normalize_limits(limits)
+        except ValueError as e:
+            print(f"Erro: {e}")
+            return None
             
         display_num = self._find_available_display()
         
@@ -208,115 +703,402 @@ class XephyrManager:
         self.last_height = height
         
         # Cria a instância mas NÃO inicia o Xephyr
-        instance = XephyrInstance(display_num, width, height, name, command, usb_port)
-        self.instances[display_num] = instance
+        instance = XephyrInstance(display_num, width, height, name, command, usb_port, restart_policy, limits, backend,
+                                  profile)
+        self._attach(instance)
         self.save_config()
+        self._publish('created', display_num)
         
         return display_num
     
+    def start_instance(self, display_num: int) -> Union[bool, str]:
+        """Inicia uma instância específica, ou a coloca na fila se o host estiver saturado
+        
+        Retorna True se iniciou, QUEUED ('queued') se ficou na fila de
+        admissão ou False em caso de falha.
+        """
+        instance = self.instances.get(display_num)
+        if not instance:
+            return False
+            
+        # Início manual fecha o disjuntor de reinícios automáticos
+        for key in self._restart_keys(instance):
+            self.restarts.reset(key)
+        return self._start_instance(display_num)
+    
+    def _start_instance(self, display_num: int) -> Union[bool, str]:
+        instance = self.instances.get(display_num)
+        if not instance:
+            return False
+            
+        with instance.op_lock:
+            if instance.is_running or self.admission.is_queued(display_num):
+                return False
+                
+            if self.admission.enabled:
+                cost = self.admission.estimate_cost(instance.width, instance.height, instance.peak_rss)
+                if not self.admission.request(display_num, cost):
+                    print(f"Instância :{display_num} na fila aguardando recursos do host")
+                    self._publish('queued', display_num)
+                    return QUEUED
+                    
+            return self._launch_instance(display_num)
+    
+    def _launch_instance(self, display_num: int) -> bool:
+        """Inicia o Xephyr e executa os comandos (já admitida pelo controle de admissão)"""
+        instance = self.instances.get(display_num)
+        if not instance:
+            return False
+            
+        with instance.op_lock:
+            if STARTING not in TRANSITIONS[instance.state]:
+                return False
+                
+            # Adota um display pré-aquecido da mesma resolução, se houver (o pool só tem
+            # Xephyr com o perfil padrão)
+            use_pool = (self.warm_pool.enabled and instance.backend == 'xephyr'
+                        and instance.profile == self.default_profile)
+            pooled = self.warm_pool.acquire(display_num, instance.width, instance.height) if use_pool else None
+            if pooled:
+                if not self._adopt_pooled(instance, pooled):
+                    self.admission.release(display_num)
+                    return False
+                print(f"Instância '{instance.name}' adotou o display :{display_num} do pool")
+                # O xfwm4 veio junto com o registro do display adotado
+                instance.execute_commands()
+                return True
+            if self.warm_pool.enabled:
+                # Um display ocioso no número da instância impediria o Xephyr de subir
+                self.warm_pool.discard(display_num)
+                
+            if not instance.start():
+                self.admission.release(display_num)
+                return False
+                
+        instance.execute_commands()
+        self._publish('started', display_num)
+        return True
+    
+    def _select_pooled_display(self, width: int, height: int, busy: List[int]) -> Optional[int]:
+        """Escolhe a instância parada que vai ganhar um display ocioso do pool
+        
+        O pool só tem Xephyr com o perfil padrão. Instâncias com uma operação
+        em andamento (op_lock ocupado) ficam para a próxima reposição.
+        """
+        for display_num, instance in sorted(self._snapshot()):
+            if (display_num in busy or (instance.width, instance.height) != (width, height)
+                    or instance.backend != 'xephyr' or instance.profile != self.default_profile):
+                continue
+            if not instance.op_lock.acquire(blocking=False):
+                continue
+            try:
+                if instance.state in (CREATED, STOPPED):
+                    return display_num
+            finally:
+                instance.op_lock.release()
+        return None
+    
+    def _create_pooled_display(self, display_num: int, width: int, height: int) -> Optional[XephyrInstance]:
+        """Inicia um display ocioso (Xephyr + xfwm4) no número da instância escolhida"""
+        instance = self.instances.get(display_num)
+        if not instance:
+            return None
+        # Sobe com o título da instância, que só adota o servidor quando iniciar
+        pooled = XephyrInstance(display_num, width, height, instance.name, profile=self.default_profile)
+        pooled.readiness_settings = self.readiness_settings
+        pooled.backend_settings = self.xvfb_settings
+        pooled.profiles = self.profiles
+        if not pooled.start():
+            return None
+        if not pooled.warm_up():
+            pooled.stop()
+            return None
+        # Supervisionado enquanto ocioso: se algum processo terminar, sai do pool
+        for entry in pooled.registry.entries():
+            self.supervisor.watch(display_num, entry['process'], entry['role'])
+        return pooled
+    
+    def _adopt_pooled(self, instance: XephyrInstance, pooled: XephyrInstance) -> bool:
+        """Transfere para a instância o display do pool que já subiu no número dela"""
+        if not instance.begin_start():
+            pooled.stop()
+            return False
+        instance.process = pooled.process
+        instance.registry = pooled.registry
+        instance.window_title = pooled.window_title
+        instance.set_state(READY, {STARTING})
+        
+        # Os processos já estão no supervisor desde que o display entrou no pool.
+        # O display do pool subiu sem os limites da instância
+        instance.apply_limits()
+        self._publish('started', instance.display_num)
+        return True
+    
+    def start_warm_pool(self):
+        """Inicia o pool de displays pré-aquecidos, se habilitado na configuração"""
+        self.warm_pool.start()
+    
+    def stop_warm_pool(self):
+        self.warm_pool.stop()
+    
+    def get_pool_stats(self) -> Dict:
+        """Contadores de acerto/erro e displays ociosos do pool"""
+        return self.warm_pool.stats()
+    
     def stop_instance(self, display_num: int) -> bool:
         """Para uma instância específica"""
-        if display_num not in self.instances:
+        instance = self.instances.get(display_num)
+        if not instance:
             return False
             
-        return self.instances[display_num].stop()
+        for key in self._restart_keys(instance):
+            self.restarts.cancel(key)
+        with instance.op_lock:
+            # Se ainda está na fila, basta desistir do início
+            if self.admission.cancel(display_num):
+                self._publish('stopped', display_num)
+                return True
+                
+            if not instance.stop():
+                return False
+        self.admission.release(display_num)
+        self._publish('stopped', display_num)
+        return True
+    
+    def start_many(self, display_nums: Optional[List[int]] = None, max_concurrency: Optional[int] = None) -> Dict:
+        """Inicia várias instâncias em paralelo (todas as paradas, por padrão)"""
+        if display_nums is None:
+            display_nums = [num for num, inst in self._snapshot() if not inst.is_running]
+            
+        report = self.scheduler.run(display_nums, self.start_instance, max_concurrency)
+        queued = f" ({report['queued']} na fila)" if report['queued'] else ""
+        print(f"{report['succeeded']} de {len(display_nums)} instâncias iniciadas{queued} em {report['elapsed']:.2f}s")
+        return report
+    
+    def stop_many(self, display_nums: Optional[List[int]] = None, max_concurrency: Optional[int] = None) -> Dict:
+        """Para várias instâncias: envia SIGTERM a todas de uma vez e aguarda em conjunto"""
+        if display_nums is None:
+            display_nums = [num for num, inst in self._snapshot()
+                            if inst.is_running or self.admission.is_queued(num)]
+            
+        # Instâncias ainda na fila só precisam sair dela
+        cancelled = [num for num in display_nums if self.admission.cancel(num)]
+        for num in cancelled:
+            self._publish('stopped', num)
+        display_nums = [num for num in display_nums if num not in cancelled]
+            
+        # Primeira fase: sinaliza todas antes de esperar por qualquer uma
+        # (request_stop muda o estado atomicamente: paradas simultâneas não se repetem)
+        signaled = {}
+        for num in display_nums:
+            instance = self.instances.get(num)
+            if not instance:
+                continue
+            for key in self._restart_keys(instance):
+                self.restarts.cancel(key)
+            if instance.request_stop():
+                signaled[num] = instance
+        
+        # Segunda fase: aguarda todas juntas
+        def wait_stopped(num):
+            if not signaled[num].wait_stopped():
+                return False
+            self.admission.release(num)
+            self._publish('stopped', num)
+            return True
+        
+        report = self.scheduler.run(list(signaled), wait_stopped, max_concurrency)
+        for num in cancelled:
+            report['results'][num] = {'ok': True, 'queued': False, 'elapsed': 0.0, 'error': None}
+            report['succeeded'] += 1
+        for num in display_nums:
+            if num not in report['results']:
+                report['results'][num] = {'ok': False, 'queued': False, 'elapsed': 0.0,
+                                          'error': "Instância não está rodando"}
+                report['failed'] += 1
+        print(f"{report['succeeded']} de {len(report['results'])} instâncias paradas em {report['elapsed']:.2f}s")
+        return report
     
     def remove_instance(self, display_num: int) -> bool:
         """Remove uma instância (para antes de remover)"""
-        if display_num not in self.instances:
+        instance = self.instances.get(display_num)
+        if not instance:
             return False
             
-        instance = self.instances[display_num]
-        if instance.is_running:
-            instance.stop()
-            
-        del self.instances[display_num]
+        for key in self._restart_keys(instance):
+            self.restarts.reset(key)
+        with instance.op_lock:
+            self.admission.cancel(display_num)
+            if instance.is_running:
+                instance.stop()
+                
+            with self._lock:
+                if self.instances.get(display_num) is not instance:
+                    return False
+                del self.instances[display_num]
+            instance._release_limits()
+        self.warm_pool.discard(display_num)
+        self.allocator.release(display_num)
         self.save_config()
+        self._publish('removed', display_num)
         return True
     
+    def execute_command(self, display_num: int, command: str) -> bool:
+        """Executa comando(s) separados por vírgula em uma instância rodando"""
+        instance = self.instances.get(display_num)
+        if not instance or not instance.is_running or not command.strip():
+            return False
+            
+        # O pipeline só lança o xfwm4 se o display ainda não tiver um
+        return instance.execute_commands(command=command.strip()) is not None
+    
+    def _instance_info(self, display_num: int, instance: XephyrInstance) -> Dict:
+        """Informações de uma instância no formato usado por get_instances"""
+        # Atualiza o status da instância
+        is_alive = instance.is_alive()
+        
+        return {
+            'display': display_num,
+            'running': is_alive,
+            'state': instance.state,
+            'queued': self.admission.is_queued(display_num),
+            'pid': instance.process.pid if instance.process and is_alive else None,
+            'width': instance.width,
+            'height': instance.height,
+            'name': instance.name,
+            'command': instance.command,
+            'usb_port': instance.usb_port,
+            'backend': instance.backend,
+            'profile': instance.profile,
+            'restart_policy': instance.restart_policy,
+            'restart': self.restarts.status((instance, 'xephyr')),
+            'limits': instance.limits,
+            'cpus': instance.effective_limits.get('cpus') if is_alive else None,
+            'cgroup': self.resources.usage(display_num) if is_alive else None,
+            'throttled': self.throttler.reason(display_num),
+            'frozen': self.watchdog.frozen(display_num),
+            'processes': instance.registry.describe(),
+            'resources': self.telemetry.latest(display_num) if is_alive else None
+        }
+    
+    def get_instance(self, display_num: int) -> Optional[Dict]:
+        """Retorna as informações de uma instância ou None se não existir"""
+        instance = self.instances.get(display_num)
+        if not instance:
+            return None
+        return self._instance_info(display_num, instance)
+    
     def get_instances(self) -> List[Dict]:
         """Retorna lista com informações de todas as instâncias"""
-        instances_info = []
-        
-        for display_num, instance in self.instances.items():
-            # Atualiza o status da instância
-            is_alive = instance.is_alive()
-            
-            instances_info.append({
-                'display': display_num,
-                'running': is_alive,
-                'pid': instance.process.pid if instance.process and is_alive else None,
-                'width': instance.width,
-                'height': instance.height,
-                'name': instance.name,
-                'command': instance.command,
-                'usb_port': instance.usb_port
-            })
-            
-        return instances_info
+        return [self._instance_info(display_num, instance)
+                for display_num, instance in self._snapshot()]
     
     def cleanup_dead_instances(self):
         """Remove instâncias que não estão mais rodando"""
-        dead_instances = []
-        
-        for display_num, instance in self.instances.items():
-            if not instance.is_alive():
-                dead_instances.append(display_num)
+        with self._lock:
+            dead_instances = [display_num for display_num, instance in self.instances.items()
+                              if not instance.is_alive() and not self.admission.is_queued(display_num)]
+            for display_num in dead_instances:
+                del self.instances[display_num]
         
         for display_num in dead_instances:
-            del self.instances[display_num]
+            self.resources.release(display_num)
+            self.warm_pool.discard(display_num)
+            self.allocator.release(display_num)
+            self._publish('removed', display_num)
         
         if dead_instances:
             self.save_config()
     
     def shutdown_all(self):
         """Para todas as instâncias mas mantém os dados salvos"""
-        for instance in self.instances.values():
-            if instance.is_running:
-                instance.stop()
+        self.stop_many()
         
         # NÃO limpa as instâncias, apenas para os processos
-        self.save_config()
+        self.flush_config()
     
     def save_config(self):
-        """Salva as configurações em arquivo JSON"""
-        try:
-            config_data = {
-                'last_width': self.last_width,
-                'last_height': self.last_height,
-                'instances': {}
+        """Agenda a gravação das configurações
+        
+        Gravações pedidas dentro de 'save_delay' segundos são agrupadas em
+        uma única escrita atômica (ver ConfigStore).
+        """
+        self.store.schedule()
+    
+    def flush_config(self):
+        """Grava imediatamente as configurações pendentes"""
+        self.store.flush()
+    
+    def _config_snapshot(self) -> Dict:
+        """Estado atual a ser gravado no arquivo JSON"""
+        config_data = {
+            'last_width': self.last_width,
+            'last_height': self.last_height,
+            'readiness': self.readiness_settings,
+            'launch_concurrency': self.launch_concurrency,
+            'telemetry_interval': self.telemetry_interval,
+            'telemetry_history': self.telemetry_history,
+            'save_delay': self.save_delay,
+            'admission': self.admission.settings,
+            'warm_pool': self.warm_pool.settings,
+            'restart': self.restarts.settings,
+            'limits': self.resources.settings,
+            'idle': self.throttler.settings,
+            'xvfb': self.xvfb_settings,
+            'capture': self.thumbnails.settings,
+            'watchdog': self.watchdog.settings,
+            'profiles': self.profiles,
+            'default_profile': self.default_profile,
+            'instances': {}
+        }
+        
+        # Salva informações das instâncias (não salva processos ativos)
+        for display_num, instance in self._snapshot():
+            config_data['instances'][str(display_num)] = {
+                'display_num': instance.display_num,
+                'width': instance.width,
+                'height': instance.height,
+                'name': instance.name,
+                'command': instance.command,
+                'usb_port': instance.usb_port,
+                'backend': instance.backend,
+                'profile': instance.profile,
+                'restart_policy': instance.restart_policy,
+                'limits': instance.limits,
+                'peak_rss': instance.peak_rss
             }
-            
-            # Salva informações das instâncias (não salva processos ativos)
-            for display_num, instance in self.instances.items():
-                config_data['instances'][str(display_num)] = {
-                    'display_num': instance.display_num,
-                    'width': instance.width,
-                    'height': instance.height,
-                    'name': instance.name,
-                    'command': instance.command,
-                    'usb_port': instance.usb_port
-                }
-            
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, indent=2, ensure_ascii=False)
-                
-        except Exception as e:
-            print(f"Erro ao salvar configurações: {e}")
+        
+        return config_data
     
     def load_config(self):
         """Carrega as configurações do arquivo JSON"""
         try:
-            if not os.path.exists(self.config_file):
+            config_data = self.store.load()
+            if config_data is None:
                 return
-                
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
             
             # Restaura as últimas dimensões usadas
             self.last_width = config_data.get('last_width', 800)
             self.last_height = config_data.get('last_height', 600)
             
+            # Restaura os timeouts de prontidão dos displays
+            self.readiness_settings.update(config_data.get('readiness', {}))
+            self.launch_concurrency = config_data.get('launch_concurrency', 8)
+            self.telemetry_interval = config_data.get('telemetry_interval', 2.0)
+            self.telemetry_history = config_data.get('telemetry_history', 60)
+            self.save_delay = config_data.get('save_delay', 0.5)
+            self.admission_settings.update(config_data.get('admission', {}))
+            self.warm_pool_settings.update(config_data.get('warm_pool', {}))
+            self.restart_settings.update(config_data.get('restart', {}))
+            self.limits_settings.update(config_data.get('limits', {}))
+            self.idle_settings.update(config_data.get('idle', {}))
+            self.xvfb_settings.update(config_data.get('xvfb', {}))
+            self.capture_settings.update(config_data.get('capture', {}))
+            self.watchdog_settings.update(config_data.get('watchdog', {}))
+            # Perfis do arquivo substituem os padrões de mesmo nome
+            self.profiles.update(config_data.get('profiles', {}))
+            self.default_profile = config_data.get('default_profile', 'default')
+            
             # Restaura as instâncias (mas não as inicia automaticamente)
             instances_data = config_data.get('instances', {})
             for display_str, instance_data in instances_data.items():
@@ -327,9 +1109,14 @@ class XephyrManager:
                     height=instance_data['height'],
                     name=instance_data.get('name', f"Xephyr :{display_num}"),
                     command=instance_data.get('command', ""),
-                    usb_port=instance_data.get('usb_port', "")
+                    usb_port=instance_data.get('usb_port', ""),
+                    restart_policy=instance_data.get('restart_policy', 'never'),
+                    limits=instance_data.get('limits', {}),
+                    backend=instance_data.get('backend', 'xephyr'),
+                    profile=instance_data.get('profile', 'default')
                 )
-                self.instances[display_num] = instance
+                instance.peak_rss = instance_data.get('peak_rss', 0)
+                self._attach(instance)
                 
         except Exception as e:
             print(f"Erro ao carregar configurações: {e}")
@@ -338,25 +1125,163 @@ class XephyrManager:
         """Retorna as últimas dimensões usadas"""
         return (self.last_width, self.last_height)
     
-    def update_instance(self, display_num: int, name: str, command: str, width: int, height: int, usb_port: str = "") -> bool:
-        """Atualiza os dados de uma instância existente"""
-        if display_num not in self.instances:
-            return False
+    def update_instance(self, display_num: int, name: str, command: str, width: int, height: int, usb_port: str = "",
+                        restart_policy: Optional[str] = None, limits: Optional[Dict] = None,
+                        backend: Optional[str] = None, profile: Optional[str] = None) -> bool:
+        """Atualiza os dados de uma instância existente (restart_policy/limits/backend/profile None mantêm os atuais)
         
-        instance = self.instances[display_num]
+        A troca de backend ou de perfil vale a partir do próximo início da
+        instância; novas dimensões de uma instância rodando são aplicadas na
+        hora (ver resize_instance).
+        """
+        instance = self.instances.get(display_num)
+        if not instance:
+            return False
+        if restart_policy is not None and restart_policy not in RESTART_POLICIES:
+            print(f"Erro: Política de reinício inválida '{restart_policy}'")
+            return False
+        if backend is not None and backend not in BACKENDS:
+            print(f"Erro: Backend inválido '{backend}'")
+            return False
+        if profile is not None and profile not in self.profiles:
+            print(f"Erro: Perfil de lançamento inválido '{profile}'")
+            return False
+        if limits is not None:
+            try:
+                limits = normalize_limits(limits)
+            except ValueError as e:
+                print(f"Erro: {e}")
+                return False
         
         # Atualiza os dados da instância
-        instance.name = name
-        instance.command = command
-        instance.width = width
-        instance.height = height
-        instance.usb_port = usb_port
+        with instance.op_lock:
+            # Instância rodando: as novas dimensões são aplicadas ao vivo logo abaixo
+            resize = instance.is_running and (width, height) != (instance.width, instance.height)
+            instance.name = name
+            instance.command = command
+            if not resize:
+                instance.width = width
+                instance.height = height
+            instance.usb_port = usb_port
+            if restart_policy is not None:
+                instance.restart_policy = restart_policy
+            if backend is not None:
+                instance.backend = backend
+            if profile is not None:
+                instance.profile = profile
+            if limits is not None:
+                instance.limits = limits
+                # Instância rodando: os novos limites valem na hora para toda a árvore
+                if instance.is_running:
+                    instance.apply_limits()
+            running = instance.is_running
         
+        if not running:
+            # O display ocioso subiu com os dados antigos; o pool repõe com os novos
+            self.warm_pool.discard(display_num)
         # Salva as configurações
         self.save_config()
+        self._publish('updated', display_num)
+        if resize:
+            self.resize_instance(display_num, width, height)
         
         return True
     
+    def resize_instance(self, display_num: int, width: int, height: int) -> Optional[str]:
+        """Muda as dimensões de uma instância, ao vivo se ela estiver pronta
+        
+        Retorna o método usado: 'randr' ou 'window' (sem reiniciar, ver
+        XephyrBackend.resize), 'restart' (reinício completo, só quando o
+        redimensionamento ao vivo não é possível, como no Xvfb) ou 'saved'
+        (instância parada: vale no próximo início). None em caso de falha.
+        """
+        instance = self.instances.get(display_num)
+        if not instance:
+            return None
+        if width <= 0 or height <= 0:
+            print(f"Erro: Dimensões inválidas {width}x{height}")
+            return None
+            
+        with instance.op_lock:
+            if instance.state != READY:
+                instance.width = width
+                instance.height = height
+                method = 'saved'
+            else:
+                method = instance.resize(width, height)
+                if method:
+                    print(f"Display :{display_num} redimensionado para {width}x{height} ({method})")
+                    # A captura guarda a geometria antiga
+                    self.thumbnails.forget(display_num)
+                else:
+                    print(f"Display :{display_num} não aceitou {width}x{height} ao vivo, reiniciando")
+                    self.stop_instance(display_num)
+                    instance.width = width
+                    instance.height = height
+                    method = 'restart' if self._start_instance(display_num) else None
+        
+        self.save_config()
+        self._publish('resized', display_num, width=width, height=height, method=method)
+        return method
+    
+    def _on_screen_size(self, display_num: int, width: int, height: int):
+        """Atualiza as dimensões salvas quando a tela de uma instância Xephyr muda de tamanho
+
+        Com -resizeable, arrastar a borda da janela no host muda a tela
+        aninhada; o ScreenSizeWatcher avisa pelo ConfigureNotify da raiz.
+        Redimensionamentos pedidos por resize_instance já gravaram o tamanho
+        e não geram um segundo evento 'resized'.
+        """
+        instance = self.instances.get(display_num)
+        if not instance:
+            return
+        with instance.op_lock:
+            if instance.state != READY or (width, height) == (instance.width, instance.height):
+                return
+            instance.width, instance.height = width, height
+        self.thumbnails.forget(display_num)
+        self._publish('resized', display_num, width=width, height=height, method='host')
+        self.save_config()
+    
+    def get_framebuffer(self, display_num: int) -> Optional[Framebuffer]:
+        """Framebuffer mapeado de uma instância xvfb rodando (pixels sem cópia), ou None
+        
+        O mapeamento é mantido até a instância parar; use .pixels (memoryview)
+        ou .array() (NumPy) para ler a tela.
+        """
+        instance = self.instances.get(display_num)
+        if not instance:
+            return None
+        return instance.open_framebuffer()
+    
+    def get_framebuffer_path(self, display_num: int) -> Optional[str]:
+        """Arquivo do framebuffer de uma instância xvfb rodando (para mapear em outro processo)"""
+        framebuffer = self.get_framebuffer(display_num)
+        return framebuffer.path if framebuffer else None
+    
+    def get_thumbnails(self, display_nums: Optional[List[int]] = None,
+                       max_age: Optional[float] = None) -> Dict[int, Dict]:
+        """Miniaturas PPM das instâncias prontas (todas ou as de 'display_nums')
+        
+        Capturadas em uma rodada só e guardadas em cache por 'max_age'
+        segundos (padrão: 'ttl'); instâncias xvfb são lidas direto do
+        framebuffer mapeado.
+        """
+        sources = {}
+        for display_num, instance in self._snapshot():
+            if instance.state != READY or (display_nums is not None and display_num not in display_nums):
+                continue
+            sources[display_num] = instance.open_framebuffer() if instance.backend == 'xvfb' else None
+        return self.thumbnails.get_many(sources, max_age)
+    
+    def get_profiles(self) -> Dict[str, Dict]:
+        """Perfis de lançamento disponíveis (nome -> opções definidas)"""
+        return dict(self.profiles)
+    
+    def refresh_shell_snapshot(self):
+        """Recaptura aliases e ambiente do shell do usuário no próximo comando"""
+        get_launcher().invalidate()
+    
     def get_available_usb_ports(self) -> List[str]:
         """Retorna lista de portas USB disponíveis"""
         try:
@@ -371,22 +1296,8 @@ class XephyrManager:
 
 
 if __name__ == "__main__":
-    # Teste básico
-    manager = XephyrManager()
-    
-    print("Testando gerenciador Xephyr...")
+    # Interface de linha de comando (sem tkinter)
+    import sys
+    from xephyr_cli import main
     
-    # Cria uma instância
-    display = manager.create_instance()
-    if display:
-        print(f"Instância criada no display :{display}")
-        
-        input("Pressione Enter para parar a instância...")
-        
-        manager.stop_instance(display)
-        print(f"Instância :{display} parada")
-        
-        manager.remove_instance(display)
-        print(f"Instância :{display} removida")
-    else:
-        print("Falha ao criar instância")
+    sys.exit(main())